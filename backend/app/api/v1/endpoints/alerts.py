@@ -1,10 +1,10 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from app.api import deps
-from app.crud import crud_sales
-from datetime import date, timedelta
+from app.crud import crud_alert
+from app.core.alert_engine import alert_engine, serialize_alert
+from app.models.alert import AlertStatus
 
 from app import models
 
@@ -12,50 +12,43 @@ router = APIRouter()
 
 @router.get("/")
 def get_alerts(
+    status: Optional[str] = Query(AlertStatus.OPEN.value, description="Open, Resolved, or empty for all"),
+    rule: Optional[str] = None,
+    severity: Optional[str] = None,
+    store_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = Query(100, le=500),
     current_user: models.user.User = Depends(deps.get_current_analyst_user),
     db: Session = Depends(deps.get_db)
 ) -> Any:
     """
-    Generate system alerts based on sales patterns.
-    Currently detects:
-    1. Stores with no recent activity (Last 7 days).
-    2. Zero-sales anomalies.
+    Alerts stored by the scheduled alert engine batch (see GET /alerts/rules), most severe
+    and most recent first. Reading is an indexed query; nothing is recomputed per request.
     """
-    alerts = []
-    cutoff_date = date.today() - timedelta(days=7)
+    alerts = crud_alert.get_alerts(db, status=status or None, rule=rule, severity=severity, store_id=store_id,
+                                   skip=skip, limit=limit)
+    return [serialize_alert(alert) for alert in alerts]
 
-    # 1. Find stores with NO sales in the last 7 days using a real database query.
-    # Fetch all store IDs that exist in the system.
-    all_store_ids = {s.id for s in db.query(models.Store.id).all()}
-
-    # Fetch store IDs that DO have at least one sale record in the last 7 days.
-    active_store_ids = {
-        row.store_id
-        for row in db.query(models.SalesData.store_id)
-        .filter(models.SalesData.date >= cutoff_date)
-        .distinct()
-        .all()
-    }
-
-    # Inactive stores = all stores minus active stores
-    inactive_store_ids = all_store_ids - active_store_ids
-
-    if inactive_store_ids and len(all_store_ids) > 0:
-        inactive_count = len(inactive_store_ids)
-        total_count = len(all_store_ids)
-        alerts.append({
-            "type": "warning",
-            "message": f"{inactive_count} of {total_count} store(s) have not reported any sales in the last 7 days.",
-            "severity": "medium"
-        })
+@router.get("/summary")
+def get_alert_summary(
+    current_user: models.user.User = Depends(deps.get_current_analyst_user),
+    db: Session = Depends(deps.get_db)
+) -> Any:
+    """Open alerts per rule and severity, and the last batch run in this process."""
+    return {"open": crud_alert.count_open_alerts(db), "last_run": alert_engine.last_run}
 
-    # 2. Check for Data Quality
-    total_sales = crud_sales.get_total_sales_count(db)
-    if total_sales == 0:
-        alerts.append({
-            "type": "info",
-            "message": "System is empty. Please upload sales data via the Ingestion module.",
-            "severity": "high"
-        })
+@router.get("/rules")
+def get_alert_rules(current_user: models.user.User = Depends(deps.get_current_analyst_user)) -> Any:
+    return alert_engine.describe()
 
-    return alerts
+@router.post("/evaluate")
+def evaluate_alerts(
+    rules: Optional[List[str]] = Query(None, description="Rule names to evaluate (default: all)"),
+    current_user: models.user.User = Depends(deps.get_current_manager_user),
+    db: Session = Depends(deps.get_db)
+) -> Any:
+    """Run the alert batch now instead of waiting for the schedule."""
+    unknown = [name for name in rules or [] if name not in alert_engine.rules]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown alert rules: {unknown}")
+    return alert_engine.run(db, rules=rules)
@@ -1,7 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import json
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from app.api import deps
-from app.crud import crud_sales
+from app.core.alert_evaluator import alert_evaluator
+from app.core.config import settings
+from app.core.dashboard_stream import dashboard_broadcaster, serialize_event
+from app.crud import crud_dashboard, crud_inventory, crud_sales
+from app.db.session import SessionLocal
+from app.models.dashboard import DashboardEventKind
 
 from app import models
 import logging
@@ -71,51 +81,20 @@ def read_dashboard(
     low_stock_count = 0
     out_of_stock_count = 0
     try:
-        low_stock_count = (
-            db.query(models.StoreInventory)
-            .filter(
-                models.StoreInventory.quantity_on_hand > 0,
-                models.StoreInventory.quantity_on_hand < models.StoreInventory.low_stock_threshold
-            )
-            .count()
-        )
-        out_of_stock_count = (
-            db.query(models.StoreInventory)
-            .filter(models.StoreInventory.quantity_on_hand == 0)
-            .count()
-        )
+        counts = crud_inventory.get_stock_alert_counts(db)
+        low_stock_count = counts["low_stock_count"]
+        out_of_stock_count = counts["out_of_stock_count"]
     except Exception as e:
         logger.error(f"Error fetching stock alert counts: {e}")
 
+    today = date.today()
     today_qty = 0
     today_revenue = 0.0
     today_records = 0
     try:
-        from datetime import date
-        from sqlalchemy import func as sqlfunc
-        today = date.today()
-        today_rows = (
-            db.query(
-                sqlfunc.count(models.SalesData.id).label("records"),
-                sqlfunc.sum(models.SalesData.quantity).label("qty"),
-            )
-            .filter(models.SalesData.date == today)
-            .first()
-        )
-        if today_rows:
-            today_records = today_rows.records or 0
-            today_qty = today_rows.qty or 0
-
-        # Revenue = join with product price
-        rev_rows = (
-            db.query(models.SalesData, models.Product)
-            .join(models.Product, models.SalesData.sku_id == models.Product.id)
-            .filter(models.SalesData.date == today)
-            .all()
-        )
-        today_revenue = round(
-            sum((sd.quantity * (p.price or 0)) for sd, p in rev_rows), 2
-        )
+        # Maintained in the same transaction as the sales rows (see DailySalesRollup)
+        totals = crud_sales.get_daily_rollup_totals(db, today)
+        today_qty, today_revenue, today_records = totals["quantity"], totals["revenue"], totals["records"]
     except Exception as e:
         logger.error(f"Error fetching today's sales: {e}")
 
@@ -128,7 +107,7 @@ def read_dashboard(
             "out_of_stock_count": out_of_stock_count,
         },
         "today": {
-            "date": str(date.today()),
+            "date": str(today),
             "records": today_records,
             "quantity": today_qty,
             "revenue": today_revenue,
@@ -162,18 +141,16 @@ def get_daily_trend(
 
 @router.get("/notifications")
 def get_dashboard_notifications(
-    current_user: models.user.User = Depends(deps.get_current_active_user),
-    db: Session = Depends(deps.get_db)
+    current_user: models.user.User = Depends(deps.get_current_active_user)
 ):
     """
-    Get system notifications for dashboard.
+    Get system notifications for dashboard (cached facts shared with /alerts).
     """
-    from datetime import date, timedelta
     notifications = []
 
     try:
-        total_sales = crud_sales.get_total_sales_count(db)
-        if total_sales == 0:
+        facts = alert_evaluator.facts()
+        if not facts["has_sales"]:
             notifications.append({
                 "id": "1",
                 "message": "System is empty. Please upload sales data via the Ingestion module.",
@@ -183,21 +160,11 @@ def get_dashboard_notifications(
                 "isArchived": False
             })
 
-        # Check for stores with no sales in the past 7 days
-        cutoff_date = date.today() - timedelta(days=7)
-        all_store_ids = {s.id for s in db.query(models.Store.id).all()}
-        active_store_ids = {
-            row.store_id
-            for row in db.query(models.SalesData.store_id)
-            .filter(models.SalesData.date >= cutoff_date)
-            .distinct()
-            .all()
-        }
-        inactive_count = len(all_store_ids - active_store_ids)
-        if inactive_count > 0 and len(all_store_ids) > 0:
+        if facts["inactive_stores"] > 0 and facts["total_stores"] > 0:
             notifications.append({
                 "id": "2",
-                "message": f"{inactive_count} of {len(all_store_ids)} store(s) have not reported sales in the last 7 days.",
+                "message": f"{facts['inactive_stores']} of {facts['total_stores']} store(s) have not reported sales "
+                           f"in the last {facts['inactive_days']} days.",
                 "timestamp": "Just Now",
                 "isRead": False,
                 "isFavorite": False,
@@ -209,6 +176,94 @@ def get_dashboard_notifications(
     return notifications
 
 
+def _sse(event: str, data, event_id: Optional[int] = None) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def _open_stream(token: str, last_event_id: Optional[int]):
+    """
+    Authenticate and build the initial snapshot (plus missed notifications on reconnect).
+    Returns (snapshot, replay, included): 'included' holds the outbox ids above the snapshot
+    cursor that the snapshot already reflects, so the stream must not apply them again.
+    """
+    db = SessionLocal()
+    try:
+        deps.get_current_active_user(deps.get_current_user(db, token))
+        db.commit()
+        if db.bind.dialect.name == "postgresql":
+            # Read the totals, counts and outbox ids from one database snapshot
+            db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        # Outbox ids commit out of order, so MAX(id) is no cursor: a lower id may still commit.
+        # Every id <= the broadcaster's horizon was delivered (or given up) before this point;
+        # ids above it are either visible below (and reflected in the snapshot) or arrive later.
+        cursor = dashboard_broadcaster.horizon
+        if cursor is None:
+            cursor = crud_dashboard.get_last_event_id(db) # the broadcaster starts from here as well
+        included = crud_dashboard.get_event_ids_after(db, cursor)
+        snapshot = {"last_event_id": cursor}
+        today = date.today()
+        snapshot["today"] = dict(crud_sales.get_daily_rollup_totals(db, today), date=str(today))
+        snapshot.update(crud_inventory.get_stock_alert_counts(db))
+        replay = []
+        if last_event_id is not None:
+            replay = [serialize_event(e) for e in crud_dashboard.get_events_after(
+                db, last_event_id, kinds=[DashboardEventKind.NOTIFICATION])]
+        return snapshot, replay, included
+    finally:
+        db.close()
+
+@router.get("/stream")
+async def stream_dashboard(
+    request: Request,
+    token: Optional[str] = Query(None, description="Access token; EventSource cannot send an Authorization header")
+):
+    """
+    Server-Sent Events for the live dashboard. The stream starts with a 'snapshot' event
+    (today's quantity/revenue/records, stock alert counts, last_event_id) and then carries
+    'sales' deltas to add to today's totals, 'stock' counts and new 'notification' events,
+    as writers commit them. On reconnect (Last-Event-ID) a fresh snapshot is sent and the
+    notifications missed in between are replayed.
+    """
+    header = request.headers.get("authorization", "")
+    token = token or (header[7:] if header.lower().startswith("bearer ") else None)
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    last_event_id = request.headers.get("last-event-id")
+    last_event_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+
+    # Subscribe before the snapshot so nothing committed in between is missed
+    subscription = dashboard_broadcaster.subscribe()
+    try:
+        snapshot, replay, included = await asyncio.to_thread(_open_stream, token, last_event_id)
+    except Exception:
+        dashboard_broadcaster.unsubscribe(subscription)
+        raise
+
+    async def events():
+        cursor = snapshot["last_event_id"]
+        try:
+            yield "retry: 3000\n" + _sse("snapshot", snapshot, cursor)
+            for message in replay:
+                yield _sse(message["kind"], message, message["id"])
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.queue.get(), settings.DASHBOARD_STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                if message is None:
+                    break
+                if message["id"] <= cursor or message["id"] in included:
+                    continue
+                yield _sse(message["kind"], message, message["id"])
+        finally:
+            dashboard_broadcaster.unsubscribe(subscription)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @router.get("/sales-dates")
 def get_sales_dates(db: Session = Depends(deps.get_db)):
     """
@@ -1,5 +1,5 @@
-from typing import Any, Dict
-from fastapi import APIRouter, Depends
+from typing import Any, Dict, Optional
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.api import deps
 from app.crud import crud_sales
@@ -54,3 +54,59 @@ def get_model_metrics(
         },
         "description": "Metrics not available. Please train the model."
     }
+
+@router.get("/backtest")
+def get_backtest_report(
+    current_user: models.user.User = Depends(deps.get_current_analyst_user)
+) -> Dict[str, Any]:
+    """
+    Rolling-origin backtest report of the global Prophet model from the last evaluation,
+    with metrics per horizon (days after cutoff) in addition to the overall averages.
+    """
+    from app.ml.model import forecaster
+
+    report = forecaster.load_backtest()
+    if not report:
+        return {
+            "status": "not_evaluated",
+            "message": "No backtest available. Train the model to run one."
+        }
+    return {"status": "evaluated", "model": "prophet", **report}
+
+@router.post("/backtest/sku")
+def run_sku_backtest(
+    sku: Optional[str] = None,
+    store_id: Optional[str] = None,
+    initial_days: int = 56,
+    period_days: int = 14,
+    horizon_days: int = 14,
+    max_series: int = 200,
+    current_user: models.user.User = Depends(deps.get_current_analyst_user),
+    db: Session = Depends(deps.get_db)
+) -> Dict[str, Any]:
+    """
+    Backtest the per-SKU Holt-Winters path used by /forecasting/predict.
+    Filter by sku and/or store_id; otherwise the first 'max_series' series are evaluated.
+    Fold predictions are cached on disk, so repeated runs only recompute new or changed folds.
+    """
+    from app.ml.backtesting import backtest_holt_winters
+
+    if min(initial_days, period_days, horizon_days, max_series) < 1:
+        raise HTTPException(status_code=400, detail="initial_days, period_days, horizon_days and max_series must be positive.")
+
+    rows = crud_sales.get_daily_sales_by_series(db, sku=sku, store_id=store_id)
+    if not rows:
+        raise HTTPException(status_code=404, detail="No historical data found for the requested series.")
+
+    sales = pd.DataFrame(rows, columns=["sku", "store_id", "category", "region", "ds", "y", "records"])
+    sales["series"] = sales["sku"] + "@" + sales["store_id"]
+    keep = sales["series"].drop_duplicates().head(max_series)
+    sales = sales[sales["series"].isin(keep)]
+
+    report = backtest_holt_winters(
+        sales[["series", "ds", "y"]],
+        initial=f"{initial_days} days",
+        period=f"{period_days} days",
+        horizon=f"{horizon_days} days",
+    )
+    return {"model": "holt_winters", "series": int(keep.size), **report}
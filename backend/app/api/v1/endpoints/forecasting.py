@@ -1,8 +1,11 @@
+from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.api import deps
+from app.core.config import settings
 from app import models
 from app import crud
+from app.ml.local_models import densify_daily, fitted_series_cache
 import pandas as pd
 import numpy as np
 
@@ -22,64 +25,29 @@ def predict_demand(
     if days < 1 or days > 365:
         raise HTTPException(status_code=400, detail="Forecast horizon (days) must be between 1 and 365.")
 
-    sales_data = crud.crud_sales.get_sales_by_sku_store(db, sku=sku, store_id=store_id)
-    
-    if not sales_data:
+    # Daily totals aggregated in SQL, densified to a contiguous daily range (missing days -> 0)
+    dates, quantities, row_count = crud.crud_sales.get_daily_quantities_by_sku_store(db, sku=sku, store_id=store_id)
+
+    if row_count == 0:
         raise HTTPException(status_code=404, detail="No historical data found for this product/store combination.")
-    
-    # Prepare DataFrame
-    data_records = [{"date": s.date, "quantity": s.quantity} for s in sales_data]
-    df = pd.DataFrame(data_records)
-    df['date'] = pd.to_datetime(df['date'])
-    df = df.set_index('date')
-    df = df.sort_index()
-    
-    # Resample to daily frequency and fill missing with 0
-    df = df.resample('D').sum().fillna(0)
-    
-    # Check for all zeros
-    if df['quantity'].sum() == 0:
-         forecast_values = [0] * days
-         return {
-            "sku": sku,
-            "store_id": store_id,
-            "forecast_dates": pd.date_range(start=df.index[-1] + pd.Timedelta(days=1), periods=days).strftime('%Y-%m-%d').tolist(),
-            "forecast_values": forecast_values,
-            "method": "Zero Demand (Historical Data is all 0)"
-        }
 
-    # Logic for forecasting
-    forecast_values = []
-    method = ""
-
-    if len(df) < 7:
-         # Not enough data for complex model, use simple average
-         avg = df['quantity'].mean() if not df.empty else 0
-         forecast_values = [avg] * days
-         method = "Simple Average (Insufficient Data)"
-    else:
-        try:
-            from statsmodels.tsa.holtwinters import ExponentialSmoothing
-            # Simple Exponential Smoothing (Holt-Winters)
-            # Add 'try' block specifically for fitting
-            model = ExponentialSmoothing(
-                df['quantity'], 
-                seasonal_periods=7, # Assume weekly seasonality if enough data
-                trend='add',
-                seasonal='add',
-                initialization_method="estimated"
-            ).fit()
-            predictions = model.forecast(days)
-            forecast_values = predictions.tolist()
-            method = "Exponential Smoothing (Holt-Winters)"
-        except Exception as e:
-            # Fallback to moving average if statsmodels fails (e.g., convergence issues)
-            recent_avg = df['quantity'].tail(7).mean()
-            forecast_values = [recent_avg] * days
-            method = f"Moving Average (Fallback due to model error: {str(e)})"
+    # Cap observed daily totals with the thresholds recorded at training time (same as the training data)
+    threshold = crud.crud_sales.get_outlier_threshold(db, sku=sku, store_id=store_id)
+    bounds = (threshold.lower, threshold.upper) if threshold else None
+    if bounds:
+        quantities = np.clip(quantities, *bounds)
+
+    history = densify_daily(dates, quantities)
+
+    # Zero demand / short history / Holt-Winters / moving average fallback.
+    # Fits are cached per series and only refit when new sales arrived (last date / row count changed)
+    # or the recorded outlier thresholds changed.
+    signature = (history.index[-1], row_count, bounds)
+    fitted = fitted_series_cache.get_or_fit((sku, store_id), signature, history)
+    forecast_values, method = fitted.forecast(days), fitted.method
 
     # Generate dates for forecast
-    last_date = df.index[-1]
+    last_date = history.index[-1]
     forecast_dates = pd.date_range(start=last_date + pd.Timedelta(days=1), periods=days)
 
     return {
@@ -127,7 +95,8 @@ from pydantic import BaseModel
 
 class SimulationRequest(BaseModel):
     days: int = 30
-    promotion_schedule: List[int] # 0 or 1 for each day
+    promotion_schedule: Optional[List[int]] = None # 0 or 1 for each day
+    promotion_schedules: Optional[List[List[int]]] = None # Matrix: one schedule per scenario
 
 @router.post("/simulate")
 def simulate_forecast_scenario(
@@ -136,15 +105,27 @@ def simulate_forecast_scenario(
 ):
     """
     Run a 'What-If' simulation for future promotions.
+    Pass 'promotion_schedules' to compare many promotion calendars in one vectorized pass;
+    the response then includes per-scenario totals, uplift against the baseline and daily curves.
     """
     from app.ml.model import forecaster
-    
+
     if not forecaster.is_trained:
         raise HTTPException(status_code=503, detail="Model is not trained.")
-        
+
+    if request.days < 1 or request.days > 365:
+        raise HTTPException(status_code=400, detail="Forecast horizon (days) must be between 1 and 365.")
+
     try:
+        if request.promotion_schedules is not None:
+            result = forecaster.simulate_scenarios(
+                days=request.days,
+                promotion_schedules=request.promotion_schedules
+            )
+            return result
+
         result = forecaster.simulate_scenario(
-            days=request.days, 
+            days=request.days,
             promotion_schedule=request.promotion_schedule
         )
         return {"scenario_forecast": result}
@@ -188,3 +169,80 @@ def get_forecast_accuracy(
             "coverage": metrics_raw.get('coverage', 0)  # 0.752
         }
     }
+
+@router.get("/reconciled")
+def get_reconciled_forecast(
+    days: int = 14,
+    level: str = "store",
+    key: Optional[str] = None,
+    sku: Optional[str] = None,
+    store_id: Optional[str] = None,
+    method: str = "wls_struct",
+    current_user: models.user.User = Depends(deps.get_current_analyst_user),
+    db: Session = Depends(deps.get_db)
+):
+    """
+    Coherent forecasts across the SKU x Store, store, region, category and total levels.
+    Per-series Holt-Winters forecasts (one vectorized batch over the trailing
+    RECONCILIATION_HISTORY_DAYS of DailySalesRollup) and the global Prophet total are
+    reconciled so every aggregate equals the sum of its SKU x Store series. The batch picks
+    smoothing constants per series from a small grid and sees only the trailing window, so
+    its bottom-level values approximate, but do not reproduce, /predict's per-series fits.
+    Results are cached per horizon and method for RECONCILIATION_CACHE_TTL_SECONDS.
+    level: total | region | category | store | sku_store (select one node with 'key', or
+    with 'sku' and 'store_id' for sku_store).
+    method: bottom_up | ols | wls_struct (MinT with structural weights).
+    """
+    from app.ml.model import forecaster
+    from app.ml.reconciliation import (LEVELS, METHODS, build_base_forecasts, reconcile, reconciled_forecasts,
+                                       reconciliation_cache)
+
+    if days < 1 or days > 365:
+        raise HTTPException(status_code=400, detail="Forecast horizon (days) must be between 1 and 365.")
+    if level not in LEVELS:
+        raise HTTPException(status_code=400, detail=f"Invalid level. Use one of {LEVELS}.")
+    if method not in METHODS:
+        raise HTTPException(status_code=400, detail=f"Invalid method. Use one of {METHODS}.")
+
+    if level == "sku_store":
+        if key is not None or (sku is None) != (store_id is None):
+            raise HTTPException(status_code=400, detail="Select a sku_store node with both 'sku' and 'store_id'.")
+        key = (sku, store_id) if sku is not None else None
+
+    last_sale = crud.crud_sales.get_last_sales_date(db)
+    if last_sale is None:
+        raise HTTPException(status_code=404, detail="No historical sales data found.")
+    end = crud.crud_sales.get_last_rollup_date(db)
+    if end is None or end < last_sale:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Daily sales rollups are missing or behind the sales data (last rollup {end}, last sale "
+                   f"{last_sale}). Run migrate_backfill_daily_rollups.py."
+        )
+
+    def compute():
+        window = settings.RECONCILIATION_HISTORY_DAYS
+        sku_ids, store_ids, history = crud.crud_sales.get_rollup_history(db, end - timedelta(days=window - 1), window)
+        forecast_dates = pd.date_range(start=pd.Timestamp(end) + pd.Timedelta(days=1), periods=days)
+        total_forecast = None
+        total_method = "Bottom-up sum of SKU forecasts"
+        if method != "bottom_up" and (forecaster.is_trained or forecaster.load_model()):
+            total_forecast = forecaster.predict_dates(forecast_dates)
+            total_method = "Facebook Prophet (Enhanced)"
+        series = crud.crud_sales.get_series_attributes(db, sku_ids, store_ids)
+        hierarchy, base = build_base_forecasts(series, history, days, total_forecast=total_forecast)
+        return hierarchy, reconcile(hierarchy, base, method=method), forecast_dates, total_method
+
+    try:
+        hierarchy, reconciled, forecast_dates, total_method = reconciliation_cache.get_or_compute((days, method, end), compute)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {
+        "level": level,
+        "method": method,
+        "total_base_method": total_method,
+        "bottom_series": len(hierarchy.bottom_keys),
+        "forecast_dates": forecast_dates.strftime('%Y-%m-%d').tolist(),
+        "forecasts": reconciled_forecasts(hierarchy, reconciled, level, key=key),
+    }
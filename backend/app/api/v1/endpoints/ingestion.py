@@ -1,8 +1,17 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from app.api import deps
 from app import crud, models, schemas
+from app.core.alert_evaluator import alert_evaluator
+from app.core.config import settings
+from app.ingestion.readers import DEFAULT_CHUNK_SIZE, IngestionError, list_excel_sheets
+from app.ingestion.jobs import DuplicateUpload, run_sales_ingestion, serialize_job
+from app.ingestion.events import Ticket, parse_event, sales_event_buffer
 import pandas as pd
+import asyncio
+import json
 import io
 
 router = APIRouter()
@@ -27,143 +36,145 @@ async def upload_holidays(
     if not all(col in df.columns for col in required_cols):
         raise HTTPException(status_code=400, detail=f"Missing columns: {required_cols}")
         
-    results = {"added": 0, "errors": []}
-    
-    for index, row in df.iterrows():
-        try:
-            d = pd.to_datetime(row['date']).date()
-            
-            # Check duplicate
-            exists = crud.crud_holiday.get_holiday_by_date_locale(db, d, str(row['locale_name']))
-            if exists:
-                continue
-                
-            obj_in = HolidayCreate(
-                date=d,
-                type=str(row['type']),
-                locale=str(row['locale']),
-                locale_name=str(row['locale_name']),
-                description=str(row['description']),
-                transferred=bool(row['transferred'])
-            )
-            crud.crud_holiday.create_holiday(db, obj_in)
-            results["added"] += 1
-        except Exception as e:
-            results["errors"].append(f"Row {index}: {e}")
-            
-    return results
+    # Vectorized parsing, then one multi-row INSERT ... ON CONFLICT DO NOTHING per batch
+    records, errors = crud.crud_holiday.records_from_dataframe(df)
+    try:
+        added = crud.crud_holiday.bulk_upsert_holidays(db, records)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error saving holidays: {e}")
+
+    return {"added": added, "skipped": len(records) - added, "errors": errors}
 
 @router.post("/upload")
-async def upload_sales_data(
+def upload_sales_data(
     file: UploadFile = File(...),
+    sheets: Optional[str] = Query(None, description="Comma-separated sheet names or 0-based indexes (Excel only; default: first sheet)"),
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1000, le=500000),
+    force: bool = Query(False, description="Ingest again even if this exact file was already ingested"),
     current_user: models.user.User = Depends(deps.get_current_manager_user),
     db: Session = Depends(deps.get_db)
 ):
-    if file.filename.endswith('.csv'):
-        contents = await file.read()
-        try:
-             df = pd.read_csv(io.StringIO(contents.decode('utf-8')))
-        except Exception as e:
-             raise HTTPException(status_code=400, detail=f"Error reading CSV file: {str(e)}")
-    elif file.filename.endswith(('.xls', '.xlsx')):
-        contents = await file.read()
-        try:
-             df = pd.read_excel(io.BytesIO(contents))
-        except Exception as e:
-             raise HTTPException(status_code=400, detail=f"Error reading Excel file: {str(e)}")
-    else:
-        raise HTTPException(status_code=400, detail="Invalid file format. Please upload a CSV or Excel file.")
+    """
+    Stream a CSV, Excel, Parquet or Arrow IPC sales file through the chunked ingestion
+    pipeline. The file is read chunk by chunk from the spooled upload (Excel via openpyxl
+    read-only mode, columnar files by record batch), so memory stays bounded by chunk_size;
+    each chunk is committed on its own together with the job checkpoint.
+    Uploads are identified by content hash: an already ingested file is rejected with 409,
+    and re-uploading a file whose ingestion failed resumes after its last committed chunk.
+    """
+    selected = [s.strip() for s in sheets.split(",") if s.strip()] if sheets else None
+    try:
+        results = run_sales_ingestion(db, file.filename, file.file, sheets=selected, chunk_size=chunk_size,
+                                      force=force, requested_by=current_user.email)
+        alert_evaluator.invalidate()
+        return results
+    except DuplicateUpload as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except IngestionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    if df.empty:
-         raise HTTPException(status_code=400, detail="The uploaded file is empty.")
+@router.get("/jobs")
+def list_ingestion_jobs(
+    status: Optional[str] = None,
+    skip: int = 0,
+    limit: int = Query(20, le=100),
+    current_user: models.user.User = Depends(deps.get_current_manager_user),
+    db: Session = Depends(deps.get_db)
+):
+    return [serialize_job(job) for job in crud.crud_ingestion.get_jobs(db, status=status, skip=skip, limit=limit)]
 
-    # Basic validation of columns
-    required_columns = ['date', 'sku', 'store_id', 'quantity']
-    if not all(col in df.columns for col in required_columns):
-         raise HTTPException(status_code=400, detail=f"Missing required columns: {required_columns}")
+@router.get("/jobs/{job_id}")
+def get_ingestion_job(
+    job_id: int,
+    current_user: models.user.User = Depends(deps.get_current_manager_user),
+    db: Session = Depends(deps.get_db)
+):
+    job = crud.crud_ingestion.get_job(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return serialize_job(job)
 
-    results = {"added_rows": 0, "skipped_rows": 0, "errors": []}
-    
-    for index, row in df.iterrows():
-        try:
-            # Data Type Validation
-            try:
-                qty = int(row['quantity'])
-                if qty < 0: raise ValueError
-            except (ValueError, TypeError):
-                 results["errors"].append(f"Row {index}: Invalid quantity '{row.get('quantity')}'")
-                 continue
-            
-            try:
-                row_date = pd.to_datetime(row['date']).date()
-            except Exception:
-                 results["errors"].append(f"Row {index}: Invalid date format '{row.get('date')}'")
-                 continue
+@router.post("/upload/sheets")
+def list_upload_sheets(
+    file: UploadFile = File(...),
+    current_user: models.user.User = Depends(deps.get_current_manager_user)
+):
+    """Sheet names of an .xlsx workbook, for choosing 'sheets' on /upload."""
+    if not file.filename.lower().endswith('.xlsx'):
+        raise HTTPException(status_code=400, detail="Only .xlsx workbooks have selectable sheets.")
+    try:
+        return {"sheets": list_excel_sheets(file.file)}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error reading Excel file: {e}")
 
-            # 1. Handle Product
-            product = crud.crud_sales.get_product_by_sku(db, sku=str(row['sku']))
-            if not product:
-                # Handle possible NaN for optional fields
-                category = row.get('category')
-                if pd.isna(category): category = None
-                
-                price = row.get('price')
-                if pd.isna(price): 
-                    price = None
-                else:
-                    try:
-                         price = float(price)
-                         if price < 0: raise ValueError
-                    except:
-                         price = None # Default to None if invalid
+@router.post("/events")
+async def ingest_sales_events(
+    request: Request,
+    wait: bool = Query(True, description="Respond once the events are committed (otherwise as soon as they are buffered)"),
+    current_user: models.user.User = Depends(deps.get_current_manager_user)
+):
+    """
+    Point-of-sale events as NDJSON, one JSON object per line (see events.parse_event). The body
+    is read as a stream and each event is handed to the shared micro-batch buffer, which writes
+    SalesData, daily rollups and stock levels in one transaction per batch. When the buffer is
+    full the request waits for space (back-pressure) and gives up with 503 after
+    EVENT_ENQUEUE_TIMEOUT; events accepted before that are still written.
+    With wait=false the response only confirms buffering: buffered events are lost if the
+    process dies before the next flush.
+    """
+    loop = asyncio.get_running_loop()
+    ticket = Ticket()
+    received = accepted = invalid = 0
+
+    async def enqueue(line: bytes) -> bool:
+        nonlocal received, accepted, invalid
+        if not line.strip():
+            return True
+        received += 1
+        try:
+            event = parse_event(json.loads(line))
+        except ValueError as e:
+            invalid += 1
+            ticket.error(f"line {received}: {e}")
+            return True
+        deadline = loop.time() + settings.EVENT_ENQUEUE_TIMEOUT
+        while not sales_event_buffer.offer(event, ticket):
+            if loop.time() >= deadline:
+                return False
+            await asyncio.sleep(0.01)
+        accepted += 1
+        return True
 
-                product_in = ProductCreate(
-                    sku=str(row['sku']),
-                    category=category,
-                    price=price
-                )
-                product = crud.crud_sales.create_product(db, product_in)
-            
-            # 2. Handle Store
-            store = crud.crud_sales.get_store_by_store_id(db, store_id=str(row['store_id']))
-            if not store:
-                region = row.get('region')
-                if pd.isna(region): region = None
-                
-                store_in = StoreCreate(
-                    store_id=str(row['store_id']),
-                    region=region
-                )
-                store = crud.crud_sales.create_store(db, store_in)
-            
-            # 3. Handle Sales Data (Check for duplicates)
-            existing_sale = crud.crud_sales.get_sales_data_detail(db, date=row_date, sku_id=product.id, store_id=store.id)
-            if existing_sale:
-                results["skipped_rows"] += 1
-                continue
+    def summary() -> dict:
+        return {
+            "received": received,
+            "accepted": accepted,
+            "invalid": invalid,
+            "committed": ticket.committed,
+            "rejected": ticket.rejected,
+            "failed": ticket.failed,
+            "pending": ticket.pending,
+            "errors": ticket.errors,
+            "buffer_depth": sales_event_buffer.depth
+        }
 
-            # Handle promotion column safely
-            on_promo = False
-            if 'onpromotion' in row:
-                try:
-                    # Handle various truthy values (1, 'True', 'true', '1')
-                    val = str(row['onpromotion']).lower()
-                    on_promo = val in ['1', 'true', 'yes', '1.0']
-                except:
-                    on_promo = False
+    tail = b""
+    async for block in request.stream():
+        lines = (tail + block).split(b"\n")
+        tail = lines.pop()
+        for line in lines:
+            if not await enqueue(line):
+                return JSONResponse(status_code=503, content=summary(), headers={"Retry-After": "1"})
+    if not await enqueue(tail):
+        return JSONResponse(status_code=503, content=summary(), headers={"Retry-After": "1"})
 
-            sales_in = SalesDataCreate(
-                date=row_date,
-                quantity=qty,
-                sku=str(row['sku']),
-                store_id=str(row['store_id']),
-                onpromotion=on_promo
-            )
-            crud.crud_sales.create_sales_data(db, sales_in, product.id, store.id)
-            results["added_rows"] += 1
-            
-        except Exception as e:
-            results["errors"].append(f"Row {index}: Unexpected error: {str(e)}")
-            continue
+    if wait:
+        deadline = loop.time() + settings.EVENT_COMMIT_TIMEOUT
+        while ticket.pending > 0 and loop.time() < deadline:
+            await asyncio.sleep(0.01)
+    return JSONResponse(status_code=202 if ticket.pending > 0 else 200, content=summary())
 
-    return results
+@router.get("/events/stats")
+def sales_event_stats(current_user: models.user.User = Depends(deps.get_current_manager_user)):
+    return dict(sales_event_buffer.stats, buffer_depth=sales_event_buffer.depth)
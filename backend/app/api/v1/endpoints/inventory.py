@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from app.api import deps
 from app import models
+from app.crud import crud_dashboard
 from typing import List, Optional
 from pydantic import BaseModel
 
@@ -80,7 +81,7 @@ def create_product(item_in: ProductCreate, db: Session = Depends(deps.get_db)):
     inventory = db.query(models.StoreInventory).filter(
         models.StoreInventory.product_id == product.id,
         models.StoreInventory.store_id == item_in.store_id
-    ).first()
+    ).with_for_update().first()
 
     if inventory:
         # Update existing inventory
@@ -98,6 +99,7 @@ def create_product(item_in: ProductCreate, db: Session = Depends(deps.get_db)):
         )
         db.add(inventory)
     
+    crud_dashboard.publish_stock_counts(db)
     db.commit()
     db.refresh(inventory)
     
@@ -130,15 +132,21 @@ class ProductUpdate(BaseModel):
 
 @router.put("/{item_id}", response_model=InventoryItem)
 def update_inventory_item(item_id: int, item_in: ProductUpdate, db: Session = Depends(deps.get_db)):
-    inventory = db.query(models.StoreInventory).filter(models.StoreInventory.id == item_id).first()
+    inventory = db.query(models.StoreInventory).filter(models.StoreInventory.id == item_id).with_for_update().first()
     if not inventory:
         raise HTTPException(status_code=404, detail="Inventory item not found")
     
+    was_in_stock = (inventory.quantity_on_hand or 0) > 0
     if item_in.quantity is not None:
         inventory.quantity_on_hand = item_in.quantity
     if item_in.threshold is not None:
         inventory.low_stock_threshold = item_in.threshold
-        
+
+    crud_dashboard.publish_stock_counts(db)
+    if was_in_stock and inventory.quantity_on_hand == 0:
+        crud_dashboard.publish_notification(
+            db, f"{inventory.product.sku} is out of stock at store {inventory.store.store_id}.", level="warning"
+        )
     db.commit()
     db.refresh(inventory)
     
@@ -162,11 +170,12 @@ def update_inventory_item(item_id: int, item_in: ProductUpdate, db: Session = De
 
 @router.delete("/{item_id}")
 def delete_inventory_item(item_id: int, db: Session = Depends(deps.get_db)):
-    inventory = db.query(models.StoreInventory).filter(models.StoreInventory.id == item_id).first()
+    inventory = db.query(models.StoreInventory).filter(models.StoreInventory.id == item_id).with_for_update().first()
     if not inventory:
         raise HTTPException(status_code=404, detail="Inventory item not found")
     
     db.delete(inventory)
+    crud_dashboard.publish_stock_counts(db)
     db.commit()
     return {"message": "Inventory item deleted successfully"}
 
@@ -1,43 +1,105 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from sqlalchemy.orm import Session
+from typing import Optional
 from app.api import deps
 from app.crud import crud_sales
-import pandas as pd
-import numpy as np
+from app.db.session import SessionLocal
+from app.core.data_quality_manager import data_quality_manager
 
 from app import models
 
 router = APIRouter()
 
+def background_data_quality_task(job_id: int, fix: bool, batch_size: int):
+    """
+    Run the full-table scan with its own DB session. Progress is recorded through a second
+    session, so job updates are committed independently of the scan's transaction.
+    """
+    from app.ml.data_quality import run_data_quality_scan
+
+    db = SessionLocal()
+    job_db = SessionLocal()
+    try:
+        report = run_data_quality_scan(
+            db, fix=fix, batch_size=batch_size,
+            progress=lambda stage, p: data_quality_manager.update_progress(job_db, job_id, stage, p)
+        )
+        data_quality_manager.complete_job(job_db, job_id, report)
+    except Exception as e:
+        db.rollback()
+        job_db.rollback()
+        data_quality_manager.fail_job(job_db, job_id, str(e))
+    finally:
+        db.close()
+        job_db.close()
+
 @router.post("/clean")
 def clean_data(
+    background_tasks: BackgroundTasks,
+    fix: bool = False,
+    batch_size: int = 100000,
     current_user: models.user.User = Depends(deps.get_current_manager_user),
     db: Session = Depends(deps.get_db)
 ):
     """
-    Trigger a data preprocessing pipeline.
-    1. Identifies missing values.
-    2. Imputes missing sales with 0 (assuming closed days).
-    3. Detects outliers (e.g., negative sales).
-    """
-    # Fetch all data (In real world, fetch in batches or use SQL)
-    sales = crud_sales.get_sales_data(db, limit=10000)
-    if not sales:
-         return {"message": "No data to process."}
-
-    df = pd.DataFrame([{"id": s.id, "quantity": s.quantity} for s in sales])
-    
-    report = {
-        "processed_rows": len(df),
-        "actions_taken": [],
-        "outliers_detected": 0
+    Start a data-quality scan over the entire SalesData table in the background.
+    Reports negative quantities, gaps per series, duplicates, per-SKU IQR outliers and orphaned foreign keys.
+    fix: If true, also applies bulk fixes (negatives -> 0, orphans deleted); duplicates are only reported.
+    Only one scan runs at a time across all API processes.
+    Poll GET /preprocessing/clean/{job_id} for progress and the report.
+    """
+    if batch_size < 1000:
+        raise HTTPException(status_code=400, detail="batch_size must be at least 1000.")
+
+    job = data_quality_manager.start_job(db, fix=fix, batch_size=batch_size, requested_by=current_user.email)
+    if job is None:
+        raise HTTPException(status_code=409, detail="A data-quality scan is already in progress.")
+    background_tasks.add_task(background_data_quality_task, job.id, fix, batch_size)
+
+    return {
+        "message": "Data-quality scan started",
+        "job_id": job.id,
+        "status": "Processing",
+        "fix": fix
     }
 
-    # Example Check: Negative Sales
-    negative_sales = df[df['quantity'] < 0]
-    if not negative_sales.empty:
-        report["outliers_detected"] = len(negative_sales)
-        report["actions_taken"].append("Flagged negative sales.")
-        # Logic to fix them could go here
-    
-    return report
+@router.get("/clean/{job_id}")
+def get_clean_status(
+    job_id: int,
+    current_user: models.user.User = Depends(deps.get_current_manager_user),
+    db: Session = Depends(deps.get_db)
+):
+    """
+    Progress (percent and current stage) and, once finished, the report of a data-quality scan.
+    """
+    job = data_quality_manager.get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Data-quality job not found.")
+    return job
+
+@router.get("/outlier-thresholds")
+def get_outlier_thresholds(
+    sku: Optional[str] = None,
+    store_id: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    current_user: models.user.User = Depends(deps.get_current_analyst_user),
+    db: Session = Depends(deps.get_db)
+):
+    """
+    Per-series capping thresholds recorded during the last training data preparation.
+    The same thresholds are applied to per-SKU forecasts, so monitoring can flag values outside them.
+    """
+    rows = crud_sales.get_outlier_thresholds(db, sku=sku, store_id=store_id, skip=skip, limit=limit)
+    return [
+        {
+            "sku": r.sku,
+            "store_id": r.store_id,
+            "lower": r.lower,
+            "upper": r.upper,
+            "method": r.method,
+            "observations": r.observations,
+            "computed_at": r.computed_at
+        }
+        for r in rows
+    ]
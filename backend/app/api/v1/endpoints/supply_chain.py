@@ -1,7 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from app.api import deps
 from app import models
+from app.core.replenishment import replenishment_engine, serialize_plan
+from app.crud import crud_replenishment, crud_supply_chain
+from app.models.supply_chain import POStatus
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -12,13 +16,19 @@ class SupplierCreate(BaseModel):
     contact: str
     email: str
 
+class POLineCreate(BaseModel):
+    product_id: int
+    store_id: int
+    quantity: int
+    unit_price: Optional[float] = None # defaults to the product's price
+
 class POCreate(BaseModel):
     supplier_id: int
     po_number: str
-    total_amount: float
+    total_amount: Optional[float] = None # defaults to the sum of the lines
+    lines: List[POLineCreate] = []
 
 # Existing Read Schemas
-from typing import List
 class SupplierRead(BaseModel):
     id: int
     name: str
@@ -102,12 +112,29 @@ def get_orders(db: Session = Depends(deps.get_db)):
 from datetime import date
 @router.post("/orders", response_model=PORead)
 def create_order(po_in: POCreate, db: Session = Depends(deps.get_db)):
+    lines = []
+    if po_in.lines:
+        prices = dict(db.query(models.Product.id, models.Product.price)
+                      .filter(models.Product.id.in_([l.product_id for l in po_in.lines])).all())
+        missing = sorted({l.product_id for l in po_in.lines} - set(prices))
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Unknown products: {missing}")
+        for l in po_in.lines:
+            unit_price = l.unit_price if l.unit_price is not None else (prices[l.product_id] or 0.0)
+            lines.append(models.PurchaseOrderLine(product_id=l.product_id, store_id=l.store_id, quantity=l.quantity,
+                                                  unit_price=unit_price, amount=round(l.quantity * unit_price, 2)))
+    total_amount = po_in.total_amount
+    if total_amount is None:
+        if not lines:
+            raise HTTPException(status_code=400, detail="Provide total_amount or order lines.")
+        total_amount = round(sum(line.amount for line in lines), 2)
     po = models.PurchaseOrder(
         po_number=po_in.po_number,
         supplier_id=po_in.supplier_id,
-        total_amount=po_in.total_amount,
+        total_amount=total_amount,
         order_date=date.today(),
-        status="Pending"
+        status="Pending",
+        lines=lines
     )
     try:
         db.add(po)
@@ -140,3 +167,72 @@ def get_shipments(db: Session = Depends(deps.get_db)):
         }
         for s in shipments
     ]
+
+@router.get("/orders/{po_id}/lines")
+def get_order_lines(po_id: int, db: Session = Depends(deps.get_db)):
+    po = db.query(models.PurchaseOrder).filter(models.PurchaseOrder.id == po_id).first()
+    if not po:
+        raise HTTPException(status_code=404, detail="Purchase order not found")
+    return [
+        {
+            "id": l.id,
+            "product_id": l.product_id,
+            "store_id": l.store_id,
+            "quantity": l.quantity,
+            "unit_price": l.unit_price,
+            "amount": l.amount
+        }
+        for l in po.lines
+    ]
+
+@router.post("/orders/{po_id}/approve", response_model=PORead)
+def approve_order(
+    po_id: int,
+    current_user: models.user.User = Depends(deps.get_current_manager_user),
+    db: Session = Depends(deps.get_db)
+):
+    """Turn a replenishment draft into a Pending order; the next replenishment run counts it as on order."""
+    po = db.query(models.PurchaseOrder).filter(models.PurchaseOrder.id == po_id).first()
+    if not po:
+        raise HTTPException(status_code=404, detail="Purchase order not found")
+    if po.status != POStatus.DRAFT:
+        raise HTTPException(status_code=400, detail=f"Only draft orders can be approved (status is {po.status}).")
+    po = crud_supply_chain.update_purchase_order_status(db, po_id, POStatus.PENDING.value)
+    return {
+        "id": po.id,
+        "po_number": po.po_number,
+        "supplier_name": po.supplier.name,
+        "date": str(po.order_date),
+        "total_amount": po.total_amount,
+        "status": po.status
+    }
+
+@router.get("/replenishment")
+def get_replenishment_plan(
+    store_id: Optional[int] = None,
+    product_id: Optional[int] = None,
+    only_orders: bool = Query(True, description="Only rows with a suggested order quantity"),
+    skip: int = 0,
+    limit: int = Query(100, le=1000),
+    current_user: models.user.User = Depends(deps.get_current_analyst_user),
+    db: Session = Depends(deps.get_db)
+) -> Any:
+    """
+    Reorder point, safety stock and suggested order quantity per inventory row from the last
+    replenishment run, largest suggestions first.
+    """
+    plans = crud_replenishment.get_plans(db, store_id=store_id, product_id=product_id, only_orders=only_orders,
+                                         skip=skip, limit=limit)
+    return {
+        "computed_at": crud_replenishment.get_last_computed_at(db),
+        "last_run": replenishment_engine.last_run,
+        "items": [serialize_plan(plan) for plan in plans]
+    }
+
+@router.post("/replenishment/run")
+def run_replenishment(
+    current_user: models.user.User = Depends(deps.get_current_manager_user),
+    db: Session = Depends(deps.get_db)
+) -> Any:
+    """Recompute every reorder point and replace the draft purchase orders now instead of waiting for the schedule."""
+    return replenishment_engine.run(db)
@@ -1,62 +1,97 @@
-from fastapi import APIRouter, Depends, BackgroundTasks, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.api import deps
 from app import models
-from app.ml.training import train_model
-from app.core.training_manager import training_manager
+from app.core.training_manager import training_manager, TrainingQueueFull
 
 router = APIRouter()
 
-def background_training_task(auto_tune: bool = False):
-    """
-    Wrapper to run training in background and update manager status.
-    """
-    try:
-        training_manager.update_status("Training in progress...")
-        metrics = train_model(auto_tune=auto_tune)
-        
-        if metrics:
-            training_manager.complete_training(metrics)
-        else:
-            training_manager.fail_training("Model failed to train or evaluate.")
-            
-    except Exception as e:
-        training_manager.fail_training(str(e))
-
 @router.post("/train")
 def trigger_training(
-    background_tasks: BackgroundTasks,
     auto_tune: bool = False,
+    incremental: bool = False,
     current_user: models.user.User = Depends(deps.get_current_manager_user),
     db: Session = Depends(deps.get_db)
 ):
     """
-    Trigger the ML Model training process in the background.
+    Queue an ML Model training job. Jobs are picked up by a training worker in order.
     auto_tune: If true, performs hyperparameter optimization (Long running).
+    incremental: If true, warm-starts from the current model instead of fitting from scratch.
     """
-    if training_manager.is_training:
-        raise HTTPException(status_code=409, detail="A training job is already in progress.")
+    try:
+        job = training_manager.enqueue(db, auto_tune=auto_tune, incremental=incremental,
+                                       requested_by=current_user.email)
+    except TrainingQueueFull as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
-    job_id = training_manager.start_training()
-    background_tasks.add_task(background_training_task, auto_tune)
-    
     return {
-        "message": "Training job started",
-        "job_id": job_id,
-        "status": "Processing",
-        "auto_tune": auto_tune
+        "message": "Training job queued",
+        "job_id": job.id,
+        "status": job.status,
+        "auto_tune": auto_tune,
+        "incremental": incremental
     }
 
 @router.get("/status")
-def get_training_status():
+def get_training_status(
+    job_id: Optional[int] = None,
+    db: Session = Depends(deps.get_db)
+):
+    """
+    Check status of a job (default: the current or last training job).
+    Includes progress percentage, current stage and per-stage timings.
+    """
+    status = training_manager.get_status(db, job_id)
+    if job_id and status["job_id"] is None:
+        raise HTTPException(status_code=404, detail="Training job not found.")
+    return status
+
+@router.get("/jobs")
+def get_training_history(
+    status: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 20,
+    current_user: models.user.User = Depends(deps.get_current_analyst_user),
+    db: Session = Depends(deps.get_db)
+):
     """
-    Check status of the current or last training job.
+    History of training jobs (newest first) with durations, stage timings and results.
     """
+    return training_manager.history(db, status=status, skip=skip, limit=limit)
+
+@router.post("/jobs/{job_id}/cancel")
+def cancel_training_job(
+    job_id: int,
+    current_user: models.user.User = Depends(deps.get_current_manager_user),
+    db: Session = Depends(deps.get_db)
+):
+    """
+    Cancel a training job. Queued jobs are removed from the queue; a running job's training process
+    is terminated by its worker within one poll interval and nothing it produced is kept.
+    """
+    job = training_manager.cancel(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Training job not found.")
+    return training_manager.serialize(db, job)
+
+@router.get("/schedule")
+def get_retrain_schedule(
+    current_user: models.user.User = Depends(deps.get_current_analyst_user),
+    db: Session = Depends(deps.get_db)
+):
+    """
+    Scheduled retraining configuration, new rows since the last model's data and whether a retrain is due now.
+    """
+    from app.core.config import settings
+    from app.core.training_scheduler import retrain_scheduler
+
     return {
-        "is_training": training_manager.is_training,
-        "status": training_manager.status,
-        "job_id": training_manager.job_id,
-        "start_time": training_manager.start_time,
-        "result": training_manager.last_result,
-        "error": training_manager.error
+        "enabled": settings.RETRAIN_SCHEDULE_ENABLED,
+        "new_rows_threshold": settings.RETRAIN_NEW_ROWS_THRESHOLD,
+        "incremental": settings.RETRAIN_INCREMENTAL,
+        "cron": settings.RETRAIN_CRON or None,
+        "min_interval_minutes": settings.RETRAIN_MIN_INTERVAL_MINUTES,
+        "current": retrain_scheduler.evaluate(db, dry_run=True),
+        "last_decision": retrain_scheduler.last_decision
     }
@@ -0,0 +1,134 @@
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy.orm import Session
+from app.core.alert_rules import AlertRule, RuleContext, default_rules
+from app.core.config import settings
+from app.crud import crud_alert, crud_dashboard, crud_supply_chain
+from app.db.locks import ALERT_RULE_RUN, advisory_xact_lock
+from app.db.session import SessionLocal
+from app.models.alert import Alert, AlertSeverity
+
+class AlertEngine:
+    """
+    Evaluates every registered AlertRule in one batch: each rule runs its set-based query,
+    detections are upserted into the Alert table by dedup_key, and the rule's open alerts
+    that were not detected again are resolved. Each rule commits on its own, so a failing
+    rule leaves its previous alerts in place without affecting the others. Rule evaluations
+    are serialized across processes by an advisory lock and stamped once they hold it, so a
+    concurrent batch never resolves alerts with an older seen_at than the one that detected them.
+    """
+    def __init__(self, rules: Optional[List[AlertRule]] = None):
+        self.rules: Dict[str, AlertRule] = {}
+        for rule in rules if rules is not None else default_rules():
+            self.register(rule)
+        self.last_run: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    def register(self, rule: AlertRule):
+        self.rules[rule.name] = rule
+
+    def context(self, db: Session, today: Optional[date] = None) -> RuleContext:
+        observed = crud_supply_chain.get_average_lead_time_days(db)
+        return RuleContext(
+            today=today or date.today(),
+            lead_time_days=observed if observed else settings.ALERT_LEAD_TIME_DAYS,
+            lead_time_source="observed" if observed else "default"
+        )
+
+    def run(self, db: Session, rules: Optional[List[str]] = None, today: Optional[date] = None) -> Dict[str, Any]:
+        with self._lock:
+            started_at = datetime.now()
+            started = time.perf_counter()
+            ctx = self.context(db, today)
+            summary: Dict[str, Any] = {"started_at": started_at, "lead_time_days": round(ctx.lead_time_days, 1),
+                                       "lead_time_source": ctx.lead_time_source, "rules": {}}
+            for name in rules or list(self.rules):
+                summary["rules"][name] = self._run_rule(db, self.rules[name], ctx)
+            summary["seconds"] = round(time.perf_counter() - started, 3)
+            self.last_run = summary
+            return summary
+
+    def _run_rule(self, db: Session, rule: AlertRule, ctx: RuleContext) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            advisory_xact_lock(db, ALERT_RULE_RUN)
+            seen_at = datetime.now()
+            previously_open = crud_alert.get_open_keys(db, rule.name)
+            alerts = {}
+            for row in db.execute(rule.query(ctx)):
+                alert = rule.to_alert(row, ctx)
+                alerts[alert["dedup_key"]] = alert
+            crud_alert.upsert_alerts(db, list(alerts.values()), seen_at)
+            resolved = crud_alert.resolve_missing(db, rule.name, seen_at)
+            opened = [a for key, a in alerts.items() if key not in previously_open]
+            if opened:
+                high = sum(1 for a in opened if a["severity"] == AlertSeverity.HIGH)
+                crud_dashboard.publish_notification(
+                    db, f"{len(opened)} new {rule.title} alert(s)" + (f", {high} high severity" if high else "") + ".",
+                    level="warning" if high else "info"
+                )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"(x) Alert rule '{rule.name}' failed: {e}")
+            return {"error": str(e), "seconds": round(time.perf_counter() - started, 3)}
+        return {"detected": len(alerts), "opened": len(opened), "resolved": resolved,
+                "seconds": round(time.perf_counter() - started, 3)}
+
+    def describe(self) -> List[Dict[str, str]]:
+        return [{"name": rule.name, "title": rule.title, "description": rule.description} for rule in self.rules.values()]
+
+class AlertScheduler:
+    """Runs the alert engine batch in the API process every ALERT_EVALUATION_INTERVAL seconds."""
+    def __init__(self, engine: AlertEngine, interval: float = settings.ALERT_EVALUATION_INTERVAL):
+        self.engine = engine
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="alert-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def run_forever(self):
+        print(f"(bell) Alert engine evaluating {len(self.engine.rules)} rules every {self.interval}s")
+        while not self._stop.is_set():
+            db = SessionLocal()
+            try:
+                summary = self.engine.run(db)
+                opened = sum(r.get("opened", 0) for r in summary["rules"].values())
+                resolved = sum(r.get("resolved", 0) for r in summary["rules"].values())
+                print(f"(bell) Alert batch: {opened} opened, {resolved} resolved in {summary['seconds']}s")
+            except Exception as e:
+                print(f"(x) Alert batch failed: {e}")
+            finally:
+                db.close()
+            self._stop.wait(self.interval)
+
+def serialize_alert(alert: Alert) -> Dict[str, Any]:
+    return {
+        "id": alert.id,
+        "rule": alert.rule,
+        "severity": alert.severity,
+        "status": alert.status,
+        "message": alert.message,
+        "details": alert.details or {},
+        "sku_id": alert.sku_id,
+        "store_id": alert.store_id,
+        "shipment_id": alert.shipment_id,
+        "occurrences": alert.occurrences,
+        "first_seen_at": alert.first_seen_at,
+        "last_seen_at": alert.last_seen_at,
+        "resolved_at": alert.resolved_at
+    }
+
+alert_engine = AlertEngine()
+alert_scheduler = AlertScheduler(alert_engine)
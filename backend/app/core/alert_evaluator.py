@@ -0,0 +1,58 @@
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional
+from app.core.config import settings
+from app.crud import crud_sales
+from app.db.session import SessionLocal
+
+class AlertEvaluator:
+    """
+    Computes the system alert facts (sales data present, stores without recent sales) for
+    /alerts and /dashboard/notifications, and caches them for ALERT_CACHE_TTL_SECONDS.
+    Concurrent requests after expiry wait for a single evaluation instead of each running it.
+    """
+    _instance = None
+
+    def __init__(self, ttl: float = settings.ALERT_CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self._facts: Optional[Dict[str, Any]] = None
+        self._expires = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = AlertEvaluator()
+        return cls._instance
+
+    def invalidate(self):
+        self._expires = 0.0
+
+    def facts(self) -> Dict[str, Any]:
+        if self._facts is not None and time.monotonic() < self._expires:
+            return self._facts
+        with self._lock:
+            if self._facts is None or time.monotonic() >= self._expires:
+                db = SessionLocal()
+                try:
+                    self._facts = self.evaluate(db)
+                finally:
+                    db.close()
+                self._expires = time.monotonic() + self.ttl
+            return self._facts
+
+    @staticmethod
+    def evaluate(db, today: Optional[date] = None) -> Dict[str, Any]:
+        today = today or date.today()
+        days = settings.ALERT_INACTIVE_STORE_DAYS
+        inactive, total = crud_sales.get_inactive_store_counts(db, today - timedelta(days=days))
+        return {
+            "has_sales": crud_sales.has_sales(db),
+            "inactive_stores": inactive,
+            "total_stores": total,
+            "inactive_days": days,
+            "evaluated_at": datetime.now()
+        }
+
+alert_evaluator = AlertEvaluator.get_instance()
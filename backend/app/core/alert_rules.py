@@ -0,0 +1,221 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, Dict, List
+from sqlalchemy import Select, and_, func, or_, select
+from app.core.config import settings
+from app.models.alert import AlertSeverity
+from app.models.inventory import StoreInventory
+from app.models.sales import DailySalesRollup, Product, SalesData, Store
+from app.models.supply_chain import PurchaseOrder, Shipment, ShipmentStatus
+
+@dataclass
+class RuleContext:
+    """Inputs shared by every rule of one batch."""
+    today: date
+    lead_time_days: float
+    lead_time_source: str # "observed" (PO -> shipment ETA history) or "default"
+
+class AlertRule(ABC):
+    """
+    One alert condition. query() compiles it to a single set-based SELECT whose rows are the
+    subjects currently matching; to_alert() turns a row into an Alert dict with a dedup_key
+    that stays stable while the condition persists. Register custom rules on the engine.
+    """
+    name: str = ""
+    title: str = ""
+    description: str = ""
+
+    @abstractmethod
+    def query(self, ctx: RuleContext) -> Select:
+        ...
+
+    @abstractmethod
+    def to_alert(self, row: Any, ctx: RuleContext) -> Dict:
+        ...
+
+def trailing_demand(end_day: date, window_days: int = settings.ALERT_DEMAND_WINDOW_DAYS):
+    """
+    Expected daily demand per (sku, store) as a trailing average: the mean daily quantity over
+    the window_days before end_day, from DailySalesRollup (days without sales count as zero).
+    A plain baseline that stays one SQL subquery; the model forecasts (reorder points) come
+    from the replenishment engine.
+    """
+    start = end_day - timedelta(days=window_days)
+    return (
+        select(
+            DailySalesRollup.sku_id,
+            DailySalesRollup.store_id,
+            (func.sum(DailySalesRollup.quantity) * 1.0 / window_days).label("daily_demand")
+        )
+        .where(DailySalesRollup.date >= start, DailySalesRollup.date < end_day)
+        .group_by(DailySalesRollup.sku_id, DailySalesRollup.store_id)
+        .subquery("demand")
+    )
+
+class StockBelowLeadTimeDemand(AlertRule):
+    name = "stock_below_demand"
+    title = "stock below lead-time demand"
+    description = "Stock on hand is less than the trailing average daily demand times the replenishment lead time."
+
+    def query(self, ctx: RuleContext) -> Select:
+        demand = trailing_demand(ctx.today)
+        on_hand = func.coalesce(StoreInventory.quantity_on_hand, 0)
+        return (
+            select(StoreInventory.id, StoreInventory.product_id, StoreInventory.store_id, on_hand.label("on_hand"),
+                   demand.c.daily_demand, Product.sku, Store.store_id.label("store_code"))
+            .join(demand, and_(demand.c.sku_id == StoreInventory.product_id,
+                                 demand.c.store_id == StoreInventory.store_id))
+            .join(Product, Product.id == StoreInventory.product_id)
+            .join(Store, Store.id == StoreInventory.store_id)
+            .where(demand.c.daily_demand > 0, on_hand < demand.c.daily_demand * ctx.lead_time_days)
+        )
+
+    def to_alert(self, row, ctx):
+        cover_days = row.on_hand / row.daily_demand
+        needed = row.daily_demand * ctx.lead_time_days
+        return {
+            "dedup_key": f"{self.name}:{row.id}",
+            "rule": self.name,
+            "severity": AlertSeverity.HIGH if cover_days < ctx.lead_time_days / 2 else AlertSeverity.MEDIUM,
+            "message": f"{row.sku} at store {row.store_code}: {row.on_hand} on hand covers {cover_days:.1f} days, "
+                       f"the {ctx.lead_time_days:.0f}-day lead time needs {needed:.0f}.",
+            "details": {"on_hand": row.on_hand, "daily_demand": round(row.daily_demand, 2),
+                        "lead_time_days": round(ctx.lead_time_days, 1), "lead_time_source": ctx.lead_time_source,
+                        "shortfall": round(needed - row.on_hand, 1)},
+            "sku_id": row.product_id,
+            "store_id": row.store_id
+        }
+
+class SalesAnomaly(AlertRule):
+    name = "sales_anomaly"
+    title = "sales anomaly"
+    description = "Yesterday's sales of a series are far above or below its trailing average daily demand."
+
+    def query(self, ctx: RuleContext) -> Select:
+        day = ctx.today - timedelta(days=1)
+        demand = trailing_demand(day)
+        actual = (
+            select(DailySalesRollup.sku_id, DailySalesRollup.store_id, DailySalesRollup.quantity)
+            .where(DailySalesRollup.date == day)
+            .subquery("actual")
+        )
+        quantity = func.coalesce(actual.c.quantity, 0)
+        expected = demand.c.daily_demand
+        min_units = settings.ALERT_ANOMALY_MIN_UNITS
+        return (
+            select(demand.c.sku_id, demand.c.store_id, expected.label("expected"), quantity.label("actual"),
+                   Product.sku, Store.store_id.label("store_code"))
+            .select_from(demand)
+            .outerjoin(actual, and_(actual.c.sku_id == demand.c.sku_id, actual.c.store_id == demand.c.store_id))
+            .join(Product, Product.id == demand.c.sku_id)
+            .join(Store, Store.id == demand.c.store_id)
+            .where(or_(
+                and_(quantity >= expected * settings.ALERT_ANOMALY_SPIKE_RATIO, quantity - expected >= min_units),
+                and_(quantity <= expected * settings.ALERT_ANOMALY_DROP_RATIO, expected - quantity >= min_units)
+            ))
+        )
+
+    def to_alert(self, row, ctx):
+        day = ctx.today - timedelta(days=1)
+        spike = row.actual > row.expected
+        return {
+            "dedup_key": f"{self.name}:{row.sku_id}:{row.store_id}",
+            "rule": self.name,
+            "severity": AlertSeverity.MEDIUM if spike else AlertSeverity.LOW,
+            "message": f"{row.sku} at store {row.store_code} sold {row.actual} on {day}, "
+                       f"{'above' if spike else 'below'} its {settings.ALERT_DEMAND_WINDOW_DAYS}-day average of {row.expected:.1f}/day.",
+            "details": {"date": day.isoformat(), "actual": row.actual, "expected": round(row.expected, 2),
+                        "direction": "spike" if spike else "drop"},
+            "sku_id": row.sku_id,
+            "store_id": row.store_id
+        }
+
+class StalledShipment(AlertRule):
+    name = "stalled_shipment"
+    title = "stalled shipment"
+    description = "A shipment is past its ETA and not arrived or delivered."
+
+    def query(self, ctx: RuleContext) -> Select:
+        return (
+            select(Shipment.id, Shipment.tracking_number, Shipment.eta, Shipment.status, Shipment.carrier,
+                   PurchaseOrder.po_number)
+            .outerjoin(PurchaseOrder, Shipment.purchase_order_id == PurchaseOrder.id)
+            .where(Shipment.eta < ctx.today,
+                   Shipment.status.notin_([ShipmentStatus.ARRIVED.value, ShipmentStatus.DELIVERED.value]))
+        )
+
+    def to_alert(self, row, ctx):
+        days_late = (ctx.today - row.eta).days
+        order = f" (PO {row.po_number})" if row.po_number else ""
+        return {
+            "dedup_key": f"{self.name}:{row.id}",
+            "rule": self.name,
+            "severity": AlertSeverity.HIGH if days_late > 7 else AlertSeverity.MEDIUM,
+            "message": f"Shipment {row.tracking_number}{order} is {days_late} day(s) past its ETA ({row.status}).",
+            "details": {"eta": row.eta.isoformat(), "days_late": days_late, "status": row.status,
+                        "carrier": row.carrier, "po_number": row.po_number},
+            "shipment_id": row.id
+        }
+
+class DeadStock(AlertRule):
+    name = "dead_stock"
+    title = "dead stock"
+    description = "Stock on hand with no sales of the item at that store for ALERT_DEAD_STOCK_DAYS."
+
+    def query(self, ctx: RuleContext) -> Select:
+        cutoff = ctx.today - timedelta(days=settings.ALERT_DEAD_STOCK_DAYS)
+        same_series = and_(SalesData.sku_id == StoreInventory.product_id, SalesData.store_id == StoreInventory.store_id)
+        recent_sale = select(SalesData.id).where(same_series, SalesData.date >= cutoff).exists()
+        last_sold = select(func.max(SalesData.date)).where(same_series).scalar_subquery()
+        return (
+            select(StoreInventory.id, StoreInventory.product_id, StoreInventory.store_id,
+                   StoreInventory.quantity_on_hand, Product.sku, Product.price, Store.store_id.label("store_code"),
+                   last_sold.label("last_sold"))
+            .join(Product, Product.id == StoreInventory.product_id)
+            .join(Store, Store.id == StoreInventory.store_id)
+            .where(StoreInventory.quantity_on_hand > 0, ~recent_sale)
+        )
+
+    def to_alert(self, row, ctx):
+        last_sold = row.last_sold
+        if isinstance(last_sold, str): # SQLite returns MAX(date) as text
+            last_sold = date.fromisoformat(last_sold)
+        value = row.quantity_on_hand * (row.price or 0.0)
+        since = f"since {last_sold}" if last_sold else "ever"
+        return {
+            "dedup_key": f"{self.name}:{row.id}",
+            "rule": self.name,
+            "severity": AlertSeverity.LOW,
+            "message": f"{row.sku} at store {row.store_code}: {row.quantity_on_hand} units ({value:,.2f}) "
+                       f"with no sales {since}.",
+            "details": {"quantity": row.quantity_on_hand, "value": round(value, 2),
+                        "last_sold": last_sold.isoformat() if last_sold else None,
+                        "days_without_sale": (ctx.today - last_sold).days if last_sold else None},
+            "sku_id": row.product_id,
+            "store_id": row.store_id
+        }
+
+class InactiveStore(AlertRule):
+    name = "inactive_store"
+    title = "inactive store"
+    description = "A store reported no sales for ALERT_INACTIVE_STORE_DAYS."
+
+    def query(self, ctx: RuleContext) -> Select:
+        cutoff = ctx.today - timedelta(days=settings.ALERT_INACTIVE_STORE_DAYS)
+        recent_sale = select(SalesData.id).where(SalesData.store_id == Store.id, SalesData.date >= cutoff).exists()
+        return select(Store.id, Store.store_id.label("store_code"), Store.region).where(~recent_sale)
+
+    def to_alert(self, row, ctx):
+        days = settings.ALERT_INACTIVE_STORE_DAYS
+        return {
+            "dedup_key": f"{self.name}:{row.id}",
+            "rule": self.name,
+            "severity": AlertSeverity.MEDIUM,
+            "message": f"Store {row.store_code} ({row.region or 'no region'}) has not reported sales in the last {days} days.",
+            "details": {"days": days},
+            "store_id": row.id
+        }
+
+def default_rules() -> List[AlertRule]:
+    return [StockBelowLeadTimeDemand(), SalesAnomaly(), StalledShipment(), DeadStock(), InactiveStore()]
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "IDFS Backend"
@@ -23,6 +23,71 @@ class Settings(BaseSettings):
     # Live Data Simulator
     ENABLE_LIVE_SIMULATOR: bool = True
 
+    # Per-SKU forecasting: max fitted Holt-Winters models kept in memory (LRU)
+    SKU_MODEL_CACHE_SIZE: int = 1024
+
+    # Hierarchical reconciliation (GET /forecasting/reconciled)
+    RECONCILIATION_HISTORY_DAYS: int = 56 # trailing days of daily sales the bottom-level forecasts are fitted on
+    RECONCILIATION_CACHE_TTL_SECONDS: float = 600.0 # reconciled results reused across levels/nodes for this long
+
+    # Training job queue
+    TRAINING_WORKER_EMBEDDED: bool = True # Run a queue worker inside each API process; set False when running training_worker.py
+    TRAINING_MAX_CONCURRENT_JOBS: int = 1
+    TRAINING_QUEUE_MAX: int = 10
+    TRAINING_POLL_INTERVAL: float = 2.0 # seconds
+    TRAINING_JOB_STALE_SECONDS: int = 300 # running jobs without a worker heartbeat for this long are failed
+
+    # Scheduled retraining (runs in the API process)
+    RETRAIN_SCHEDULE_ENABLED: bool = False
+    RETRAIN_NEW_ROWS_THRESHOLD: int = 10000 # new SalesData rows since the last model's data that trigger a retrain
+    RETRAIN_INCREMENTAL: bool = True # row-triggered retrains warm-start from the current model
+    RETRAIN_CRON: str = "0 2 * * *" # full retrain window (minute hour day month weekday); "" disables
+    RETRAIN_MIN_INTERVAL_MINUTES: int = 60 # debounce between scheduled retrains
+    RETRAIN_CHECK_INTERVAL: float = 60.0 # seconds
+
+    # Sales file ingestion
+    INGESTION_USE_COPY: bool = True # PostgreSQL: COPY into a staging table + INSERT ... SELECT merge
+    INGESTION_JOB_STALE_SECONDS: int = 300 # a running upload without a checkpoint for this long may be resumed
+
+    # Data-quality scans (POST /preprocessing/clean)
+    DATA_QUALITY_JOB_STALE_SECONDS: int = 600 # a running data-quality scan without a progress report for this long is failed
+
+    # Point-of-sale event ingestion (POST /ingestion/events)
+    EVENT_BUFFER_MAX: int = 20000 # buffered events per API process before producers are slowed down
+    EVENT_BATCH_SIZE: int = 1000 # events per transaction
+    EVENT_FLUSH_INTERVAL: float = 0.25 # seconds to wait for a batch to fill
+    EVENT_ENQUEUE_TIMEOUT: float = 10.0 # seconds a request may wait for buffer space before 503
+    EVENT_COMMIT_TIMEOUT: float = 30.0 # seconds a request waits for its events to be committed
+
+    # Dashboard live updates (GET /dashboard/stream)
+    DASHBOARD_STREAM_POLL_INTERVAL: float = 1.0 # seconds between outbox polls (one poll per API process, not per viewer)
+    DASHBOARD_STREAM_HEARTBEAT: float = 15.0 # seconds between keep-alive comments on idle streams
+    DASHBOARD_OUTBOX_RETENTION_SECONDS: int = 3600 # published events kept for reconnect replay
+    DASHBOARD_OUTBOX_GAP_SECONDS: float = 10.0 # how long a missing outbox id may still be an uncommitted transaction
+
+    # Alert evaluation shared by /alerts and /dashboard/notifications
+    ALERT_CACHE_TTL_SECONDS: float = 60.0 # evaluated at most once per TTL per API process, however many users poll
+    ALERT_INACTIVE_STORE_DAYS: int = 7
+
+    # Alert engine: all rules evaluated in one scheduled batch, results stored in the Alert table
+    ALERT_ENGINE_ENABLED: bool = True
+    ALERT_EVALUATION_INTERVAL: float = 300.0 # seconds between batches
+    ALERT_DEMAND_WINDOW_DAYS: int = 28 # trailing days averaged into the expected daily demand
+    ALERT_LEAD_TIME_DAYS: float = 7.0 # used when no PO -> shipment ETA history gives a lead time
+    ALERT_ANOMALY_SPIKE_RATIO: float = 3.0 # yesterday's sales >= ratio x trailing average
+    ALERT_ANOMALY_DROP_RATIO: float = 0.2 # yesterday's sales <= ratio x trailing average
+    ALERT_ANOMALY_MIN_UNITS: float = 5.0 # ignore series whose deviation is below this many units
+    ALERT_DEAD_STOCK_DAYS: int = 90
+
+    # Replenishment: reorder points, safety stock and draft purchase orders for every inventory row
+    REPLENISHMENT_CRON: str = "30 2 * * *" # nightly run (minute hour day month weekday); "" disables
+    REPLENISHMENT_CHECK_INTERVAL: float = 60.0 # seconds
+    REPLENISHMENT_HISTORY_DAYS: int = 56 # trailing days of daily sales the per-series forecasts are fitted on
+    REPLENISHMENT_SERVICE_LEVEL: float = 0.95 # probability of not stocking out before the next order arrives
+    REPLENISHMENT_REVIEW_DAYS: float = 7.0 # days between orders for a row; each order covers lead time + this
+    REPLENISHMENT_DEFAULT_SUPPLIER_ID: Optional[int] = None # for products without a supplier; None = suggest only
+    REPLENISHMENT_UPDATE_THRESHOLDS: bool = False # opt-in: every run overwrites low_stock_threshold (manual values too) with the reorder point
+
     class Config:
         case_sensitive = True
         env_file = ".env"
@@ -0,0 +1,129 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+from app.core.config import settings
+from app.crud import crud_dashboard
+from app.db.session import SessionLocal
+from app.models.dashboard import DashboardEvent
+
+PRUNE_EVERY_SECONDS = 60
+SUBSCRIBER_QUEUE_MAX = 1000
+
+def serialize_event(event: DashboardEvent) -> Dict:
+    return {"id": event.id, "kind": event.kind, "payload": event.payload,
+            "created_at": event.created_at.isoformat() if event.created_at else None}
+
+class Subscription:
+    """One /dashboard/stream connection: an asyncio queue fed from the broadcaster thread."""
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue: "asyncio.Queue[Optional[Dict]]" = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_MAX)
+
+    def _put(self, event: Optional[Dict]):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A client this far behind gets disconnected; it reconnects and resyncs from a snapshot
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    def deliver(self, event: Optional[Dict]):
+        self.loop.call_soon_threadsafe(self._put, event)
+
+class DashboardBroadcaster:
+    """
+    Polls the DashboardEvent outbox once per interval and pushes new rows to every connected
+    stream, so database load depends on the write rate, not on the number of viewers.
+    Outbox ids are assigned at insert but become visible at commit, so a lower id can show up
+    after a higher one; ids missing below the highest delivered one are re-checked for
+    DASHBOARD_OUTBOX_GAP_SECONDS before they are given up as rolled back.
+    """
+    def __init__(self, poll_interval: float = settings.DASHBOARD_STREAM_POLL_INTERVAL,
+                 gap_seconds: float = settings.DASHBOARD_OUTBOX_GAP_SECONDS):
+        self.poll_interval = poll_interval
+        self.gap_seconds = gap_seconds
+        self.horizon: Optional[int] = None # every id <= horizon was delivered or given up
+        self._delivered: Set[int] = set()
+        self._gaps: Dict[int, float] = {}
+        self._subscribers: Set[Subscription] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_prune = 0.0
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="dashboard-broadcaster", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        for subscription in self.subscribers():
+            subscription.deliver(None)
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def subscribers(self) -> List[Subscription]:
+        with self._lock:
+            return list(self._subscribers)
+
+    def run_forever(self):
+        print(f"(satellite) Dashboard broadcaster polling every {self.poll_interval}s")
+        while not self._stop.wait(self.poll_interval):
+            db = SessionLocal()
+            try:
+                self.poll(db)
+                if time.monotonic() - self._last_prune > PRUNE_EVERY_SECONDS:
+                    self._last_prune = time.monotonic()
+                    crud_dashboard.prune_events(
+                        db, datetime.now() - timedelta(seconds=settings.DASHBOARD_OUTBOX_RETENTION_SECONDS)
+                    )
+            except Exception as e:
+                print(f"(x) Dashboard broadcast failed: {e}")
+            finally:
+                db.close()
+
+    def poll(self, db) -> int:
+        """Deliver outbox rows committed since the last poll. Returns the number delivered."""
+        if self.horizon is None:
+            self.horizon = crud_dashboard.get_last_event_id(db)
+        events = [e for e in crud_dashboard.get_events_after(db, self.horizon) if e.id not in self._delivered]
+        subscribers = self.subscribers()
+        for event in events:
+            message = serialize_event(event)
+            for subscription in subscribers:
+                subscription.deliver(message)
+            self._delivered.add(event.id)
+            self._gaps.pop(event.id, None)
+        self._advance_horizon()
+        return len(events)
+
+    def _advance_horizon(self):
+        if not self._delivered:
+            return
+        now = time.monotonic()
+        top = max(self._delivered)
+        while self.horizon < top:
+            candidate = self.horizon + 1
+            if candidate in self._delivered:
+                self._delivered.discard(candidate)
+            elif now - self._gaps.setdefault(candidate, now) > self.gap_seconds:
+                self._gaps.pop(candidate)
+            else:
+                break
+            self.horizon = candidate
+
+dashboard_broadcaster = DashboardBroadcaster()
@@ -0,0 +1,55 @@
+from typing import Optional, Dict, Any
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.crud import crud_data_quality
+from app.models.data_quality import DataQualityJob, DataQualityJobStatus
+
+class DataQualityManager:
+    """
+    Facade over the persistent DataQualityJob table. State lives in the database, so every
+    API process sees the running scan and its report survives restarts.
+    """
+    _instance = None
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = DataQualityManager()
+        return cls._instance
+
+    def start_job(self, db: Session, fix: bool = False, batch_size: int = 100000,
+                  requested_by: Optional[str] = None) -> Optional[DataQualityJob]:
+        """The new job, or None if a scan is already running."""
+        return crud_data_quality.claim_job(db, fix=fix, batch_size=batch_size,
+                                           stale_after_seconds=settings.DATA_QUALITY_JOB_STALE_SECONDS,
+                                           requested_by=requested_by)
+
+    def update_progress(self, db: Session, job_id: int, stage: str, progress: float):
+        crud_data_quality.update_progress(db, job_id, stage, progress)
+
+    def complete_job(self, db: Session, job_id: int, report: Dict[str, Any]):
+        crud_data_quality.finish_job(db, job_id, DataQualityJobStatus.COMPLETED, report=report)
+
+    def fail_job(self, db: Session, job_id: int, error: str):
+        crud_data_quality.finish_job(db, job_id, DataQualityJobStatus.FAILED, error=error)
+
+    def get_job(self, db: Session, job_id: int) -> Optional[Dict[str, Any]]:
+        job = crud_data_quality.get_job(db, job_id)
+        return self.serialize(job) if job else None
+
+    def serialize(self, job: DataQualityJob) -> Dict[str, Any]:
+        return {
+            "job_id": job.id,
+            "status": job.status,
+            "stage": job.stage,
+            "progress": job.progress,
+            "fix": job.fix,
+            "batch_size": job.batch_size,
+            "requested_by": job.requested_by,
+            "start_time": job.created_at,
+            "end_time": job.finished_at,
+            "report": job.report,
+            "error": job.error
+        }
+
+data_quality_manager = DataQualityManager.get_instance()
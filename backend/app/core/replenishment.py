@@ -0,0 +1,301 @@
+import math
+import threading
+import time
+from datetime import date, datetime, timedelta
+from statistics import NormalDist
+from typing import Any, Callable, Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.training_scheduler import last_cron_fire
+from app.crud import crud_dashboard, crud_inventory, crud_replenishment, crud_supply_chain
+from app.db.locks import REPLENISHMENT_RUN, advisory_xact_lock
+from app.db.session import SessionLocal
+from app.ml.local_models import forecast_series_batch
+from app.models.inventory import StoreInventory
+from app.models.replenishment import ReplenishmentPlan
+from app.models.sales import DailySalesRollup, Product
+from app.models.supply_chain import POStatus, PurchaseOrder, PurchaseOrderLine, Supplier
+
+def _frame(db: Session, stmt) -> pd.DataFrame:
+    # Core execution on the session's connection: no ORM row processing for ~1M history rows
+    result = db.connection().execute(stmt)
+    return pd.DataFrame.from_records(result.fetchall(), columns=list(result.keys()))
+
+def _series_rows(keys: pd.DataFrame, inventory: pd.DataFrame) -> np.ndarray:
+    """Row index into 'inventory' of each (product_id, store_id) in 'keys', -1 where there is none."""
+    stride = int(max(keys["store_id"].max(), inventory["store_id"].max())) + 1
+    inventory_keys = inventory["product_id"].to_numpy(np.int64) * stride + inventory["store_id"].to_numpy(np.int64)
+    wanted = keys["product_id"].to_numpy(np.int64) * stride + keys["store_id"].to_numpy(np.int64)
+    order = np.argsort(inventory_keys, kind="stable")
+    sorted_keys = inventory_keys[order]
+    pos = np.minimum(np.searchsorted(sorted_keys, wanted), len(sorted_keys) - 1)
+    return np.where(sorted_keys[pos] == wanted, order[pos], -1)
+
+class ReplenishmentEngine:
+    """
+    Computes safety stock, reorder point, order-up-to level and suggested order quantity for
+    every StoreInventory row in one vectorized pass:
+
+    - demand: per-series additive Holt-Winters forecasts fitted together on the trailing
+      REPLENISHMENT_HISTORY_DAYS of DailySalesRollup, with the one-step error sigma as interval;
+    - lead time: mean and standard deviation of the order date -> shipment ETA history of the
+      product's supplier (all suppliers, then ALERT_LEAD_TIME_DAYS, when it has none);
+    - safety stock = z * sqrt(sigma^2 * (L + R) + d^2 * sigma_L^2) for the service level's z,
+      reorder point = forecast demand over L + safety stock, order-up-to = demand over L + R
+      + safety stock, where R is REPLENISHMENT_REVIEW_DAYS and d the mean daily forecast.
+
+    Rows whose stock plus open purchase orders is at or below the reorder point are ordered
+    up to the order-up-to level. The results replace the ReplenishmentPlan table, suggested
+    quantities are drafted as one DRAFT purchase order per supplier (replacing the previous
+    drafts). Only if REPLENISHMENT_UPDATE_THRESHOLDS is enabled does low_stock_threshold follow
+    the reorder point, overwriting thresholds set by hand.
+    """
+    def __init__(self):
+        self.last_run: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    def lead_times(self, db: Session) -> Tuple[Dict[int, Tuple[float, float]], Tuple[float, float], str]:
+        """(mean, sigma) days per supplier with history, the overall (mean, sigma) and its source."""
+        history = crud_supply_chain.get_lead_time_history(db)
+        samples = [d for days in history.values() for d in days]
+        if not samples:
+            return {}, (settings.ALERT_LEAD_TIME_DAYS, 0.0), "default"
+        overall = (float(np.mean(samples)), float(np.std(samples, ddof=1)) if len(samples) > 1 else 0.0)
+        per_supplier = {
+            supplier_id: (float(np.mean(days)), float(np.std(days, ddof=1)) if len(days) > 1 else overall[1])
+            for supplier_id, days in history.items() if supplier_id is not None
+        }
+        return per_supplier, overall, "observed"
+
+    def run(self, db: Session, today: Optional[date] = None,
+            only_if: Optional[Callable[[Session], bool]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Run once and commit. Runs are serialized across processes by an advisory lock;
+        'only_if' is re-checked under that lock (e.g. the schedule is still due after another
+        process finished its run) and the run is skipped, returning None, when it is False.
+        """
+        with self._lock:
+            try:
+                advisory_xact_lock(db, REPLENISHMENT_RUN)
+                if only_if is not None and not only_if(db):
+                    db.rollback()
+                    return None
+                started_at = datetime.now()
+                started = time.perf_counter()
+                summary = self._run(db, today or date.today(), started_at)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            summary["seconds"] = round(time.perf_counter() - started, 3)
+            self.last_run = summary
+            return summary
+
+    def _run(self, db: Session, today: date, started_at: datetime) -> Dict[str, Any]:
+        inventory = _frame(db, select(
+            StoreInventory.id, StoreInventory.product_id, StoreInventory.store_id,
+            StoreInventory.quantity_on_hand, StoreInventory.low_stock_threshold, Product.supplier_id, Product.price
+        ).join(Product, Product.id == StoreInventory.product_id).order_by(StoreInventory.id))
+        summary: Dict[str, Any] = {"started_at": started_at, "as_of": today, "rows": len(inventory)}
+        if inventory.empty:
+            return summary
+        n = len(inventory)
+
+        # Dense (row x day) demand history; days without sales count as zero. Read one day at a
+        # time so no per-row date conversion is needed
+        window = settings.REPLENISHMENT_HISTORY_DAYS
+        start = today - timedelta(days=window)
+        history = np.zeros((n, window))
+        has_history = np.zeros(n, dtype=bool)
+        for offset in range(window):
+            sales = _frame(db, select(
+                DailySalesRollup.sku_id.label("product_id"), DailySalesRollup.store_id, DailySalesRollup.quantity
+            ).where(DailySalesRollup.date == start + timedelta(days=offset)))
+            if sales.empty:
+                continue
+            rows = _series_rows(sales, inventory)
+            found = rows >= 0
+            history[rows[found], offset] = sales["quantity"].to_numpy(float)[found]
+            has_history[rows[found]] = True
+
+        # Lead time per row from its supplier's history
+        per_supplier, overall, source = self.lead_times(db)
+        supplier = inventory["supplier_id"]
+        if settings.REPLENISHMENT_DEFAULT_SUPPLIER_ID is not None:
+            supplier = supplier.fillna(settings.REPLENISHMENT_DEFAULT_SUPPLIER_ID)
+        lead_time = supplier.map({k: v[0] for k, v in per_supplier.items()}).fillna(overall[0]).to_numpy(float)
+        lead_sigma = supplier.map({k: v[1] for k, v in per_supplier.items()}).fillna(overall[1]).to_numpy(float)
+
+        # Forecast far enough to cover the longest lead time plus the review period
+        review = settings.REPLENISHMENT_REVIEW_DAYS
+        horizon = int(math.ceil(lead_time.max() + review)) + 1
+        forecast, sigma = forecast_series_batch(history, horizon)
+        cumulative = np.concatenate([np.zeros((n, 1)), np.cumsum(forecast, axis=1)], axis=1)
+
+        def demand_over(days: np.ndarray) -> np.ndarray:
+            whole = np.floor(days).astype(np.int64)
+            lo = np.take_along_axis(cumulative, whole[:, None], axis=1)[:, 0]
+            hi = np.take_along_axis(cumulative, whole[:, None] + 1, axis=1)[:, 0]
+            return lo + (days - whole) * (hi - lo)
+
+        cover = lead_time + review
+        demand_cover = demand_over(cover)
+        daily = demand_cover / np.maximum(cover, 1e-9)
+        z = NormalDist().inv_cdf(settings.REPLENISHMENT_SERVICE_LEVEL)
+        safety = z * np.sqrt(sigma ** 2 * cover + daily ** 2 * lead_sigma ** 2)
+        reorder_point = demand_over(lead_time) + safety
+        order_up_to = demand_cover + safety
+
+        on_hand = inventory["quantity_on_hand"].fillna(0).to_numpy(np.int64)
+        on_order = np.zeros(n, dtype=np.int64)
+        open_orders = pd.DataFrame(crud_supply_chain.get_on_order_quantities(db),
+                                   columns=["product_id", "store_id", "quantity"])
+        if not open_orders.empty:
+            rows = _series_rows(open_orders, inventory)
+            np.add.at(on_order, rows[rows >= 0], open_orders["quantity"].to_numpy(np.int64)[rows >= 0])
+        position = on_hand + on_order
+        suggested = np.where(has_history & (position <= reorder_point),
+                             np.ceil(order_up_to - position), 0).clip(0).astype(np.int64)
+
+        # Draft purchase orders, one per supplier, for the rows with a suggestion. The previous
+        # plans point at the previous drafts, so they go first
+        crud_replenishment.delete_plans(db)
+        crud_supply_chain.delete_draft_orders(db)
+        known = {s for (s,) in db.query(Supplier.id).all()}
+        draft_supplier = supplier.where(supplier.isin(known))
+        drafted = (suggested > 0) & draft_supplier.notna().to_numpy()
+        price = inventory["price"].fillna(0.0).to_numpy(float)
+        lines = pd.DataFrame({
+            "row": np.flatnonzero(drafted),
+            "supplier_id": draft_supplier.to_numpy()[drafted].astype(np.int64),
+            "quantity": suggested[drafted],
+            "amount": suggested[drafted] * price[drafted]
+        })
+        orders = {}
+        for supplier_id, amount in lines.groupby("supplier_id")["amount"].sum().items():
+            orders[supplier_id] = PurchaseOrder(
+                po_number=f"PO-DRAFT-{started_at:%Y%m%d%H%M%S}-{supplier_id}", supplier_id=int(supplier_id),
+                order_date=today, total_amount=round(float(amount), 2), status=POStatus.DRAFT.value
+            )
+        db.add_all(orders.values())
+        db.flush()
+        order_id = np.full(n, -1, dtype=np.int64)
+        if not lines.empty:
+            order_id[lines["row"].to_numpy()] = lines["supplier_id"].map({k: po.id for k, po in orders.items()}).to_numpy()
+            line_rows = inventory.iloc[lines["row"].to_numpy()]
+            db.execute(PurchaseOrderLine.__table__.insert(), [
+                {"purchase_order_id": int(po_id), "product_id": int(product_id), "store_id": int(store_id),
+                 "quantity": int(quantity), "unit_price": float(unit_price), "amount": round(float(amount), 2)}
+                for po_id, product_id, store_id, quantity, unit_price, amount in zip(
+                    order_id[lines["row"].to_numpy()], line_rows["product_id"], line_rows["store_id"],
+                    lines["quantity"], price[lines["row"].to_numpy()], lines["amount"])
+            ])
+
+        plans = pd.DataFrame({
+            "inventory_id": inventory["id"], "product_id": inventory["product_id"], "store_id": inventory["store_id"],
+            "supplier_id": supplier.astype("Int64").astype(object).where(supplier.notna(), None),
+            "daily_demand": daily.round(3), "demand_sigma": sigma.round(3),
+            "lead_time_days": lead_time.round(2), "lead_time_sigma": lead_sigma.round(2),
+            "safety_stock": safety.round(2), "reorder_point": reorder_point.round(2),
+            "order_up_to": order_up_to.round(2), "on_hand": on_hand, "on_order": on_order,
+            "suggested_quantity": suggested,
+            "purchase_order_id": pd.Series(order_id, dtype=object).where(order_id >= 0, None),
+            "as_of": today, "computed_at": started_at
+        })
+        crud_replenishment.insert_plans(db, plans.to_dict("records"))
+
+        # Stock alert thresholds follow the reorder point (bulk update: the counters are adjusted
+        # from the rows as locked at update time, not from the frame read at the start of the run)
+        updated = 0
+        if settings.REPLENISHMENT_UPDATE_THRESHOLDS:
+            old = inventory["low_stock_threshold"].to_numpy(float)
+            new = np.ceil(reorder_point)
+            changed = has_history & (new != old)
+            updated = int(changed.sum())
+            if updated and crud_inventory.set_low_stock_thresholds(
+                db, {int(i): int(t) for i, t in zip(inventory["id"][changed], new[changed])}
+            ):
+                crud_dashboard.publish_stock_counts(db)
+
+        summary.update({
+            "with_history": int(has_history.sum()),
+            "suggested_rows": int((suggested > 0).sum()),
+            "suggested_units": int(suggested.sum()),
+            "unassigned_rows": int(((suggested > 0) & ~drafted).sum()),
+            "draft_orders": len(orders),
+            "draft_amount": round(float(lines["amount"].sum()), 2),
+            "thresholds_updated": updated,
+            "lead_time_days": round(overall[0], 1),
+            "lead_time_source": source,
+            "service_level": settings.REPLENISHMENT_SERVICE_LEVEL
+        })
+        if orders:
+            crud_dashboard.publish_notification(
+                db, f"Replenishment: {summary['suggested_rows']} item(s) to reorder, "
+                    f"{len(orders)} draft purchase order(s) for review."
+            )
+        return summary
+
+class ReplenishmentScheduler:
+    """Runs the replenishment engine in the API process when the REPLENISHMENT_CRON window is reached."""
+    def __init__(self, engine: ReplenishmentEngine, check_interval: float = settings.REPLENISHMENT_CHECK_INTERVAL):
+        self.engine = engine
+        self.check_interval = check_interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="replenishment-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def run_forever(self):
+        print(f"(clock) Replenishment scheduled at '{settings.REPLENISHMENT_CRON}'")
+        while not self._stop.wait(self.check_interval):
+            db = SessionLocal()
+            try:
+                summary = self.engine.run(db, only_if=self.is_due) if self.is_due(db) else None
+                if summary is not None:
+                    print(f"(clock) Replenishment: {summary.get('suggested_rows', 0)} of {summary['rows']} rows to reorder, "
+                          f"{summary.get('draft_orders', 0)} draft PO(s) in {summary['seconds']}s")
+            except Exception as e:
+                print(f"(x) Replenishment run failed: {e}")
+            finally:
+                db.close()
+
+    def is_due(self, db: Session, now: Optional[datetime] = None) -> bool:
+        fired = last_cron_fire(settings.REPLENISHMENT_CRON, now or datetime.now())
+        last = crud_replenishment.get_last_computed_at(db)
+        return fired is not None and (last is None or last < fired)
+
+def serialize_plan(plan: ReplenishmentPlan) -> Dict[str, Any]:
+    return {
+        "inventory_id": plan.inventory_id,
+        "product_id": plan.product_id,
+        "store_id": plan.store_id,
+        "supplier_id": plan.supplier_id,
+        "daily_demand": plan.daily_demand,
+        "demand_sigma": plan.demand_sigma,
+        "lead_time_days": plan.lead_time_days,
+        "lead_time_sigma": plan.lead_time_sigma,
+        "safety_stock": plan.safety_stock,
+        "reorder_point": plan.reorder_point,
+        "order_up_to": plan.order_up_to,
+        "on_hand": plan.on_hand,
+        "on_order": plan.on_order,
+        "suggested_quantity": plan.suggested_quantity,
+        "purchase_order_id": plan.purchase_order_id,
+        "as_of": plan.as_of,
+        "computed_at": plan.computed_at
+    }
+
+replenishment_engine = ReplenishmentEngine()
+replenishment_scheduler = ReplenishmentScheduler(replenishment_engine)
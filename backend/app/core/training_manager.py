@@ -1,16 +1,20 @@
-from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.crud import crud_training
+from app.db.locks import TRAINING_QUEUE, advisory_xact_lock
+from app.models.training import TrainingJob, TrainingJobStatus
+
+class TrainingQueueFull(Exception):
+    pass
 
 class TrainingManager:
+    """
+    Facade over the persistent TrainingJob queue. State lives in the database, so every
+    API worker sees the same jobs and history survives restarts; jobs are executed by a
+    TrainingWorker (app/core/training_worker.py).
+    """
     _instance = None
-    
-    def __init__(self):
-        self.is_training = False
-        self.start_time = None
-        self.status = "Idle"
-        self.job_id = None
-        self.last_result = None
-        self.error = None
 
     @classmethod
     def get_instance(cls):
@@ -18,26 +22,67 @@ class TrainingManager:
             cls._instance = TrainingManager()
         return cls._instance
 
-    def start_training(self):
-        self.is_training = True
-        self.start_time = datetime.now()
-        self.status = "Training Started"
-        self.job_id = f"job_{int(self.start_time.timestamp())}"
-        self.error = None
-        self.last_result = None
-        return self.job_id
-
-    def update_status(self, status: str):
-        self.status = status
-
-    def complete_training(self, result: Dict[str, Any]):
-        self.is_training = False
-        self.status = "Completed"
-        self.last_result = result
-
-    def fail_training(self, error: str):
-        self.is_training = False
-        self.status = "Failed"
-        self.error = error
+    def is_training(self, db: Session) -> bool:
+        return crud_training.count_jobs(db, [TrainingJobStatus.RUNNING]) > 0
+
+    def enqueue(self, db: Session, auto_tune: bool = False, incremental: bool = False, trigger: str = "manual",
+                requested_by: Optional[str] = None) -> TrainingJob:
+        # Count and insert under the queue lock so concurrent requests cannot overfill the queue;
+        # create_job's commit releases it
+        advisory_xact_lock(db, TRAINING_QUEUE)
+        queued = crud_training.count_jobs(db, [TrainingJobStatus.QUEUED])
+        if queued >= settings.TRAINING_QUEUE_MAX:
+            db.rollback()
+            raise TrainingQueueFull(f"Training queue is full ({queued} jobs waiting).")
+        return crud_training.create_job(db, auto_tune=auto_tune, incremental=incremental, trigger=trigger,
+                                        requested_by=requested_by)
+
+    def cancel(self, db: Session, job_id: int) -> Optional[TrainingJob]:
+        return crud_training.request_cancel(db, job_id)
+
+    def get_status(self, db: Session, job_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Status of one job (default: the running job, else the latest one) plus queue counters.
+        """
+        job = crud_training.get_job(db, job_id) if job_id else crud_training.get_latest_job(db)
+        status = {
+            "is_training": self.is_training(db),
+            "queued_jobs": crud_training.count_jobs(db, [TrainingJobStatus.QUEUED]),
+            "status": "Idle",
+            "job_id": None,
+            "start_time": None,
+            "result": None,
+            "error": None
+        }
+        if job:
+            status.update(self.serialize(db, job))
+        return status
+
+    def history(self, db: Session, status: Optional[str] = None, skip: int = 0, limit: int = 20) -> List[Dict[str, Any]]:
+        return [self.serialize(db, job) for job in crud_training.get_jobs(db, status=status, skip=skip, limit=limit)]
+
+    def serialize(self, db: Session, job: TrainingJob) -> Dict[str, Any]:
+        return {
+            "job_id": job.id,
+            "status": job.status,
+            "stage": job.stage,
+            "progress": job.progress,
+            "queue_position": crud_training.queue_position(db, job),
+            "auto_tune": job.auto_tune,
+            "incremental": job.incremental,
+            "trigger": job.trigger,
+            "requested_by": job.requested_by,
+            "worker": job.worker,
+            "created_at": job.created_at,
+            "start_time": job.started_at,
+            "end_time": job.finished_at,
+            "duration_seconds": job.duration_seconds,
+            "data_high_water_mark": job.data_high_water_mark,
+            "stage_timings": job.stage_timings or {},
+            "profile": job.profile,
+            "cancel_requested": job.cancel_requested,
+            "result": job.result,
+            "error": job.error
+        }
 
 training_manager = TrainingManager.get_instance()
@@ -0,0 +1,168 @@
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.locks import TRAINING_QUEUE, advisory_xact_lock
+from app.db.session import SessionLocal
+from app.crud import crud_sales, crud_training
+
+ROW_TRIGGER = "schedule:rows"
+CRON_TRIGGER = "schedule:cron"
+
+# minute, hour, day of month, month, day of week (0 = Sunday)
+CRON_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 6)]
+
+def _parse_cron_field(field: str, lo: int, hi: int) -> Set[int]:
+    values = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step_str = part.split("/", 1)
+            step = int(step_str)
+        if part == "*":
+            start, end = lo, hi
+        elif "-" in part:
+            start, end = (int(v) for v in part.split("-", 1))
+        else:
+            start = end = int(part)
+        if start < lo or end > hi or start > end or step < 1:
+            raise ValueError(f"Cron field '{field}' out of range {lo}-{hi}.")
+        values.update(range(start, end + 1, step))
+    return values
+
+def parse_cron(expr: str) -> Tuple[List[Set[int]], bool]:
+    """
+    Parse a 5-field cron expression ('*', 'a-b', 'a,b' and '/n' steps are supported).
+    Returns the allowed values per field and whether day-of-month and weekday are OR-ed.
+    """
+    fields = expr.split()
+    if len(fields) != 5:
+        raise ValueError("Cron expression must have 5 fields: minute hour day month weekday.")
+    parsed = [_parse_cron_field(f, lo, hi) for f, (lo, hi) in zip(fields, CRON_RANGES)]
+    # Standard cron: if both day fields are restricted, either may match
+    either_day = fields[2] != "*" and fields[4] != "*"
+    return parsed, either_day
+
+def cron_matches(parsed: Tuple[List[Set[int]], bool], moment: datetime) -> bool:
+    (minutes, hours, days, months, weekdays), either_day = parsed
+    if moment.minute not in minutes or moment.hour not in hours or moment.month not in months:
+        return False
+    day_match = moment.day in days
+    weekday_match = (moment.weekday() + 1) % 7 in weekdays
+    return (day_match or weekday_match) if either_day else (day_match and weekday_match)
+
+def last_cron_fire(expr: str, now: datetime, lookback_minutes: int = 24 * 60) -> Optional[datetime]:
+    """Most recent minute <= now matching 'expr' within the lookback window, or None."""
+    parsed = parse_cron(expr)
+    moment = now.replace(second=0, microsecond=0)
+    for _ in range(lookback_minutes + 1):
+        if cron_matches(parsed, moment):
+            return moment
+        moment -= timedelta(minutes=1)
+    return None
+
+class RetrainScheduler:
+    """
+    Queues retraining jobs when enough new SalesData rows arrived since the data the last
+    model was trained on (incremental), or when the cron window is reached (full).
+    Never queues while a job is active, within the debounce interval, or when the data is
+    unchanged since the last model.
+    """
+    def __init__(self, check_interval: float = settings.RETRAIN_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self.last_decision: Optional[Dict[str, Any]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="retrain-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def run_forever(self):
+        print(f"(clock) Retrain scheduler checking every {self.check_interval}s")
+        while not self._stop.wait(self.check_interval):
+            db = SessionLocal()
+            try:
+                decision = self.evaluate(db)
+                if decision["action"] == "queued":
+                    print(f"(clock) Queued {decision['mode']} retrain job {decision['job_id']}: {decision['reason']}")
+            except Exception as e:
+                print(f"(x) Retrain scheduler check failed: {e}")
+            finally:
+                db.close()
+
+    def evaluate(self, db: Session, now: Optional[datetime] = None, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Decide whether a retrain is due and queue it (unless dry_run). Returns the decision.
+        The check and the insert hold the training queue lock, so schedulers running in several
+        processes cannot queue the same retrain twice.
+        """
+        if not dry_run:
+            advisory_xact_lock(db, TRAINING_QUEUE)
+        now = now or datetime.now()
+        rows, max_id, max_date = crud_sales.get_sales_high_water_mark(db)
+        last_model = crud_training.get_last_completed_job(db)
+        trained_on = (last_model.data_high_water_mark if last_model else None) or {}
+        new_rows = crud_sales.count_sales_after_id(db, trained_on["max_id"]) if trained_on else rows
+
+        decision = {
+            "action": "skipped",
+            "reason": None,
+            "checked_at": now,
+            "new_rows": new_rows,
+            "threshold": settings.RETRAIN_NEW_ROWS_THRESHOLD,
+            "last_model_job_id": last_model.id if last_model else None,
+            "trained_on": trained_on or None,
+            "mode": None,
+            "job_id": None
+        }
+
+        def skip(reason: str):
+            decision["reason"] = reason
+            if not dry_run:
+                self.last_decision = decision
+                db.commit() # releases the queue lock
+            return decision
+
+        if rows == 0:
+            return skip("No sales data.")
+        if crud_training.count_jobs(db, crud_training.ACTIVE_STATUSES) > 0:
+            return skip("A training job is already queued or running.")
+        if trained_on and trained_on.get("rows") == rows and trained_on.get("max_id") == max_id:
+            return skip("Sales data unchanged since the last model.")
+
+        last_scheduled = crud_training.get_last_job_by_triggers(db, [ROW_TRIGGER, CRON_TRIGGER])
+        if last_scheduled and last_scheduled.created_at and \
+                now - last_scheduled.created_at < timedelta(minutes=settings.RETRAIN_MIN_INTERVAL_MINUTES):
+            return skip(f"Debounced: last scheduled retrain queued at {last_scheduled.created_at}.")
+
+        trigger = None
+        if settings.RETRAIN_CRON:
+            fired = last_cron_fire(settings.RETRAIN_CRON, now)
+            last_cron = crud_training.get_last_job_by_triggers(db, [CRON_TRIGGER])
+            if fired and (last_cron is None or last_cron.created_at < fired):
+                trigger, incremental = CRON_TRIGGER, False
+                decision["reason"] = f"Cron window '{settings.RETRAIN_CRON}' reached at {fired}."
+        if trigger is None and new_rows >= settings.RETRAIN_NEW_ROWS_THRESHOLD:
+            trigger, incremental = ROW_TRIGGER, settings.RETRAIN_INCREMENTAL and last_model is not None
+            decision["reason"] = f"{new_rows} new sales rows since the last model."
+        if trigger is None:
+            return skip(f"{new_rows} new rows (threshold {settings.RETRAIN_NEW_ROWS_THRESHOLD}) and no cron window due.")
+
+        decision["mode"] = "incremental" if incremental else "full"
+        if not dry_run:
+            job = crud_training.create_job(db, incremental=incremental, trigger=trigger, requested_by="scheduler")
+            decision.update(action="queued", job_id=job.id)
+            self.last_decision = decision
+        else:
+            decision["action"] = "due"
+        return decision
+
+retrain_scheduler = RetrainScheduler()
@@ -0,0 +1,238 @@
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import threading
+import time
+from typing import Dict, Optional
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.crud import crud_training
+from app.models.training import TrainingJobStatus
+
+class StageTimer:
+    """
+    Turns progress(stage, fraction) calls into per-stage durations in seconds.
+    """
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self.stage: Optional[str] = None
+        self._started = time.perf_counter()
+
+    def enter(self, stage: str):
+        self.close()
+        self.stage = stage
+        self._started = time.perf_counter()
+
+    def close(self):
+        if self.stage is not None:
+            elapsed = time.perf_counter() - self._started
+            self.timings[self.stage] = round(self.timings.get(self.stage, 0.0) + elapsed, 3)
+            self.stage = None
+        return self.timings
+
+def staged_model_path(model_path: str, job_id: int) -> str:
+    """Where a job writes its model (and metrics/backtest report) until it is promoted."""
+    root, ext = os.path.splitext(model_path)
+    return f"{root}.job{job_id}{ext}"
+
+def _train_in_child(auto_tune: bool, incremental: bool, messages, staged_path: str):
+    """
+    Entry point of the training child process. Progress, the result or the error are
+    sent back to the parent worker over 'messages'; the child never touches the job row.
+    The artifacts are written to 'staged_path'; the parent promotes them over the served
+    model only once the job is recorded as completed.
+    """
+    # Own process group, so cancelling also stops the Stan processes started by this child
+    if hasattr(os, "setsid"):
+        os.setsid()
+
+    from app.ml.model import ForecastModel
+    from app.ml.profiling import TrainingProfiler
+    from app.ml.training import train_model
+
+    profiler = TrainingProfiler()
+    model = ForecastModel()
+    if incremental:
+        model.load_model() # warm start from the served model
+    model.set_model_path(staged_path)
+
+    def progress(stage: str, fraction: float):
+        profiler.enter(stage)
+        messages.put(("progress", stage, fraction))
+
+    try:
+        metrics = train_model(auto_tune=auto_tune, incremental=incremental, progress=progress, model=model)
+        messages.put(("done", metrics, profiler.report(stan=model.fit_stats), model.data_high_water_mark))
+    except Exception as e:
+        messages.put(("error", str(e), profiler.report(stan=model.fit_stats)))
+
+def _terminate(process):
+    if hasattr(os, "killpg"):
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    else:
+        process.terminate()
+    process.join(10)
+    if process.is_alive():
+        process.kill()
+        process.join()
+
+class TrainingWorker:
+    """
+    Polls the TrainingJob table and runs queued jobs, at most 'max_concurrent' across all workers.
+    Runs embedded in the API process (start()) or standalone (training_worker.py -> run_forever()).
+    Each job trains in a separate child process, so the CPU-bound fit never competes with
+    request handling for the GIL; a thread per job relays the child's progress to the job row.
+    """
+    def __init__(self, name: Optional[str] = None,
+                 max_concurrent: int = settings.TRAINING_MAX_CONCURRENT_JOBS,
+                 poll_interval: float = settings.TRAINING_POLL_INTERVAL):
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.max_concurrent = max_concurrent
+        self.poll_interval = poll_interval
+        self.active: Dict[int, threading.Thread] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="training-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def run_forever(self):
+        print(f"(gear) Training worker {self.name} polling for jobs every {self.poll_interval}s")
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"(x) Training worker poll failed: {e}")
+            self._stop.wait(self.poll_interval)
+
+    def poll_once(self):
+        """Heartbeat running jobs, fail abandoned ones and claim queued jobs up to capacity."""
+        self.active = {job_id: t for job_id, t in self.active.items() if t.is_alive()}
+
+        db = SessionLocal()
+        try:
+            crud_training.heartbeat(db, list(self.active))
+            crud_training.fail_stale_jobs(db, settings.TRAINING_JOB_STALE_SECONDS)
+
+            while len(self.active) < self.max_concurrent:
+                job = crud_training.claim_next_job(db, self.name, self.max_concurrent)
+                if job is None:
+                    break
+                thread = threading.Thread(
+                    target=self._run_job, args=(job.id, job.auto_tune, job.incremental),
+                    name=f"training-job-{job.id}", daemon=True
+                )
+                self.active[job.id] = thread
+                thread.start()
+        finally:
+            db.close()
+
+    def _run_job(self, job_id: int, auto_tune: bool, incremental: bool = False):
+        from app.ml.model import discard_artifacts, forecaster
+
+        print(f"(rocket) Worker {self.name} starting training job {job_id}")
+        timer = StageTimer()
+        db = SessionLocal()
+        context = multiprocessing.get_context("spawn")
+        messages = context.Queue()
+        staged_path = staged_model_path(forecaster.model_path, job_id)
+        child = context.Process(target=_train_in_child, args=(auto_tune, incremental, messages, staged_path),
+                                name=f"training-job-{job_id}")
+
+        try:
+            child.start()
+            outcome = None
+            profile = None
+            while outcome is None:
+                try:
+                    message = messages.get(timeout=self.poll_interval)
+                except queue.Empty:
+                    message = None
+
+                if crud_training.is_cancel_requested(db, job_id):
+                    _terminate(child)
+                    outcome = (TrainingJobStatus.CANCELLED, None, "Cancelled by user.")
+                elif message is None:
+                    if not child.is_alive():
+                        outcome = (TrainingJobStatus.FAILED, None,
+                                   f"Training process exited unexpectedly (exit code {child.exitcode}).")
+                elif message[0] == "progress":
+                    _, stage, fraction = message
+                    timer.enter(stage)
+                    crud_training.update_progress(db, job_id, stage, round(fraction * 100, 1), dict(timer.timings))
+                elif message[0] == "done":
+                    metrics, profile = message[1], message[2]
+                    if message[3]:
+                        # The data the model was trained on; the retrain scheduler compares against it
+                        crud_training.set_data_high_water_mark(db, job_id, message[3])
+                    if metrics:
+                        outcome = (TrainingJobStatus.COMPLETED, metrics, None)
+                    else:
+                        outcome = (TrainingJobStatus.FAILED, None, "Model failed to train or evaluate.")
+                else:
+                    profile = message[2]
+                    outcome = (TrainingJobStatus.FAILED, None, message[1])
+
+            status, result, error = outcome
+            if status == TrainingJobStatus.COMPLETED:
+                forecaster.promote_from(staged_path)
+            crud_training.finish_job(db, job_id, status, result=result, error=error,
+                                     stage_timings=timer.close(), profile=profile)
+            if status == TrainingJobStatus.COMPLETED:
+                # Serve the new artifact from this process right away; others pick it up via ModelReloader
+                forecaster.reload_if_changed()
+        except Exception as e:
+            db.rollback()
+            crud_training.finish_job(db, job_id, TrainingJobStatus.FAILED, error=str(e), stage_timings=timer.close())
+        finally:
+            if child.is_alive():
+                _terminate(child)
+            child.join(1)
+            discard_artifacts(staged_path) # failed or cancelled jobs never replace the served model
+            db.close()
+            print(f"(tick) Worker {self.name} finished training job {job_id}")
+
+class ModelReloader:
+    """
+    Watches the model artifact and hot-reloads the forecaster in this process when a
+    training worker (in any process) replaces it.
+    """
+    def __init__(self, interval: float = settings.TRAINING_POLL_INTERVAL):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="model-reloader", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def run_forever(self):
+        from app.ml.model import forecaster
+
+        while not self._stop.wait(self.interval):
+            try:
+                if forecaster.reload_if_changed():
+                    print(f"(tick) Reloaded model from {forecaster.model_path}")
+            except Exception as e:
+                print(f"(!) Model reload failed: {e}")
+
+training_worker = TrainingWorker()
+model_reloader = ModelReloader()
@@ -7,3 +7,9 @@ from . import crud_user
 from . import crud_sales
 from . import crud_holiday
 from . import crud_supply_chain
+from . import crud_training
+from . import crud_ingestion
+from . import crud_dashboard
+from . import crud_inventory
+from . import crud_alert
+from . import crud_data_quality
@@ -0,0 +1,110 @@
+from typing import Dict, List, Optional, Set
+from datetime import datetime
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+from app.models.alert import Alert, AlertSeverity, AlertStatus
+
+ALERT_FIELDS = ("dedup_key", "rule", "severity", "message", "details", "sku_id", "store_id", "shipment_id")
+UPSERT_BATCH_SIZE = 500
+
+SEVERITY_ORDER = case(
+    (Alert.severity == AlertSeverity.HIGH, 0),
+    (Alert.severity == AlertSeverity.MEDIUM, 1),
+    else_=2
+)
+
+def get_open_keys(db: Session, rule: str) -> Set[str]:
+    rows = db.query(Alert.dedup_key).filter(Alert.rule == rule, Alert.status == AlertStatus.OPEN).all()
+    return {row.dedup_key for row in rows}
+
+def upsert_alerts(db: Session, alerts: List[Dict], seen_at: datetime) -> int:
+    """
+    Record detections keyed by dedup_key: new keys are inserted, open alerts get their
+    message/details refreshed and occurrences incremented, resolved ones reopen with a fresh
+    first_seen_at. INSERT ... ON CONFLICT DO UPDATE on PostgreSQL/SQLite. Does not commit.
+    """
+    if not alerts:
+        return 0
+    rows = [
+        dict({field: alert.get(field) for field in ALERT_FIELDS}, status=AlertStatus.OPEN.value, occurrences=1,
+             first_seen_at=seen_at, last_seen_at=seen_at, resolved_at=None)
+        for alert in alerts
+    ]
+    dialect = db.bind.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        table = Alert.__table__
+        was_open = table.c.status == AlertStatus.OPEN.value
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            stmt = dialect_insert(table).values(rows[start:start + UPSERT_BATCH_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["dedup_key"],
+                set_={
+                    "severity": stmt.excluded.severity,
+                    "message": stmt.excluded.message,
+                    "details": stmt.excluded.details,
+                    "last_seen_at": stmt.excluded.last_seen_at,
+                    "occurrences": case((was_open, table.c.occurrences + 1), else_=1),
+                    "first_seen_at": case((was_open, table.c.first_seen_at), else_=stmt.excluded.first_seen_at),
+                    "status": AlertStatus.OPEN.value,
+                    "resolved_at": None
+                }
+            )
+            db.execute(stmt)
+    else:
+        existing = {a.dedup_key: a for a in db.query(Alert).filter(Alert.dedup_key.in_([r["dedup_key"] for r in rows]))}
+        for row in rows:
+            alert = existing.get(row["dedup_key"])
+            if alert is None:
+                db.add(Alert(**row))
+                continue
+            reopened = alert.status != AlertStatus.OPEN
+            for field in ("severity", "message", "details", "last_seen_at"):
+                setattr(alert, field, row[field])
+            alert.occurrences = 1 if reopened else alert.occurrences + 1
+            if reopened:
+                alert.first_seen_at = seen_at
+            alert.status, alert.resolved_at = AlertStatus.OPEN, None
+        db.flush()
+    return len(rows)
+
+def resolve_missing(db: Session, rule: str, seen_at: datetime) -> int:
+    """Resolve the rule's open alerts that the batch started at seen_at did not detect. Does not commit."""
+    return (
+        db.query(Alert)
+        .filter(Alert.rule == rule, Alert.status == AlertStatus.OPEN, Alert.last_seen_at < seen_at)
+        .update({Alert.status: AlertStatus.RESOLVED.value, Alert.resolved_at: seen_at}, synchronize_session=False)
+    )
+
+def get_alert(db: Session, alert_id: int) -> Optional[Alert]:
+    return db.query(Alert).filter(Alert.id == alert_id).first()
+
+def get_alerts(db: Session, status: Optional[str] = AlertStatus.OPEN, rule: Optional[str] = None,
+               severity: Optional[str] = None, store_id: Optional[int] = None,
+               skip: int = 0, limit: int = 100) -> List[Alert]:
+    query = db.query(Alert)
+    if status:
+        query = query.filter(Alert.status == status)
+    if rule:
+        query = query.filter(Alert.rule == rule)
+    if severity:
+        query = query.filter(Alert.severity == severity)
+    if store_id is not None:
+        query = query.filter(Alert.store_id == store_id)
+    return query.order_by(SEVERITY_ORDER, Alert.last_seen_at.desc()).offset(skip).limit(limit).all()
+
+def count_open_alerts(db: Session) -> Dict[str, Dict[str, int]]:
+    """Open alerts per rule and severity."""
+    counts: Dict[str, Dict[str, int]] = {}
+    rows = (
+        db.query(Alert.rule, Alert.severity, func.count(Alert.id))
+        .filter(Alert.status == AlertStatus.OPEN)
+        .group_by(Alert.rule, Alert.severity)
+        .all()
+    )
+    for rule, severity, count in rows:
+        counts.setdefault(rule, {})[severity] = count
+    return counts
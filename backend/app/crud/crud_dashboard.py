@@ -0,0 +1,56 @@
+from typing import Dict, Iterable, List, Optional, Set
+from datetime import date, datetime
+from sqlalchemy import delete, func
+from sqlalchemy.orm import Session
+from app.models.dashboard import DashboardEvent, DashboardEventKind
+from app.crud import crud_inventory
+
+# Publishing: add an outbox row to the caller's transaction (never commits)
+def publish(db: Session, kind: str, payload: Dict) -> DashboardEvent:
+    db_obj = DashboardEvent(kind=kind, payload=payload, created_at=datetime.now())
+    db.add(db_obj)
+    return db_obj
+
+def publish_sales_delta(db: Session, rows: Iterable[Dict], day: Optional[date] = None) -> Optional[DashboardEvent]:
+    """
+    Publish the increments of today's totals contained in rollup rows (dicts with date,
+    quantity, revenue, records). Rows for other days do not change the dashboard and are ignored.
+    """
+    day = day or date.today()
+    quantity = revenue = records = 0
+    for row in rows:
+        if row["date"] == day:
+            quantity += row["quantity"]
+            revenue += row["revenue"]
+            records += row["records"]
+    if not records and not quantity:
+        return None
+    return publish(db, DashboardEventKind.SALES, {
+        "date": day.isoformat(), "quantity": int(quantity), "revenue": round(float(revenue), 2), "records": int(records)
+    })
+
+def publish_stock_counts(db: Session) -> DashboardEvent:
+    """Publish the stock alert counts as of the caller's (flushed, uncommitted) changes."""
+    db.flush()
+    return publish(db, DashboardEventKind.STOCK, crud_inventory.get_stock_alert_counts(db))
+
+def publish_notification(db: Session, message: str, level: str = "info") -> DashboardEvent:
+    return publish(db, DashboardEventKind.NOTIFICATION, {"message": message, "level": level})
+
+# Reading the outbox
+def get_last_event_id(db: Session) -> int:
+    return db.query(func.max(DashboardEvent.id)).scalar() or 0
+
+def get_event_ids_after(db: Session, last_id: int) -> Set[int]:
+    return {row[0] for row in db.query(DashboardEvent.id).filter(DashboardEvent.id > last_id)}
+
+def get_events_after(db: Session, last_id: int, kinds: Optional[List[str]] = None, limit: int = 1000) -> List[DashboardEvent]:
+    query = db.query(DashboardEvent).filter(DashboardEvent.id > last_id)
+    if kinds:
+        query = query.filter(DashboardEvent.kind.in_(kinds))
+    return query.order_by(DashboardEvent.id).limit(limit).all()
+
+def prune_events(db: Session, before: datetime) -> int:
+    result = db.execute(delete(DashboardEvent).where(DashboardEvent.created_at < before))
+    db.commit()
+    return result.rowcount
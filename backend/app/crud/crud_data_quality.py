@@ -0,0 +1,72 @@
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from app.db.locks import DATA_QUALITY_SCAN, advisory_xact_lock
+from app.models.data_quality import DataQualityJob, DataQualityJobStatus
+
+def claim_job(db: Session, fix: bool, batch_size: int, stale_after_seconds: int,
+              requested_by: Optional[str] = None) -> Optional[DataQualityJob]:
+    """
+    Create a Running job unless another scan is running. The check and the insert happen
+    under one advisory lock, so concurrent requests in different processes cannot both
+    start a scan. Running jobs without a progress report for stale_after_seconds (their
+    process died) are failed first. Returns None if a scan is already running.
+    """
+    advisory_xact_lock(db, DATA_QUALITY_SCAN)
+    now = datetime.now()
+    cutoff = now - timedelta(seconds=stale_after_seconds)
+    running = db.query(DataQualityJob).filter(DataQualityJob.status == DataQualityJobStatus.RUNNING).all()
+    for job in running:
+        if job.updated_at is not None and job.updated_at >= cutoff:
+            db.commit()
+            return None
+        job.status = DataQualityJobStatus.FAILED
+        job.error = "Scan stopped reporting progress."
+        job.finished_at = now
+
+    db_obj = DataQualityJob(
+        status=DataQualityJobStatus.RUNNING,
+        fix=fix,
+        batch_size=batch_size,
+        requested_by=requested_by,
+        stage="Queued",
+        progress=0.0,
+        created_at=now,
+        updated_at=now
+    )
+    db.add(db_obj)
+    db.commit()
+    db.refresh(db_obj)
+    return db_obj
+
+def get_job(db: Session, job_id: int) -> Optional[DataQualityJob]:
+    return db.query(DataQualityJob).filter(DataQualityJob.id == job_id).first()
+
+def get_jobs(db: Session, status: Optional[str] = None, skip: int = 0, limit: int = 20) -> List[DataQualityJob]:
+    query = db.query(DataQualityJob)
+    if status:
+        query = query.filter(DataQualityJob.status == status)
+    return query.order_by(DataQualityJob.id.desc()).offset(skip).limit(limit).all()
+
+def update_progress(db: Session, job_id: int, stage: str, progress: float):
+    db.query(DataQualityJob).filter(DataQualityJob.id == job_id).update(
+        {"stage": stage, "progress": round(progress * 100, 1), "updated_at": datetime.now()},
+        synchronize_session=False
+    )
+    db.commit()
+
+def finish_job(db: Session, job_id: int, status: str, report: Optional[Dict] = None,
+               error: Optional[str] = None) -> Optional[DataQualityJob]:
+    job = get_job(db, job_id)
+    if job is None:
+        return None
+    job.status = status
+    job.report = report
+    job.error = error
+    if status == DataQualityJobStatus.COMPLETED:
+        job.stage = "Completed"
+        job.progress = 100.0
+    job.updated_at = job.finished_at = datetime.now()
+    db.commit()
+    db.refresh(job)
+    return job
@@ -1,12 +1,17 @@
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import date
+import pandas as pd
 from sqlalchemy.orm import Session
+from sqlalchemy import func, tuple_
 from app.models.sales import Holiday
 from app.schemas.holiday import HolidayCreate
 
+HOLIDAY_COLUMNS = ['date', 'type', 'locale', 'locale_name', 'description', 'transferred']
+HOLIDAY_KEY = ['date', 'locale_name']
+
 def get_holiday_by_date_locale(db: Session, holiday_date: date, locale_name: str) -> Optional[Holiday]:
     return db.query(Holiday).filter(
-        Holiday.date == holiday_date, 
+        Holiday.date == holiday_date,
         Holiday.locale_name == locale_name
     ).first()
 
@@ -26,3 +31,75 @@ def create_holiday(db: Session, obj_in: HolidayCreate) -> Holiday:
 
 def get_all_holidays(db: Session) -> List[Holiday]:
     return db.query(Holiday).all()
+
+def count_holidays(db: Session) -> int:
+    return db.query(func.count(Holiday.id)).scalar() or 0
+
+def get_holidays_signature(db: Session) -> Tuple[int, int]:
+    """
+    (row count, max id) of the holiday table. Holidays are insert-only (conflicts keep the
+    existing row), so this changes exactly when the table content changes.
+    """
+    row = db.query(func.count(Holiday.id), func.max(Holiday.id)).one()
+    return (row[0] or 0, row[1] or 0)
+
+def get_holiday_dates_descriptions(db: Session):
+    """(date, description) tuples for building the Prophet holidays frame - no ORM objects."""
+    return db.query(Holiday.date, Holiday.description).order_by(Holiday.date).all()
+
+def records_from_dataframe(df: pd.DataFrame) -> Tuple[List[Dict], List[str]]:
+    """
+    Validate and convert a holidays_events style frame in one vectorized pass.
+    Returns (records ready for bulk_upsert_holidays, errors for rows with an invalid date).
+    Rows repeating a (date, locale_name) key within the frame keep the first occurrence.
+    """
+    dates = pd.to_datetime(df['date'], errors='coerce')
+    invalid = dates.isna()
+    errors = [f"Row {index}: Invalid date '{value}'" for index, value in df.loc[invalid, 'date'].items()]
+
+    transferred = df['transferred']
+    if not pd.api.types.is_bool_dtype(transferred):
+        transferred = transferred.astype(str).str.lower().isin(['1', 'true', 'yes', '1.0'])
+
+    frame = pd.DataFrame({
+        'date': dates.dt.date,
+        'type': df['type'].astype(str),
+        'locale': df['locale'].astype(str),
+        'locale_name': df['locale_name'].astype(str),
+        'description': df['description'].astype(str),
+        'transferred': transferred.astype(bool)
+    })[~invalid]
+    frame = frame.drop_duplicates(subset=HOLIDAY_KEY)
+    return frame.to_dict('records'), errors
+
+def bulk_upsert_holidays(db: Session, records: List[Dict], batch_size: int = 1000) -> int:
+    """
+    Insert holidays in multi-row batches, skipping rows whose (date, locale_name) already
+    exists (INSERT ... ON CONFLICT DO NOTHING on PostgreSQL/SQLite). One commit for all rows.
+    Returns the number of rows inserted.
+    """
+    if not records:
+        return 0
+
+    dialect = db.bind.dialect.name
+    before = count_holidays(db)
+    for start in range(0, len(records), batch_size):
+        batch = records[start:start + batch_size]
+        if dialect in ("postgresql", "sqlite"):
+            if dialect == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            db.execute(insert(Holiday).values(batch).on_conflict_do_nothing(index_elements=HOLIDAY_KEY))
+        else:
+            keys = [(r['date'], r['locale_name']) for r in batch]
+            existing = set(
+                db.query(Holiday.date, Holiday.locale_name)
+                .filter(tuple_(Holiday.date, Holiday.locale_name).in_(keys))
+                .all()
+            )
+            new = [r for r in batch if (r['date'], r['locale_name']) not in existing]
+            if new:
+                db.bulk_insert_mappings(Holiday, new)
+    db.commit()
+    return count_holidays(db) - before
@@ -0,0 +1,81 @@
+from typing import Dict, List, Optional
+from datetime import datetime
+from sqlalchemy.orm import Session
+from app.models.ingestion import IngestionJob, IngestionJobStatus
+
+def create_job(db: Session, content_hash: str, filename: str, size_bytes: int, sheets: Optional[str],
+               chunk_size: int, requested_by: Optional[str] = None) -> IngestionJob:
+    now = datetime.now()
+    db_obj = IngestionJob(
+        content_hash=content_hash,
+        filename=filename,
+        size_bytes=size_bytes,
+        sheets=sheets,
+        chunk_size=chunk_size,
+        status=IngestionJobStatus.RUNNING,
+        requested_by=requested_by,
+        chunks_committed=0,
+        rows_read=0,
+        added_rows=0,
+        skipped_rows=0,
+        rejected_rows=0,
+        error_report=[],
+        created_at=now,
+        updated_at=now
+    )
+    db.add(db_obj)
+    db.commit()
+    db.refresh(db_obj)
+    return db_obj
+
+def get_job(db: Session, job_id: int) -> Optional[IngestionJob]:
+    return db.query(IngestionJob).filter(IngestionJob.id == job_id).first()
+
+def get_jobs(db: Session, status: Optional[str] = None, skip: int = 0, limit: int = 20) -> List[IngestionJob]:
+    query = db.query(IngestionJob)
+    if status:
+        query = query.filter(IngestionJob.status == status)
+    return query.order_by(IngestionJob.id.desc()).offset(skip).limit(limit).all()
+
+def get_job_by_hash(db: Session, content_hash: str, sheets: Optional[str]) -> Optional[IngestionJob]:
+    """Most recent job for this file content and sheet selection."""
+    return (
+        db.query(IngestionJob)
+        .filter(IngestionJob.content_hash == content_hash, IngestionJob.sheets.is_(None) if sheets is None
+                else IngestionJob.sheets == sheets)
+        .order_by(IngestionJob.id.desc())
+        .first()
+    )
+
+def resume_job(db: Session, job: IngestionJob) -> IngestionJob:
+    job.status = IngestionJobStatus.RUNNING
+    job.error = None
+    job.attempts = (job.attempts or 1) + 1
+    job.updated_at = datetime.now()
+    db.commit()
+    db.refresh(job)
+    return job
+
+def checkpoint(db: Session, job: IngestionJob, results: Dict, error_report: List[Dict]):
+    """
+    Record progress after a chunk. Does not commit: the caller commits it together with
+    the chunk's rows.
+    """
+    job.chunks_committed = results["chunks"]
+    job.rows_read = results["rows_read"]
+    job.added_rows = results["added_rows"]
+    job.skipped_rows = results["skipped_rows"]
+    job.rejected_rows = results["rejected_rows"]
+    job.error_report = error_report
+    job.updated_at = datetime.now()
+
+def finish_job(db: Session, job_id: int, status: str, error: Optional[str] = None) -> Optional[IngestionJob]:
+    job = get_job(db, job_id)
+    if job is None:
+        return None
+    job.status = status
+    job.error = error
+    job.updated_at = job.finished_at = datetime.now()
+    db.commit()
+    db.refresh(job)
+    return job
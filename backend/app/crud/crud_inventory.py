@@ -0,0 +1,155 @@
+from collections import Counter
+from typing import Dict, List, Optional
+from sqlalchemy import bindparam, case, event, func, inspect, tuple_
+from sqlalchemy.orm import Session
+from app.models.inventory import StoreInventory, StockAlertCounter, StockStatus
+
+IN_BATCH_SIZE = 500
+
+def stock_status(quantity: Optional[int], threshold: Optional[int]) -> Optional[str]:
+    """StockStatus of an inventory row, or None when it is in stock (NULLs compare like in SQL)."""
+    if quantity == 0:
+        return StockStatus.OUT_OF_STOCK.value
+    if quantity is not None and threshold is not None and 0 < quantity < threshold:
+        return StockStatus.LOW_STOCK.value
+    return None
+
+# Stock alert counters
+def apply_counter_deltas(db: Session, deltas: Dict[str, int]):
+    """Add deltas to StockAlertCounter in the caller's transaction (atomic increments, no read)."""
+    table = StockAlertCounter.__table__
+    for status, delta in deltas.items():
+        if delta:
+            db.connection().execute(
+                table.update().where(table.c.status == status).values(count=table.c.count + delta)
+            )
+
+def count_stock_alerts(db: Session) -> Dict[str, int]:
+    """Full scan of StoreInventory; the source of truth the counters are rebuilt from."""
+    low, out = (
+        db.query(
+            func.sum(case(((StoreInventory.quantity_on_hand > 0) &
+                           (StoreInventory.quantity_on_hand < StoreInventory.low_stock_threshold), 1), else_=0)),
+            func.sum(case((StoreInventory.quantity_on_hand == 0, 1), else_=0))
+        )
+        .one()
+    )
+    return {StockStatus.LOW_STOCK.value: int(low or 0), StockStatus.OUT_OF_STOCK.value: int(out or 0)}
+
+def rebuild_stock_alert_counters(db: Session) -> Dict[str, int]:
+    counts = count_stock_alerts(db)
+    db.query(StockAlertCounter).delete()
+    db.add_all([StockAlertCounter(status=status, count=count) for status, count in counts.items()])
+    db.commit()
+    return counts
+
+def get_stock_alert_counts(db: Session) -> Dict[str, int]:
+    """Low-stock and out-of-stock counts, as shown on the dashboard."""
+    counts = {row.status: row.count for row in db.query(StockAlertCounter).all()}
+    if len(counts) < len(StockStatus):
+        # Counters not initialized yet (they are rebuilt at startup)
+        counts = count_stock_alerts(db)
+    return {
+        "low_stock_count": counts[StockStatus.LOW_STOCK.value],
+        "out_of_stock_count": counts[StockStatus.OUT_OF_STOCK.value]
+    }
+
+def _committed_value(state, key: str):
+    history = state.attrs[key].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return getattr(state.obj(), key)
+
+@event.listens_for(Session, "before_flush")
+def _track_stock_alerts(session: Session, flush_context, instances):
+    """
+    Turn ORM inserts, edits and deletes of StoreInventory into counter deltas. The deltas are
+    only exact if the edited rows were loaded with FOR UPDATE, as every stock writer does.
+    """
+    deltas: Counter = Counter()
+    for obj in session.new:
+        if isinstance(obj, StoreInventory):
+            # Unset attributes get the column defaults on INSERT
+            deltas[stock_status(0 if obj.quantity_on_hand is None else obj.quantity_on_hand,
+                                10 if obj.low_stock_threshold is None else obj.low_stock_threshold)] += 1
+    for obj in session.dirty:
+        if isinstance(obj, StoreInventory) and session.is_modified(obj):
+            state = inspect(obj)
+            deltas[stock_status(_committed_value(state, "quantity_on_hand"),
+                                _committed_value(state, "low_stock_threshold"))] -= 1
+            deltas[stock_status(obj.quantity_on_hand, obj.low_stock_threshold)] += 1
+    for obj in session.deleted:
+        if isinstance(obj, StoreInventory):
+            state = inspect(obj)
+            deltas[stock_status(_committed_value(state, "quantity_on_hand"),
+                                _committed_value(state, "low_stock_threshold"))] -= 1
+    deltas.pop(None, None)
+    if any(deltas.values()):
+        apply_counter_deltas(session, deltas)
+
+# Bulk stock changes (bypass the ORM, so they adjust the counters themselves)
+def decrement_stock(db: Session, rows: List[dict]) -> int:
+    """
+    Subtract sold quantities from StoreInventory, clamped at zero, and adjust the stock alert
+    counters. rows: dicts with product_id, store_id, quantity (one per pair). Pairs without an
+    inventory record are ignored. The affected rows are read with FOR UPDATE (PostgreSQL) so
+    the status transitions are exact under concurrent edits. Does not commit.
+    """
+    if not rows:
+        return 0
+    sold = {(r["product_id"], r["store_id"]): r["quantity"] for r in rows}
+    keys = list(sold)
+    table = StoreInventory.__table__
+    updates, deltas = [], Counter()
+    for start in range(0, len(keys), IN_BATCH_SIZE):
+        current = db.execute(
+            table.select()
+            .with_only_columns(table.c.id, table.c.product_id, table.c.store_id,
+                               table.c.quantity_on_hand, table.c.low_stock_threshold)
+            .where(tuple_(table.c.product_id, table.c.store_id).in_(keys[start:start + IN_BATCH_SIZE]))
+            .with_for_update()
+        ).all()
+        for row in current:
+            quantity = max(0, (row.quantity_on_hand or 0) - sold[(row.product_id, row.store_id)])
+            updates.append({"b_id": row.id, "b_quantity": quantity})
+            deltas[stock_status(row.quantity_on_hand, row.low_stock_threshold)] -= 1
+            deltas[stock_status(quantity, row.low_stock_threshold)] += 1
+    if not updates:
+        return 0
+    db.execute(table.update().where(table.c.id == bindparam("b_id")).values(quantity_on_hand=bindparam("b_quantity")),
+               updates)
+    deltas.pop(None, None)
+    apply_counter_deltas(db, deltas)
+    return len(updates)
+
+def set_low_stock_thresholds(db: Session, thresholds: Dict[int, int]) -> Dict[str, int]:
+    """
+    Set low_stock_threshold per StoreInventory id and adjust the stock alert counters.
+    Like decrement_stock, the rows are read with FOR UPDATE (PostgreSQL) right before the
+    update, so the transitions use the current quantity_on_hand. Returns the counter deltas
+    applied. Does not commit.
+    """
+    ids = list(thresholds)
+    table = StoreInventory.__table__
+    updates, deltas = [], Counter()
+    for start in range(0, len(ids), IN_BATCH_SIZE):
+        current = db.execute(
+            table.select()
+            .with_only_columns(table.c.id, table.c.quantity_on_hand, table.c.low_stock_threshold)
+            .where(table.c.id.in_(ids[start:start + IN_BATCH_SIZE]))
+            .with_for_update()
+        ).all()
+        for row in current:
+            threshold = thresholds[row.id]
+            updates.append({"b_id": row.id, "b_threshold": threshold})
+            deltas[stock_status(row.quantity_on_hand, row.low_stock_threshold)] -= 1
+            deltas[stock_status(row.quantity_on_hand, threshold)] += 1
+    if updates:
+        db.execute(table.update().where(table.c.id == bindparam("b_id")).values(low_stock_threshold=bindparam("b_threshold")),
+                   updates)
+    deltas.pop(None, None)
+    deltas = {status: delta for status, delta in deltas.items() if delta}
+    apply_counter_deltas(db, deltas)
+    return deltas
@@ -0,0 +1,32 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.models.replenishment import ReplenishmentPlan
+
+INSERT_BATCH_SIZE = 5000
+
+def delete_plans(db: Session) -> int:
+    """Delete every ReplenishmentPlan row (they reference the draft orders of the run). Does not commit."""
+    return db.query(ReplenishmentPlan).delete(synchronize_session=False)
+
+def insert_plans(db: Session, rows: List[Dict]) -> int:
+    """Insert ReplenishmentPlan rows (executemany in batches). Does not commit."""
+    table = ReplenishmentPlan.__table__
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        db.execute(table.insert(), rows[start:start + INSERT_BATCH_SIZE])
+    return len(rows)
+
+def get_last_computed_at(db: Session) -> Optional[datetime]:
+    return db.query(func.max(ReplenishmentPlan.computed_at)).scalar()
+
+def get_plans(db: Session, store_id: Optional[int] = None, product_id: Optional[int] = None,
+              only_orders: bool = True, skip: int = 0, limit: int = 100) -> List[ReplenishmentPlan]:
+    query = db.query(ReplenishmentPlan)
+    if store_id is not None:
+        query = query.filter(ReplenishmentPlan.store_id == store_id)
+    if product_id is not None:
+        query = query.filter(ReplenishmentPlan.product_id == product_id)
+    if only_orders:
+        query = query.filter(ReplenishmentPlan.suggested_quantity > 0)
+    return query.order_by(ReplenishmentPlan.suggested_quantity.desc(), ReplenishmentPlan.id).offset(skip).limit(limit).all()
@@ -1,7 +1,11 @@
-from typing import List, Optional
-from datetime import date
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from datetime import date, datetime, timedelta
 from sqlalchemy.orm import Session
-from app.models.sales import SalesData, Product, Store
+from sqlalchemy import case, delete, func, insert, select
+import numpy as np
+import pandas as pd
+from app.models.sales import SalesData, Product, Store, DailySalesRollup
+from app.models.forecast import OutlierThreshold
 from app.schemas.sales import ProductCreate, StoreCreate, SalesDataCreate
 
 # Product CRUD
@@ -47,12 +51,397 @@ def create_sales_data(db: Session, obj_in: SalesDataCreate, product_id: int, sto
     db.refresh(db_obj)
     return db_obj
 
+# Bulk ingestion helpers (used by app/ingestion). Lookups are split into batches so the
+# IN lists stay below SQLite's bound-parameter limit.
+IN_BATCH_SIZE = 5000
+
+def _batched(values: List, size: int = IN_BATCH_SIZE):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+def get_or_create_products(db: Session, products: List[dict]) -> Dict[str, int]:
+    """
+    Map SKUs to Product ids, inserting the missing products in one executemany.
+    products: dicts with sku, category, price (one per SKU). Does not commit.
+    """
+    skus = [p["sku"] for p in products]
+    ids = {}
+    for batch in _batched(skus):
+        ids.update(db.query(Product.sku, Product.id).filter(Product.sku.in_(batch)).all())
+    missing = [p for p in products if p["sku"] not in ids]
+    if missing:
+        db.execute(insert(Product), missing)
+        for batch in _batched([p["sku"] for p in missing]):
+            ids.update(db.query(Product.sku, Product.id).filter(Product.sku.in_(batch)).all())
+    return ids
+
+def get_or_create_stores(db: Session, stores: List[dict]) -> Dict[str, int]:
+    """Map store codes to Store ids, inserting the missing stores (dicts with store_id, region). Does not commit."""
+    codes = [s["store_id"] for s in stores]
+    ids = {}
+    for batch in _batched(codes):
+        ids.update(db.query(Store.store_id, Store.id).filter(Store.store_id.in_(batch)).all())
+    missing = [s for s in stores if s["store_id"] not in ids]
+    if missing:
+        db.execute(insert(Store), missing)
+        for batch in _batched([s["store_id"] for s in missing]):
+            ids.update(db.query(Store.store_id, Store.id).filter(Store.store_id.in_(batch)).all())
+    return ids
+
+def get_existing_sales_keys(db: Session, sku_ids: Iterable[int], start_date: date, end_date: date) -> Set[Tuple[date, int, int]]:
+    """(date, sku_id, store_id) keys already stored for the given products within [start_date, end_date]."""
+    keys = set()
+    for batch in _batched(sorted(set(sku_ids))):
+        keys.update(
+            db.query(SalesData.date, SalesData.sku_id, SalesData.store_id)
+            .filter(SalesData.sku_id.in_(batch))
+            .filter(SalesData.date >= start_date, SalesData.date <= end_date)
+            .distinct()
+            .all()
+        )
+    return keys
+
+def bulk_insert_sales(db: Session, records: List[dict]) -> int:
+    """Insert SalesData rows (date, sku_id, store_id, quantity, onpromotion) with one executemany. Does not commit."""
+    if records:
+        db.execute(insert(SalesData), records)
+    return len(records)
+
+def get_products_by_skus(db: Session, skus: List[str]) -> Dict[str, Tuple[int, Optional[float]]]:
+    """sku -> (product id, current price) for the SKUs that exist."""
+    found = {}
+    for batch in _batched(sorted(set(skus))):
+        found.update((sku, (pid, price)) for sku, pid, price in
+                     db.query(Product.sku, Product.id, Product.price).filter(Product.sku.in_(batch)).all())
+    return found
+
+def get_store_ids(db: Session, codes: List[str]) -> Dict[str, int]:
+    """store code -> Store id for the codes that exist."""
+    found = {}
+    for batch in _batched(sorted(set(codes))):
+        found.update(db.query(Store.store_id, Store.id).filter(Store.store_id.in_(batch)).all())
+    return found
+
+ROLLUP_KEY = ['date', 'sku_id', 'store_id']
+
+def upsert_daily_rollups(db: Session, rows: List[dict]) -> int:
+    """
+    Add (date, sku_id, store_id, quantity, revenue, records) increments to DailySalesRollup
+    with INSERT ... ON CONFLICT DO UPDATE on PostgreSQL/SQLite, read-modify-write elsewhere.
+    Does not commit.
+    """
+    if not rows:
+        return 0
+    now = datetime.now()
+    rows = [dict(row, updated_at=now) for row in rows]
+    dialect = db.bind.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        table = DailySalesRollup.__table__
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=ROLLUP_KEY,
+            set_={
+                "quantity": table.c.quantity + stmt.excluded.quantity,
+                "revenue": table.c.revenue + stmt.excluded.revenue,
+                "records": table.c.records + stmt.excluded.records,
+                "updated_at": stmt.excluded.updated_at
+            }
+        )
+        db.execute(stmt, rows)
+    else:
+        for row in rows:
+            existing = db.query(DailySalesRollup).filter_by(date=row["date"], sku_id=row["sku_id"], store_id=row["store_id"]).first()
+            if existing is None:
+                db.add(DailySalesRollup(**row))
+            else:
+                existing.quantity += row["quantity"]
+                existing.revenue += row["revenue"]
+                existing.records += row["records"]
+                existing.updated_at = now
+        db.flush()
+    return len(rows)
+
+def get_rollup_increments(db: Session, rows: pd.DataFrame) -> List[dict]:
+    """
+    DailySalesRollup increments for a set of SalesData changes: rows has date, sku_id,
+    store_id, quantity and optionally records (default 1 per row; negative to remove).
+    Revenue uses the products' current prices, as rebuild_daily_rollups does; rows of
+    products that do not exist are never rolled up and are ignored.
+    """
+    if rows.empty:
+        return []
+    prices = {}
+    for batch in _batched(sorted(int(i) for i in rows["sku_id"].dropna().unique())):
+        prices.update(db.query(Product.id, Product.price).filter(Product.id.in_(batch)).all())
+    rows = rows[rows["sku_id"].isin(list(prices)) & rows["store_id"].notna()]
+    if rows.empty:
+        return []
+    price = rows["sku_id"].map(prices).astype(float).fillna(0.0)
+    frame = pd.DataFrame({
+        "date": pd.to_datetime(rows["date"]).dt.date,
+        "sku_id": rows["sku_id"].astype("int64"),
+        "store_id": rows["store_id"].astype("int64"),
+        "quantity": rows["quantity"].astype("int64"),
+        "revenue": rows["quantity"] * price,
+        "records": rows["records"] if "records" in rows else 1
+    })
+    totals = frame.groupby(ROLLUP_KEY, as_index=False)[["quantity", "revenue", "records"]].sum()
+    return [
+        {"date": d, "sku_id": int(p), "store_id": int(s), "quantity": int(q), "revenue": round(float(r), 2), "records": int(n)}
+        for d, p, s, q, r, n in totals.itertuples(index=False)
+    ]
+
+def get_daily_rollup_totals(db: Session, day: date) -> Dict[str, float]:
+    """Quantity, revenue and record count of one day, from DailySalesRollup."""
+    quantity, revenue, records = (
+        db.query(func.sum(DailySalesRollup.quantity), func.sum(DailySalesRollup.revenue), func.sum(DailySalesRollup.records))
+        .filter(DailySalesRollup.date == day)
+        .one()
+    )
+    return {"quantity": int(quantity or 0), "revenue": round(float(revenue or 0.0), 2), "records": int(records or 0)}
+
+def get_last_rollup_date(db: Session) -> Optional[date]:
+    return db.query(func.max(DailySalesRollup.date)).scalar()
+
+def get_last_sales_date(db: Session) -> Optional[date]:
+    return db.query(func.max(SalesData.date)).scalar()
+
+def get_rollup_history(db: Session, start_date: date, days: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Daily quantities of every (sku, store) series with sales in the 'days' days from start_date,
+    from DailySalesRollup, as (sku_ids, store_ids, history): history is a dense (series x day)
+    matrix with 0 for days without sales. Read one day at a time through Core, so no per-row
+    date conversion or ORM row processing is needed for millions of rollup rows.
+    """
+    table = DailySalesRollup.__table__
+    connection = db.connection()
+    parts = []
+    for offset in range(days):
+        rows = connection.execute(
+            select(table.c.sku_id, table.c.store_id, table.c.quantity)
+            .where(table.c.date == start_date + timedelta(days=offset))
+        ).fetchall()
+        if rows:
+            sku_ids, store_ids, quantities = (np.asarray(c, dtype=np.int64) for c in zip(*rows))
+            parts.append((np.full(len(rows), offset), sku_ids, store_ids, quantities))
+    if not parts:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros((0, days))
+    offsets, sku_ids, store_ids, quantities = (np.concatenate(c) for c in zip(*parts))
+    stride = int(store_ids.max()) + 1
+    keys, series = np.unique(sku_ids * stride + store_ids, return_inverse=True)
+    history = np.zeros((len(keys), days))
+    history[series, offsets] = quantities
+    return keys // stride, keys % stride, history
+
+def get_series_attributes(db: Session, sku_ids: np.ndarray, store_ids: np.ndarray):
+    """sku, store_id, category and region of each (sku_id, store_id) series, as a DataFrame in the same order."""
+    products = {pid: (sku, category) for pid, sku, category in db.query(Product.id, Product.sku, Product.category)}
+    stores = {sid: (code, region) for sid, code, region in db.query(Store.id, Store.store_id, Store.region)}
+    return pd.DataFrame({
+        "sku": [products[i][0] for i in sku_ids.tolist()],
+        "store_id": [stores[i][0] for i in store_ids.tolist()],
+        "category": [products[i][1] for i in sku_ids.tolist()],
+        "region": [stores[i][1] for i in store_ids.tolist()],
+    })
+
+def rebuild_daily_rollups(db: Session, start_date: date, end_date: date) -> int:
+    """
+    Recompute DailySalesRollup for [start_date, end_date] from SalesData (one-shot backfill:
+    it deletes and re-inserts the range, so run it while nothing else writes sales). Live
+    writers add increments with upsert_daily_rollups instead. Does not commit.
+    """
+    db.execute(delete(DailySalesRollup).where(DailySalesRollup.date >= start_date, DailySalesRollup.date <= end_date))
+    totals = (
+        select(
+            SalesData.date,
+            SalesData.sku_id,
+            SalesData.store_id,
+            func.sum(SalesData.quantity),
+            func.sum(SalesData.quantity * func.coalesce(Product.price, 0.0)),
+            func.count(SalesData.id),
+            func.now()
+        )
+        .join(Product, SalesData.sku_id == Product.id)
+        .where(SalesData.date >= start_date, SalesData.date <= end_date, SalesData.store_id.isnot(None))
+        .group_by(SalesData.date, SalesData.sku_id, SalesData.store_id)
+    )
+    result = db.execute(
+        insert(DailySalesRollup).from_select(
+            ["date", "sku_id", "store_id", "quantity", "revenue", "records", "updated_at"], totals
+        )
+    )
+    return result.rowcount
+
 def get_sales_data(db: Session, skip: int = 0, limit: int = 100) -> List[SalesData]:
     return db.query(SalesData).offset(skip).limit(limit).all()
 
 def get_total_sales_count(db: Session) -> int:
     return db.query(SalesData).count()
 
+def has_sales(db: Session) -> bool:
+    return db.query(SalesData.id).first() is not None
+
+def get_inactive_store_counts(db: Session, since: date) -> Tuple[int, int]:
+    """
+    (stores without any sale on or after 'since', total stores) in one query: an anti-join
+    (NOT EXISTS) per store that probes ix_salesdata_store_date instead of scanning recent sales.
+    """
+    recent_sale = select(SalesData.id).where(SalesData.store_id == Store.id, SalesData.date >= since).exists()
+    inactive, total = db.query(
+        func.sum(case((~recent_sale, 1), else_=0)),
+        func.count(Store.id)
+    ).one()
+    return int(inactive or 0), int(total or 0)
+
+def get_sales_high_water_mark(db: Session):
+    """
+    Cheap fingerprint of the sales table: (row count, max id, max date).
+    Changes whenever rows are added or removed; used to key caches of derived data.
+    """
+    row = db.query(func.count(SalesData.id), func.max(SalesData.id), func.max(SalesData.date)).one()
+    return (row[0] or 0, row[1] or 0, str(row[2]) if row[2] else None)
+
+def count_sales_after_id(db: Session, max_id: int) -> int:
+    """Rows inserted after the row with id 'max_id' (ids are monotonically increasing)."""
+    return db.query(func.count(SalesData.id)).filter(SalesData.id > max_id).scalar() or 0
+
+def _daily_series_totals():
+    """Subquery: one row per (sku_id, store_id, date) with the summed quantity."""
+    return (
+        select(
+            SalesData.sku_id,
+            SalesData.store_id,
+            SalesData.date,
+            func.sum(SalesData.quantity).label("quantity"),
+            func.max(case((SalesData.onpromotion == True, 1), else_=0)).label("onpromotion")
+        )
+        .group_by(SalesData.sku_id, SalesData.store_id, SalesData.date)
+        .subquery()
+    )
+
+def get_daily_training_totals(db: Session, capped: bool = False):
+    """
+    One row per day for the global model: SUM(quantity) and MAX(onpromotion), aggregated in SQL.
+    Memory is bounded by the number of days, not the number of sales rows.
+    capped: clip each (sku, store) daily total to its recorded OutlierThreshold before summing.
+    Returns (date, quantity, onpromotion) tuples.
+    """
+    if not capped:
+        return (
+            db.query(
+                SalesData.date,
+                func.sum(SalesData.quantity),
+                func.max(case((SalesData.onpromotion == True, 1), else_=0))
+            )
+            .group_by(SalesData.date)
+            .order_by(SalesData.date)
+            .all()
+        )
+
+    daily = _daily_series_totals()
+    quantity = case(
+        (OutlierThreshold.id.is_(None), daily.c.quantity),
+        (daily.c.quantity < OutlierThreshold.lower, OutlierThreshold.lower),
+        (daily.c.quantity > OutlierThreshold.upper, OutlierThreshold.upper),
+        else_=daily.c.quantity
+    )
+    return (
+        db.query(daily.c.date, func.sum(quantity), func.max(daily.c.onpromotion))
+        .select_from(daily)
+        .outerjoin(
+            OutlierThreshold,
+            (OutlierThreshold.sku_id == daily.c.sku_id) & (OutlierThreshold.store_id == daily.c.store_id)
+        )
+        .group_by(daily.c.date)
+        .order_by(daily.c.date)
+        .all()
+    )
+
+def get_daily_series_quantities(db: Session):
+    """
+    Daily totals per (sku_id, store_id) series as NumPy columns, for computing per-series statistics.
+    Returns a dict with 'sku_id', 'store_id' and 'quantity' arrays.
+    """
+    daily = _daily_series_totals()
+    rows = db.execute(
+        select(daily.c.sku_id, daily.c.store_id, daily.c.quantity)
+        .where(daily.c.sku_id.isnot(None), daily.c.store_id.isnot(None))
+    ).all()
+    columns = list(zip(*rows)) if rows else [(), (), ()]
+    return {
+        "sku_id": np.asarray(columns[0], dtype=np.int64),
+        "store_id": np.asarray(columns[1], dtype=np.int64),
+        "quantity": np.asarray(columns[2], dtype=float),
+    }
+
+def get_series_quantile_thresholds(db: Session, lower_quantile: float, upper_quantile: float):
+    """
+    Per-series quantiles of daily totals computed in the database with percentile_cont
+    (PostgreSQL). Returns (sku_id, store_id, lower, upper, observations) rows.
+    """
+    daily = _daily_series_totals()
+    return db.execute(
+        select(
+            daily.c.sku_id,
+            daily.c.store_id,
+            func.percentile_cont(lower_quantile).within_group(daily.c.quantity),
+            func.percentile_cont(upper_quantile).within_group(daily.c.quantity),
+            func.count()
+        )
+        .where(daily.c.sku_id.isnot(None), daily.c.store_id.isnot(None))
+        .group_by(daily.c.sku_id, daily.c.store_id)
+    ).all()
+
+def replace_outlier_thresholds(db: Session, thresholds: List[dict]) -> int:
+    """
+    Replace all recorded thresholds with 'thresholds' (dicts of OutlierThreshold columns) in one transaction.
+    """
+    db.query(OutlierThreshold).delete(synchronize_session=False)
+    if thresholds:
+        db.bulk_insert_mappings(OutlierThreshold, thresholds)
+    db.commit()
+    return len(thresholds)
+
+def get_outlier_threshold(db: Session, sku: str, store_id: str) -> Optional[OutlierThreshold]:
+    return (
+        db.query(OutlierThreshold)
+        .join(Product, OutlierThreshold.sku_id == Product.id)
+        .join(Store, OutlierThreshold.store_id == Store.id)
+        .filter(Product.sku == sku)
+        .filter(Store.store_id == store_id)
+        .first()
+    )
+
+def get_outlier_thresholds(db: Session, sku: Optional[str] = None, store_id: Optional[str] = None,
+                           skip: int = 0, limit: int = 100):
+    """
+    Recorded thresholds with business keys. Returns (sku, store_id, lower, upper, method, observations, computed_at) rows.
+    """
+    query = (
+        db.query(
+            Product.sku,
+            Store.store_id,
+            OutlierThreshold.lower,
+            OutlierThreshold.upper,
+            OutlierThreshold.method,
+            OutlierThreshold.observations,
+            OutlierThreshold.computed_at
+        )
+        .select_from(OutlierThreshold)
+        .join(Product, OutlierThreshold.sku_id == Product.id)
+        .join(Store, OutlierThreshold.store_id == Store.id)
+    )
+    if sku:
+        query = query.filter(Product.sku == sku)
+    if store_id:
+        query = query.filter(Store.store_id == store_id)
+    return query.order_by(Product.sku, Store.store_id).offset(skip).limit(limit).all()
+
 def get_total_products_count(db: Session) -> int:
     return db.query(Product).count()
 
@@ -73,6 +462,31 @@ def get_sales_by_sku_store(db: Session, sku: str, store_id: str) -> List[SalesDa
         .all()
     )
 
+def get_daily_quantities_by_sku_store(db: Session, sku: str, store_id: str):
+    """
+    Daily totals for one SKU/Store series, aggregated in SQL.
+    Only (date, quantity, row count) tuples are selected - no ORM objects are built.
+    Returns (dates as datetime64[D] array, quantities as float array, total raw row count).
+    """
+    rows = (
+        db.query(
+            SalesData.date,
+            func.sum(SalesData.quantity),
+            func.count(SalesData.id)
+        )
+        .join(Product, SalesData.sku_id == Product.id)
+        .join(Store, SalesData.store_id == Store.id)
+        .filter(Product.sku == sku)
+        .filter(Store.store_id == store_id)
+        .group_by(SalesData.date)
+        .order_by(SalesData.date)
+        .all()
+    )
+    dates = np.array([r[0] for r in rows], dtype="datetime64[D]")
+    quantities = np.fromiter((r[1] or 0 for r in rows), dtype=float, count=len(rows))
+    row_count = int(sum(r[2] for r in rows))
+    return dates, quantities, row_count
+
 def get_sales_data_detail(db: Session, date: date, sku_id: int, store_id: int) -> Optional[SalesData]:
     return (
         db.query(SalesData)
@@ -82,8 +496,6 @@ def get_sales_data_detail(db: Session, date: date, sku_id: int, store_id: int) -
         .first()
     )
 
-from sqlalchemy import func
-
 def get_total_revenue(db: Session) -> float:
     # quantity * product.price
     result = db.query(func.sum(SalesData.quantity * Product.price)).select_from(SalesData).join(Product).scalar()
@@ -165,3 +577,34 @@ def get_daily_sales_trend(db: Session, days: int = 30):
         .order_by(SalesData.date)
         .all()
     )
+
+def get_daily_sales_by_series(db: Session, sku: Optional[str] = None, store_id: Optional[str] = None):
+    """
+    Daily quantity per (sku, store) series, aggregated in SQL, with the series' category and region.
+    Returns rows of (sku, store_id, category, region, date, quantity, records).
+    """
+    query = (
+        db.query(
+            Product.sku,
+            Store.store_id,
+            Product.category,
+            Store.region,
+            SalesData.date,
+            func.sum(SalesData.quantity).label("quantity"),
+            func.count(SalesData.id).label("records")
+        )
+        .select_from(SalesData)
+        .join(Product, SalesData.sku_id == Product.id)
+        .join(Store, SalesData.store_id == Store.id)
+    )
+    if sku:
+        query = query.filter(Product.sku == sku)
+    if store_id:
+        query = query.filter(Store.store_id == store_id)
+
+    return (
+        query
+        .group_by(Product.sku, Store.store_id, Product.category, Store.region, SalesData.date)
+        .order_by(Product.sku, Store.store_id, SalesData.date)
+        .all()
+    )
@@ -1,5 +1,7 @@
+from typing import Dict, List, Optional
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from app.models.supply_chain import Supplier, PurchaseOrder, Shipment
+from app.models.supply_chain import Supplier, PurchaseOrder, PurchaseOrderLine, Shipment, POStatus
 from app.schemas.supply_chain import (
     SupplierCreate, PurchaseOrderCreate, ShipmentCreate,
     SupplierUpdate, PurchaseOrderUpdate, ShipmentUpdate
@@ -48,3 +50,44 @@ def create_shipment(db: Session, shipment: ShipmentCreate):
     db.commit()
     db.refresh(db_obj)
     return db_obj
+
+def get_lead_time_history(db: Session) -> Dict[Optional[int], List[int]]:
+    """Days from order date to shipment ETA of every non-cancelled purchase order, per supplier."""
+    rows = (
+        db.query(PurchaseOrder.supplier_id, PurchaseOrder.order_date, Shipment.eta)
+        .join(Shipment, Shipment.purchase_order_id == PurchaseOrder.id)
+        .filter(PurchaseOrder.order_date.isnot(None), Shipment.eta.isnot(None),
+                PurchaseOrder.status != POStatus.CANCELLED)
+        .all()
+    )
+    history: Dict[Optional[int], List[int]] = {}
+    for supplier_id, ordered, eta in rows:
+        if eta >= ordered:
+            history.setdefault(supplier_id, []).append((eta - ordered).days)
+    return history
+
+def get_average_lead_time_days(db: Session) -> Optional[float]:
+    """Mean days from a purchase order's order date to its shipment's ETA (None without history)."""
+    days = [d for supplier_days in get_lead_time_history(db).values() for d in supplier_days]
+    return sum(days) / len(days) if days else None
+
+# Purchase order lines and replenishment drafts
+OPEN_PO_STATUSES = [POStatus.PENDING.value, POStatus.APPROVED.value, POStatus.PROCESSING.value]
+
+def get_on_order_quantities(db: Session):
+    """Quantities on open (not draft, delivered or cancelled) purchase orders per (product_id, store_id)."""
+    return (
+        db.query(PurchaseOrderLine.product_id, PurchaseOrderLine.store_id,
+                 func.sum(PurchaseOrderLine.quantity).label("quantity"))
+        .join(PurchaseOrder, PurchaseOrder.id == PurchaseOrderLine.purchase_order_id)
+        .filter(PurchaseOrder.status.in_(OPEN_PO_STATUSES))
+        .group_by(PurchaseOrderLine.product_id, PurchaseOrderLine.store_id)
+        .all()
+    )
+
+def delete_draft_orders(db: Session) -> int:
+    """Delete the DRAFT purchase orders and their lines (approved drafts are Pending). Does not commit."""
+    drafts = db.query(PurchaseOrder.id).filter(PurchaseOrder.status == POStatus.DRAFT.value)
+    db.query(PurchaseOrderLine).filter(PurchaseOrderLine.purchase_order_id.in_(drafts.scalar_subquery())) \
+        .delete(synchronize_session=False)
+    return db.query(PurchaseOrder).filter(PurchaseOrder.status == POStatus.DRAFT.value).delete(synchronize_session=False)
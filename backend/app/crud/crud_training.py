@@ -0,0 +1,202 @@
+from typing import List, Optional
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select, update
+from app.db.locks import TRAINING_QUEUE, advisory_xact_lock
+from app.models.training import TrainingJob, TrainingJobStatus
+
+ACTIVE_STATUSES = [TrainingJobStatus.QUEUED, TrainingJobStatus.RUNNING]
+
+def create_job(db: Session, auto_tune: bool = False, incremental: bool = False, trigger: str = "manual",
+               requested_by: Optional[str] = None) -> TrainingJob:
+    db_obj = TrainingJob(
+        status=TrainingJobStatus.QUEUED,
+        auto_tune=auto_tune,
+        incremental=incremental,
+        trigger=trigger,
+        requested_by=requested_by,
+        stage="Queued",
+        progress=0.0,
+        stage_timings={},
+        created_at=datetime.now() # same clock as started_at/finished_at and the scheduler's debounce
+    )
+    db.add(db_obj)
+    db.commit()
+    db.refresh(db_obj)
+    return db_obj
+
+def get_job(db: Session, job_id: int) -> Optional[TrainingJob]:
+    return db.query(TrainingJob).filter(TrainingJob.id == job_id).first()
+
+def get_jobs(db: Session, status: Optional[str] = None, skip: int = 0, limit: int = 20) -> List[TrainingJob]:
+    query = db.query(TrainingJob)
+    if status:
+        query = query.filter(TrainingJob.status == status)
+    return query.order_by(TrainingJob.id.desc()).offset(skip).limit(limit).all()
+
+def get_latest_job(db: Session) -> Optional[TrainingJob]:
+    """The running job if there is one, otherwise the most recent job."""
+    running = (
+        db.query(TrainingJob)
+        .filter(TrainingJob.status == TrainingJobStatus.RUNNING)
+        .order_by(TrainingJob.id.desc())
+        .first()
+    )
+    return running or db.query(TrainingJob).order_by(TrainingJob.id.desc()).first()
+
+def get_last_completed_job(db: Session) -> Optional[TrainingJob]:
+    return (
+        db.query(TrainingJob)
+        .filter(TrainingJob.status == TrainingJobStatus.COMPLETED)
+        .order_by(TrainingJob.finished_at.desc(), TrainingJob.id.desc())
+        .first()
+    )
+
+def get_last_job_by_triggers(db: Session, triggers: List[str]) -> Optional[TrainingJob]:
+    return (
+        db.query(TrainingJob)
+        .filter(TrainingJob.trigger.in_(triggers))
+        .order_by(TrainingJob.id.desc())
+        .first()
+    )
+
+def count_jobs(db: Session, statuses: List[str]) -> int:
+    return db.query(func.count(TrainingJob.id)).filter(TrainingJob.status.in_(statuses)).scalar() or 0
+
+def queue_position(db: Session, job: TrainingJob) -> int:
+    """1-based position of a queued job (0 if it is not queued)."""
+    if job.status != TrainingJobStatus.QUEUED:
+        return 0
+    return (
+        db.query(func.count(TrainingJob.id))
+        .filter(TrainingJob.status == TrainingJobStatus.QUEUED)
+        .filter(TrainingJob.id <= job.id)
+        .scalar()
+    )
+
+def claim_next_job(db: Session, worker: str, max_concurrent: int) -> Optional[TrainingJob]:
+    """
+    Atomically move the oldest queued job to Running for 'worker'.
+    The claim is a single conditional UPDATE (still Queued, and fewer than 'max_concurrent'
+    jobs running). On PostgreSQL the transaction first takes an advisory lock, so concurrent
+    claims run one after another and each counts the running jobs committed by the previous
+    one (under READ COMMITTED two overlapping UPDATEs could otherwise both see a free slot).
+    SQLite already serializes writers. Returns None when nothing was claimed.
+    """
+    advisory_xact_lock(db, TRAINING_QUEUE)
+
+    candidate = (
+        db.query(TrainingJob.id)
+        .filter(TrainingJob.status == TrainingJobStatus.QUEUED)
+        .order_by(TrainingJob.id)
+        .limit(1)
+        .scalar()
+    )
+    if candidate is None:
+        db.commit() # ends the transaction (and releases the claim lock)
+        return None
+
+    running = (
+        select(func.count(TrainingJob.id))
+        .where(TrainingJob.status == TrainingJobStatus.RUNNING)
+        .scalar_subquery()
+    )
+    now = datetime.now()
+    claimed = db.execute(
+        update(TrainingJob)
+        .where(TrainingJob.id == candidate)
+        .where(TrainingJob.status == TrainingJobStatus.QUEUED)
+        .where(running < max_concurrent)
+        .values(status=TrainingJobStatus.RUNNING, worker=worker, started_at=now,
+                heartbeat_at=now, stage="Starting")
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return get_job(db, candidate) if claimed else None
+
+def update_progress(db: Session, job_id: int, stage: str, progress: float, stage_timings: dict):
+    db.execute(
+        update(TrainingJob)
+        .where(TrainingJob.id == job_id)
+        .values(stage=stage, progress=progress, stage_timings=stage_timings, heartbeat_at=datetime.now())
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+def set_data_high_water_mark(db: Session, job_id: int, high_water_mark: dict):
+    db.execute(
+        update(TrainingJob)
+        .where(TrainingJob.id == job_id)
+        .values(data_high_water_mark=high_water_mark)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+def heartbeat(db: Session, job_ids: List[int]):
+    if not job_ids:
+        return
+    db.execute(
+        update(TrainingJob)
+        .where(TrainingJob.id.in_(job_ids))
+        .values(heartbeat_at=datetime.now())
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+def finish_job(db: Session, job_id: int, status: str, result: Optional[dict] = None,
+               error: Optional[str] = None, stage_timings: Optional[dict] = None,
+               profile: Optional[dict] = None) -> Optional[TrainingJob]:
+    job = get_job(db, job_id)
+    if not job:
+        return None
+    job.status = status
+    job.finished_at = datetime.now()
+    job.stage = status
+    if status == TrainingJobStatus.COMPLETED:
+        job.progress = 100.0
+    if result is not None:
+        job.result = result
+    if error is not None:
+        job.error = error
+    if stage_timings is not None:
+        job.stage_timings = stage_timings
+    if profile is not None:
+        job.profile = profile
+    if job.started_at:
+        job.duration_seconds = (job.finished_at - job.started_at).total_seconds()
+    db.commit()
+    db.refresh(job)
+    return job
+
+def request_cancel(db: Session, job_id: int) -> Optional[TrainingJob]:
+    """
+    Queued jobs are cancelled immediately; running jobs are flagged and stopped by their worker.
+    """
+    job = get_job(db, job_id)
+    if not job:
+        return None
+    if job.status == TrainingJobStatus.QUEUED:
+        return finish_job(db, job_id, TrainingJobStatus.CANCELLED, error="Cancelled before start.")
+    if job.status == TrainingJobStatus.RUNNING:
+        job.cancel_requested = True
+        db.commit()
+        db.refresh(job)
+    return job
+
+def is_cancel_requested(db: Session, job_id: int) -> bool:
+    return bool(db.query(TrainingJob.cancel_requested).filter(TrainingJob.id == job_id).scalar())
+
+def fail_stale_jobs(db: Session, stale_after_seconds: int) -> int:
+    """
+    Fail running jobs whose worker stopped sending heartbeats (e.g. the process was killed).
+    """
+    cutoff = datetime.now() - timedelta(seconds=stale_after_seconds)
+    stale = (
+        db.query(TrainingJob)
+        .filter(TrainingJob.status == TrainingJobStatus.RUNNING)
+        .filter(TrainingJob.heartbeat_at < cutoff)
+        .all()
+    )
+    for job in stale:
+        finish_job(db, job.id, TrainingJobStatus.FAILED, error="Worker stopped responding.")
+    return len(stale)
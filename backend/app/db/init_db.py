@@ -2,9 +2,15 @@ from app.db.base_class import Base
 from app.db.session import engine
 # Make sure to import all models here so they are registered with Base.metadata
 from app.models.user import User
-from app.models.sales import Product, Store, SalesData, Holiday
-from app.models.forecast import Forecast
-from app.models.supply_chain import Supplier, PurchaseOrder, Shipment
+from app.models.sales import Product, Store, SalesData, Holiday, DailySalesRollup
+from app.models.forecast import Forecast, OutlierThreshold
+from app.models.supply_chain import Supplier, PurchaseOrder, PurchaseOrderLine, Shipment
+from app.models.training import TrainingJob
+from app.models.ingestion import IngestionJob
+from app.models.dashboard import DashboardEvent
+from app.models.inventory import StoreInventory, StockAlertCounter
+from app.models.alert import Alert
+from app.models.replenishment import ReplenishmentPlan
 
 def init_db():
     Base.metadata.create_all(bind=engine)
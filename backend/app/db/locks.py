@@ -0,0 +1,17 @@
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Advisory lock keys, one per kind of work that must not run concurrently across processes
+TRAINING_QUEUE = 0x7472616E # "tran": claiming and queueing training jobs
+REPLENISHMENT_RUN = 0x7265706C # "repl"
+ALERT_RULE_RUN = 0x616C7274 # "alrt"
+DATA_QUALITY_SCAN = 0x64717561 # "dqua": claiming the single running data-quality scan
+
+def advisory_xact_lock(db: Session, key: int):
+    """
+    Wait until the current transaction holds the PostgreSQL advisory lock 'key'; it is
+    released at commit or rollback. A no-op on other databases (SQLite serializes writers
+    and is only used single-process).
+    """
+    if db.bind.dialect.name == "postgresql":
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": key})
@@ -0,0 +1,221 @@
+import queue
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.crud import crud_dashboard, crud_inventory, crud_sales
+from app.db.session import SessionLocal
+
+MAX_REPORTED_ERRORS = 20
+
+@dataclass
+class SalesEvent:
+    sku: str
+    store_id: str
+    quantity: int
+    date: date
+    onpromotion: bool = False
+    price: Optional[float] = None
+
+def parse_event(payload: Any) -> SalesEvent:
+    """
+    Validate one point-of-sale event:
+    {"sku": "...", "store_id": "...", "quantity": 2, "date" or "timestamp": ISO 8601 (default today),
+     "onpromotion": false, "price": 9.99 (optional, default: the product's price)}.
+    Raises ValueError with a short reason.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("event must be a JSON object")
+    sku, store = payload.get("sku"), payload.get("store_id")
+    if sku in (None, "") or store in (None, ""):
+        raise ValueError("sku and store_id are required")
+
+    quantity = payload.get("quantity")
+    if isinstance(quantity, bool) or not isinstance(quantity, (int, float)) or quantity != int(quantity) or quantity < 1:
+        raise ValueError(f"invalid quantity {quantity!r}")
+
+    when = payload.get("date") or payload.get("timestamp")
+    if when is None:
+        event_date = date.today()
+    else:
+        try:
+            event_date = datetime.fromisoformat(str(when).replace("Z", "+00:00")).date()
+        except ValueError:
+            raise ValueError(f"invalid date {when!r}")
+
+    price = payload.get("price")
+    if price is not None and (isinstance(price, bool) or not isinstance(price, (int, float)) or price < 0):
+        raise ValueError(f"invalid price {price!r}")
+
+    return SalesEvent(sku=str(sku), store_id=str(store), quantity=int(quantity), date=event_date,
+                      onpromotion=bool(payload.get("onpromotion", False)),
+                      price=float(price) if price is not None else None)
+
+@dataclass
+class Ticket:
+    """Tracks the events of one request through the buffer until they are committed."""
+    pending: int = 0
+    committed: int = 0
+    rejected: int = 0
+    failed: int = 0
+    errors: List[str] = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def add(self):
+        with self._lock:
+            self.pending += 1
+
+    def discard(self):
+        with self._lock:
+            self.pending -= 1
+
+    def error(self, message: str):
+        with self._lock:
+            if len(self.errors) < MAX_REPORTED_ERRORS:
+                self.errors.append(message)
+
+    def settle(self, committed: int = 0, rejected: int = 0, failed: int = 0, error: Optional[str] = None):
+        with self._lock:
+            self.committed += committed
+            self.rejected += rejected
+            self.failed += failed
+            self.pending -= committed + rejected + failed
+            if error and len(self.errors) < MAX_REPORTED_ERRORS:
+                self.errors.append(error)
+
+def apply_sales_events(db: Session, events: List[SalesEvent]) -> Tuple[List[bool], Dict[str, int]]:
+    """
+    Write a micro-batch of events: SalesData rows, DailySalesRollup increments, stock
+    decrements and the matching dashboard deltas, without committing. Events whose SKU or store is unknown are skipped.
+    Returns (applied flag per event, counters).
+    """
+    products = crud_sales.get_products_by_skus(db, [e.sku for e in events])
+    stores = crud_sales.get_store_ids(db, [e.store_id for e in events])
+
+    sales, applied = [], []
+    rollups: Dict[Tuple[date, int, int], List[float]] = defaultdict(lambda: [0, 0.0, 0])
+    stock: Dict[Tuple[int, int], int] = defaultdict(int)
+    for event in events:
+        product, store_id = products.get(event.sku), stores.get(event.store_id)
+        if product is None or store_id is None:
+            applied.append(False)
+            continue
+        product_id, list_price = product
+        price = event.price if event.price is not None else (list_price or 0.0)
+        sales.append({"date": event.date, "sku_id": product_id, "store_id": store_id,
+                      "quantity": event.quantity, "onpromotion": event.onpromotion})
+        totals = rollups[(event.date, product_id, store_id)]
+        totals[0] += event.quantity
+        totals[1] += event.quantity * price
+        totals[2] += 1
+        stock[(product_id, store_id)] += event.quantity
+        applied.append(True)
+
+    rollup_rows = [
+        {"date": d, "sku_id": p, "store_id": s, "quantity": int(q), "revenue": round(r, 2), "records": n}
+        for (d, p, s), (q, r, n) in rollups.items()
+    ]
+    crud_sales.bulk_insert_sales(db, sales)
+    crud_sales.upsert_daily_rollups(db, rollup_rows)
+    crud_inventory.decrement_stock(db, [
+        {"product_id": p, "store_id": s, "quantity": q} for (p, s), q in stock.items()
+    ])
+    crud_dashboard.publish_sales_delta(db, rollup_rows)
+    if stock:
+        crud_dashboard.publish_stock_counts(db)
+    return applied, {"sales": len(sales), "rollups": len(rollups), "stock_updates": len(stock)}
+
+class SalesEventBuffer:
+    """
+    Bounded in-memory buffer of point-of-sale events with a background flusher. Events are
+    written in micro-batches of up to batch_size, or whatever arrived within flush_interval,
+    one transaction per batch. offer() returns False when the buffer is full so producers
+    can slow down (back-pressure) instead of growing memory.
+    """
+    def __init__(self, max_size: int = settings.EVENT_BUFFER_MAX, batch_size: int = settings.EVENT_BATCH_SIZE,
+                 flush_interval: float = settings.EVENT_FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Tuple[SalesEvent, Ticket]]" = queue.Queue(maxsize=max_size)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"batches": 0, "committed": 0, "rejected": 0, "failed": 0, "last_flush_seconds": None}
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="sales-event-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Stop accepting new batches and flush what is buffered."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def offer(self, event: SalesEvent, ticket: Ticket) -> bool:
+        if self._stop.is_set():
+            return False
+        ticket.add()
+        try:
+            self._queue.put_nowait((event, ticket))
+            return True
+        except queue.Full:
+            ticket.discard()
+            return False
+
+    def run_forever(self):
+        print(f"(inbox) Sales event flusher running (batch {self.batch_size}, every {self.flush_interval}s)")
+        while not self._stop.is_set() or not self._queue.empty():
+            batch = self._drain()
+            if batch:
+                self.flush(batch)
+
+    def _drain(self) -> List[Tuple[SalesEvent, Ticket]]:
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def flush(self, batch: List[Tuple[SalesEvent, Ticket]]):
+        started = time.perf_counter()
+        db = SessionLocal()
+        try:
+            applied, _ = apply_sales_events(db, [event for event, _ in batch])
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"(x) Sales event batch of {len(batch)} failed: {e}")
+            for _, ticket in batch:
+                ticket.settle(failed=1, error=f"batch write failed: {e}")
+            self.stats["failed"] += len(batch)
+            return
+        finally:
+            db.close()
+
+        for (event, ticket), ok in zip(batch, applied):
+            if ok:
+                ticket.settle(committed=1)
+            else:
+                ticket.settle(rejected=1, error=f"unknown sku '{event.sku}' or store '{event.store_id}'")
+        committed = sum(applied)
+        self.stats["batches"] += 1
+        self.stats["committed"] += committed
+        self.stats["rejected"] += len(batch) - committed
+        self.stats["last_flush_seconds"] = round(time.perf_counter() - started, 4)
+
+sales_event_buffer = SalesEventBuffer()
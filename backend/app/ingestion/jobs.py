@@ -0,0 +1,114 @@
+import hashlib
+from datetime import datetime, timedelta
+from typing import BinaryIO, Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.crud import crud_dashboard, crud_ingestion
+from app.models.ingestion import IngestionJob, IngestionJobStatus
+from app.ingestion.readers import DEFAULT_CHUNK_SIZE, IngestionError, open_sales_file
+from app.ingestion.pipeline import ingest_sales_file, new_results
+from app.ingestion.validation import ErrorReport
+
+class DuplicateUpload(Exception):
+    """The same content was already ingested, or is being ingested right now."""
+    def __init__(self, message: str, job: IngestionJob):
+        super().__init__(message)
+        self.job = job
+
+def hash_file(fileobj: BinaryIO, block_size: int = 1 << 20) -> Tuple[str, int]:
+    """SHA-256 hex digest and size of a file object, read in blocks; rewinds it afterwards."""
+    digest = hashlib.sha256()
+    size = 0
+    fileobj.seek(0)
+    for block in iter(lambda: fileobj.read(block_size), b""):
+        digest.update(block)
+        size += len(block)
+    fileobj.seek(0)
+    return digest.hexdigest(), size
+
+def _is_stale(job: IngestionJob) -> bool:
+    last = job.updated_at or job.created_at
+    return last is None or datetime.now() - last > timedelta(seconds=settings.INGESTION_JOB_STALE_SECONDS)
+
+def run_sales_ingestion(db: Session, filename: str, fileobj: BinaryIO, sheets: Optional[List[str]] = None,
+                        chunk_size: int = DEFAULT_CHUNK_SIZE, force: bool = False,
+                        requested_by: Optional[str] = None) -> Dict:
+    """
+    Ingest a sales file as an IngestionJob keyed by its content hash (and sheet selection).
+    - Content already ingested: DuplicateUpload, without reading a row (unless force).
+    - Same content still running with a recent checkpoint: DuplicateUpload.
+    - Same content failed or interrupted: resume after the last committed chunk, with the
+      original chunk size so chunk boundaries line up.
+    Returns the pipeline results plus job_id and resumed_from_chunk.
+    """
+    content_hash, size = hash_file(fileobj)
+    sheets_key = ",".join(str(s) for s in sheets) if sheets else None
+    job = crud_ingestion.get_job_by_hash(db, content_hash, sheets_key)
+
+    skip_chunks = 0
+    if job is not None and not force and job.status == IngestionJobStatus.COMPLETED:
+        raise DuplicateUpload(
+            f"This file was already ingested (job {job.id}, {job.added_rows} rows added on {job.finished_at:%Y-%m-%d %H:%M}).", job
+        )
+    if job is not None and job.status == IngestionJobStatus.RUNNING and not _is_stale(job):
+        raise DuplicateUpload(f"This file is being ingested right now (job {job.id}).", job)
+
+    if job is not None and not force and job.status != IngestionJobStatus.COMPLETED:
+        job = crud_ingestion.resume_job(db, job)
+        skip_chunks = job.chunks_committed or 0
+        results = new_results()
+        results.update(chunks=skip_chunks, rows_read=job.rows_read or 0, added_rows=job.added_rows or 0,
+                       skipped_rows=job.skipped_rows or 0, rejected_rows=job.rejected_rows or 0)
+        report = ErrorReport.restore(job.error_report, job.rejected_rows)
+        print(f"(refresh) Resuming ingestion job {job.id} after chunk {skip_chunks}")
+    else:
+        job = crud_ingestion.create_job(db, content_hash, filename, size, sheets_key, chunk_size,
+                                        requested_by=requested_by)
+        results, report = new_results(), ErrorReport()
+
+    job_id = job.id
+    try:
+        ingest_sales_file(
+            db, open_sales_file(filename, fileobj, sheets=sheets, chunk_size=job.chunk_size),
+            results=results, report=report, skip_chunks=skip_chunks,
+            checkpoint=lambda r, rep: crud_ingestion.checkpoint(db, job, r, rep.entries())
+        )
+        if results["rows_read"] == 0:
+            raise IngestionError("The uploaded file is empty.")
+    except Exception as e:
+        db.rollback()
+        crud_dashboard.publish_notification(db, f"Sales upload '{filename}' failed: {e}", level="error")
+        crud_ingestion.finish_job(db, job_id, IngestionJobStatus.FAILED, error=str(e))
+        raise
+
+    crud_dashboard.publish_notification(
+        db, f"Sales upload '{filename}' finished: {results['added_rows']:,} rows added, "
+            f"{results['skipped_rows']:,} duplicates skipped, {results['rejected_rows']:,} invalid rows rejected."
+    )
+    crud_ingestion.finish_job(db, job_id, IngestionJobStatus.COMPLETED)
+    results["job_id"] = job_id
+    results["resumed_from_chunk"] = skip_chunks
+    return results
+
+def serialize_job(job: IngestionJob) -> Dict:
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "filename": job.filename,
+        "content_hash": job.content_hash,
+        "size_bytes": job.size_bytes,
+        "sheets": job.sheets,
+        "chunk_size": job.chunk_size,
+        "chunks_committed": job.chunks_committed,
+        "rows_read": job.rows_read,
+        "added_rows": job.added_rows,
+        "skipped_rows": job.skipped_rows,
+        "rejected_rows": job.rejected_rows,
+        "error_report": job.error_report or [],
+        "error": job.error,
+        "attempts": job.attempts,
+        "requested_by": job.requested_by,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+        "finished_at": job.finished_at
+    }
@@ -0,0 +1,120 @@
+from typing import Callable, Dict, Iterable, Optional, Tuple
+import pandas as pd
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.crud import crud_dashboard, crud_sales
+from app.ingestion.readers import IngestionError, SALES_REQUIRED_COLUMNS
+from app.ingestion.validation import ErrorReport, validate_sales_frame
+
+SALES_KEY = ['date', 'sku_id', 'store_id']
+
+def new_results() -> Dict:
+    return {"added_rows": 0, "skipped_rows": 0, "rejected_rows": 0, "rows_read": 0, "chunks": 0, "errors": []}
+
+def check_columns(columns: Iterable[str]):
+    missing = [c for c in SALES_REQUIRED_COLUMNS if c not in set(columns)]
+    if missing:
+        raise IngestionError(f"Missing required columns: {SALES_REQUIRED_COLUMNS}")
+
+def load_sales_chunk(db: Session, frame: pd.DataFrame) -> Tuple[pd.DataFrame, int]:
+    """
+    Load a coerced chunk: COPY + set-based merge on PostgreSQL, executemany elsewhere.
+    Both create missing products/stores and skip rows whose (date, sku, store) repeats within
+    the chunk or already exists. Does not commit. Returns (inserted, skipped): the inserted
+    rows' date, sku_id, store_id and quantity, and the number of skipped rows.
+    """
+    if settings.INGESTION_USE_COPY and db.bind.dialect.name == "postgresql":
+        from app.ingestion.postgres import copy_sales_chunk
+        return copy_sales_chunk(db, frame)
+    return insert_sales_chunk(db, frame)
+
+def insert_sales_chunk(db: Session, frame: pd.DataFrame) -> Tuple[pd.DataFrame, int]:
+    """Portable loader: bulk product/store resolution, in-memory anti-join, one executemany."""
+    if frame.empty:
+        return pd.DataFrame(columns=SALES_KEY + ['quantity']), 0
+
+    products = frame.drop_duplicates('sku')[['sku', 'category', 'price']]
+    products = products.astype(object).where(products.notna(), None)
+    product_ids = crud_sales.get_or_create_products(db, products.to_dict('records'))
+    stores = frame.drop_duplicates('store_id')[['store_id', 'region']]
+    store_ids = crud_sales.get_or_create_stores(db, stores.to_dict('records'))
+
+    rows = pd.DataFrame({
+        'date': frame['date'],
+        'sku_id': frame['sku'].map(product_ids).astype('int64'),
+        'store_id': frame['store_id'].map(store_ids).astype('int64'),
+        'quantity': frame['quantity'],
+        'onpromotion': frame['onpromotion']
+    })
+    unique = rows.drop_duplicates(subset=SALES_KEY)
+
+    existing = crud_sales.get_existing_sales_keys(db, unique['sku_id'].unique().tolist(),
+                                                  unique['date'].min(), unique['date'].max())
+    if existing:
+        keys = pd.MultiIndex.from_frame(unique[SALES_KEY])
+        unique = unique[~keys.isin(list(existing))]
+
+    records = unique.to_dict('records')
+    for record in records:
+        # numpy scalars -> Python types for the DB driver
+        record['sku_id'], record['store_id'] = int(record['sku_id']), int(record['store_id'])
+        record['quantity'], record['onpromotion'] = int(record['quantity']), bool(record['onpromotion'])
+    added = crud_sales.bulk_insert_sales(db, records)
+    return unique[SALES_KEY + ['quantity']], len(frame) - added
+
+def add_daily_rollups(db: Session, inserted: pd.DataFrame):
+    """
+    Add a loaded chunk's new rows to DailySalesRollup as per-key increments (atomic upserts,
+    like the event path, so concurrent writers to the same keys never conflict) and publish
+    the change to today's totals. Cost is proportional to the chunk, not to its date span.
+    """
+    rows = crud_sales.get_rollup_increments(db, inserted)
+    crud_sales.upsert_daily_rollups(db, rows)
+    crud_dashboard.publish_sales_delta(db, rows)
+
+def ingest_sales_file(db: Session, parts: Iterable[Tuple[Optional[str], Iterable[pd.DataFrame]]],
+                      results: Optional[Dict] = None, report: Optional[ErrorReport] = None, skip_chunks: int = 0,
+                      checkpoint: Optional[Callable[[Dict, ErrorReport], None]] = None) -> Dict:
+    """
+    Run the chunked sales pipeline over the (sheet label, chunks) parts of a file (see
+    readers.open_sales_file): column check on each part's first chunk, vectorized validation,
+    bulk load, DailySalesRollup increments for the chunk's new rows and one commit per chunk. Accumulates into 'results' (see new_results); rejected
+    rows are summarized in 'report', whose messages become results["errors"].
+    skip_chunks: chunks already committed by an earlier attempt, passed over unparsed.
+    checkpoint(results, report) runs before each commit, so progress is stored atomically
+    with the chunk's rows.
+    """
+    results = results if results is not None else new_results()
+    report = report if report is not None else ErrorReport()
+    position = 0
+    for label, chunks in parts:
+        checked = False
+        for chunk in chunks:
+            position += 1
+            if position <= skip_chunks:
+                continue
+            if not checked:
+                check_columns(chunk.columns)
+                checked = True
+            frame, masks = validate_sales_frame(chunk)
+            try:
+                inserted, skipped = load_sales_chunk(db, frame)
+                added = len(inserted)
+                if added:
+                    add_daily_rollups(db, inserted)
+                report.add(chunk, masks, sheet=label)
+                results["rows_read"] += len(chunk)
+                results["chunks"] += 1
+                results["added_rows"] += added
+                results["skipped_rows"] += skipped
+                results["rejected_rows"] = report.rejected_rows
+                if checkpoint is not None:
+                    checkpoint(results, report)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+    results["rejected_rows"] = report.rejected_rows
+    results["errors"] = report.messages()
+    results["error_report"] = report.entries()
+    return results
@@ -0,0 +1,106 @@
+import io
+from typing import Tuple
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.models.sales import SalesData, Product, Store
+
+STAGING_TABLE = "sales_staging"
+STAGING_COLUMNS = ['row_no', 'date', 'sku', 'store_code', 'quantity', 'onpromotion', 'category', 'price', 'region']
+
+# Session-local temp table; rows vanish at every commit, so each chunk starts empty
+_CREATE_STAGING = f"""
+    CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} (
+        row_no bigint,
+        date date,
+        sku text,
+        store_code text,
+        quantity integer,
+        onpromotion boolean,
+        category text,
+        price double precision,
+        region text
+    ) ON COMMIT DELETE ROWS
+"""
+
+_INSERT_PRODUCTS = f"""
+    INSERT INTO {Product.__table__.name} (sku, category, price)
+    SELECT DISTINCT ON (sku) sku, category, price
+    FROM {STAGING_TABLE}
+    ORDER BY sku, row_no
+    ON CONFLICT (sku) DO NOTHING
+"""
+
+_INSERT_STORES = f"""
+    INSERT INTO {Store.__table__.name} (store_id, region)
+    SELECT DISTINCT ON (store_code) store_code, region
+    FROM {STAGING_TABLE}
+    ORDER BY store_code, row_no
+    ON CONFLICT (store_id) DO NOTHING
+"""
+
+# SalesData has no unique key (the live simulator writes several rows per day), so
+# existing (date, sku, store) rows are excluded with an anti-join instead of ON CONFLICT.
+# DISTINCT ON keeps the first file row of keys repeated within the chunk.
+_MERGE_SALES = f"""
+    INSERT INTO {SalesData.__table__.name} (date, sku_id, store_id, quantity, onpromotion)
+    SELECT DISTINCT ON (s.date, p.id, st.id) s.date, p.id, st.id, s.quantity, s.onpromotion
+    FROM {STAGING_TABLE} s
+    JOIN {Product.__table__.name} p ON p.sku = s.sku
+    JOIN {Store.__table__.name} st ON st.store_id = s.store_code
+    WHERE NOT EXISTS (
+        SELECT 1 FROM {SalesData.__table__.name} d
+        WHERE d.sku_id = p.id AND d.store_id = st.id AND d.date = s.date
+    )
+    ORDER BY s.date, p.id, st.id, s.row_no
+    RETURNING date, sku_id, store_id, quantity
+"""
+
+def _copy_from_stdin(db: Session, statement: str, buffer: io.StringIO):
+    """Run COPY ... FROM STDIN on the session's connection with psycopg2 or psycopg 3."""
+    raw = db.connection().connection
+    cursor = raw.cursor()
+    try:
+        if hasattr(cursor, "copy_expert"): # psycopg2
+            cursor.copy_expert(statement, buffer)
+        else: # psycopg 3
+            with cursor.copy(statement) as copy:
+                while data := buffer.read(1 << 20):
+                    copy.write(data)
+    finally:
+        cursor.close()
+
+def copy_sales_chunk(db: Session, frame: pd.DataFrame) -> Tuple[pd.DataFrame, int]:
+    """
+    Load a coerced chunk with COPY FROM STDIN into the staging table, create missing
+    products and stores, and merge new sales with one INSERT ... SELECT - all in the
+    session's transaction, which the caller commits. Returns (inserted, skipped): the
+    inserted rows' date, sku_id, store_id and quantity, and the number of skipped rows.
+    """
+    columns = ['date', 'sku_id', 'store_id', 'quantity']
+    if frame.empty:
+        return pd.DataFrame(columns=columns), 0
+
+    staged = pd.DataFrame({
+        'row_no': range(len(frame)),
+        'date': frame['date'].values,
+        'sku': frame['sku'].values,
+        'store_code': frame['store_id'].values,
+        'quantity': frame['quantity'].values,
+        'onpromotion': frame['onpromotion'].values,
+        'category': frame['category'].values,
+        'price': frame['price'].values,
+        'region': frame['region'].values
+    })
+    buffer = io.StringIO()
+    staged.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+
+    db.execute(text(_CREATE_STAGING))
+    _copy_from_stdin(db, f"COPY {STAGING_TABLE} ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    # Temp tables are never auto-analyzed; without stats the merge joins are planned blind
+    db.execute(text(f"ANALYZE {STAGING_TABLE}"))
+    db.execute(text(_INSERT_PRODUCTS))
+    db.execute(text(_INSERT_STORES))
+    inserted = pd.DataFrame(db.execute(text(_MERGE_SALES)).all(), columns=columns)
+    return inserted, len(frame) - len(inserted)
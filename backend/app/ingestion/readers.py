@@ -0,0 +1,235 @@
+from typing import BinaryIO, Iterator, List, Optional, Tuple, Union
+import pandas as pd
+
+DEFAULT_CHUNK_SIZE = 50000
+
+SALES_REQUIRED_COLUMNS = ['date', 'sku', 'store_id', 'quantity']
+
+# Identifier columns are read as text so codes like "007" keep their leading zeros
+TEXT_COLUMNS = {'sku': str, 'store_id': str, 'category': str, 'region': str}
+
+# Columnar files may use the Kaggle history schema; columns are renamed to the upload schema
+COLUMNAR_ALIASES = {'item_nbr': 'sku', 'store_nbr': 'store_id', 'unit_sales': 'quantity'}
+COLUMNAR_EXTENSIONS = ('.parquet', '.arrow', '.feather', '.ipc', '.arrows')
+
+class IngestionError(ValueError):
+    """The file as a whole cannot be ingested (unsupported format, unreadable, missing columns)."""
+
+SheetSelector = Union[str, int]
+
+def iter_csv_chunks(fileobj: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Stream a UTF-8 CSV file in DataFrames of at most chunk_size rows. The index keeps
+    counting across chunks, so it is the 0-based data row number within the file.
+    """
+    try:
+        reader = pd.read_csv(fileobj, chunksize=chunk_size, dtype=TEXT_COLUMNS, encoding='utf-8')
+        for chunk in reader:
+            yield chunk
+    except (UnicodeDecodeError, pd.errors.ParserError, pd.errors.EmptyDataError) as e:
+        raise IngestionError(f"Error reading CSV file: {e}")
+
+def _open_workbook(fileobj: BinaryIO):
+    import openpyxl
+    from zipfile import BadZipFile
+
+    try:
+        return openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+    except (BadZipFile, KeyError, OSError) as e:
+        raise IngestionError(f"Error reading Excel file: {e}")
+
+def list_excel_sheets(fileobj: BinaryIO) -> List[str]:
+    workbook = _open_workbook(fileobj)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+        fileobj.seek(0)
+
+def _resolve_sheet(sheetnames: List[str], sheet: Optional[SheetSelector]) -> str:
+    if sheet is None:
+        return sheetnames[0]
+    if isinstance(sheet, int) or (isinstance(sheet, str) and sheet.isdigit() and sheet not in sheetnames):
+        index = int(sheet)
+        if 0 <= index < len(sheetnames):
+            return sheetnames[index]
+    elif sheet in sheetnames:
+        return sheet
+    raise IngestionError(f"Sheet '{sheet}' not found. Available sheets: {sheetnames}")
+
+def iter_worksheet_chunks(worksheet, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Stream a read-only worksheet in DataFrames of at most chunk_size rows. openpyxl
+    read-only mode parses the sheet XML lazily, so memory is bounded by the chunk size
+    rather than the workbook size. The first row is the header; fully empty rows are
+    skipped. The index is the 0-based data row number within the sheet.
+    """
+    rows = worksheet.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return
+    columns = [str(c).strip() if c is not None else f"column_{i}" for i, c in enumerate(header)]
+    width = len(columns)
+
+    buffer, index, row_number = [], [], 0
+    for row in rows:
+        row_number += 1
+        if all(value is None for value in row):
+            continue
+        # Read-only rows can be shorter or longer than the header when the sheet dimensions are off
+        buffer.append(tuple(row[:width]) + (None,) * (width - len(row)))
+        index.append(row_number - 1)
+        if len(buffer) >= chunk_size:
+            yield _excel_frame(buffer, columns, index)
+            buffer, index = [], []
+    if buffer:
+        yield _excel_frame(buffer, columns, index)
+
+def iter_excel_chunks(fileobj: BinaryIO, sheet: Optional[SheetSelector] = None,
+                      chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Stream one worksheet of an .xlsx workbook (sheet name or 0-based index, default: the
+    first sheet) in DataFrames of at most chunk_size rows.
+    """
+    workbook = _open_workbook(fileobj)
+    try:
+        yield from iter_worksheet_chunks(workbook[_resolve_sheet(workbook.sheetnames, sheet)], chunk_size)
+    finally:
+        workbook.close()
+
+def _excel_frame(rows: List[tuple], columns: List[str], index: List[int]) -> pd.DataFrame:
+    frame = pd.DataFrame.from_records(rows, columns=columns, index=pd.Index(index))
+    for column in TEXT_COLUMNS:
+        if column in frame.columns:
+            # Numeric cells (e.g. store 7) become "7", not "7.0"
+            values = frame[column]
+            frame[column] = values.map(lambda v: None if v is None else (str(int(v)) if isinstance(v, float) and v.is_integer() else str(v)))
+    return frame
+
+def iter_legacy_excel_chunks(fileobj: BinaryIO, sheet: Optional[SheetSelector] = None,
+                             chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Binary .xls workbooks cannot be streamed (openpyxl only reads OOXML); the sheet is read
+    whole with pandas and handed on in chunks so the rest of the pipeline is unchanged.
+    """
+    if sheet is None or (isinstance(sheet, str) and sheet.isdigit()):
+        sheet = int(sheet or 0)
+    try:
+        frame = pd.read_excel(fileobj, sheet_name=sheet, dtype=TEXT_COLUMNS)
+    except Exception as e:
+        raise IngestionError(f"Error reading Excel file: {e}")
+    for start in range(0, len(frame), chunk_size):
+        yield frame.iloc[start:start + chunk_size]
+
+def check_arrow_schema(schema, required: List[str] = SALES_REQUIRED_COLUMNS) -> List[str]:
+    """
+    Validate a Parquet/Arrow schema once per file: the required columns (after aliasing)
+    must exist, quantity must be numeric and date a date, timestamp or string column.
+    Returns the source column names to read.
+    """
+    import pyarrow as pa
+
+    fields = {COLUMNAR_ALIASES.get(name, name): schema.field(name) for name in schema.names}
+    missing = [c for c in required if c not in fields]
+    if missing:
+        raise IngestionError(f"Missing required columns: {required}")
+
+    quantity_type, date_type = fields['quantity'].type, fields['date'].type
+    if not (pa.types.is_integer(quantity_type) or pa.types.is_floating(quantity_type) or pa.types.is_decimal(quantity_type)):
+        raise IngestionError(f"Column 'quantity' must be numeric, got {quantity_type}.")
+    if not (pa.types.is_date(date_type) or pa.types.is_timestamp(date_type) or pa.types.is_string(date_type)
+            or pa.types.is_large_string(date_type)):
+        raise IngestionError(f"Column 'date' must be a date, timestamp or string, got {date_type}.")
+
+    wanted = set(required) | set(TEXT_COLUMNS) | {'onpromotion', 'price'}
+    return [field.name for target, field in fields.items() if target in wanted]
+
+def _arrow_frame(batch, offset: int) -> pd.DataFrame:
+    frame = batch.to_pandas().rename(columns=COLUMNAR_ALIASES)
+    for column in TEXT_COLUMNS:
+        if column in frame.columns and not pd.api.types.is_string_dtype(frame[column]):
+            values = frame[column]
+            frame[column] = values.astype(str).where(values.notna(), None)
+    frame.index = pd.RangeIndex(offset, offset + len(frame))
+    return frame
+
+def iter_parquet_chunks(fileobj: BinaryIO, required: List[str] = SALES_REQUIRED_COLUMNS,
+                        chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Stream a Parquet file in record batches of at most chunk_size rows, reading only the
+    needed columns. The schema is checked from the footer before any row is decoded.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    try:
+        parquet = pq.ParquetFile(fileobj)
+    except (pa.ArrowException, OSError) as e:
+        raise IngestionError(f"Error reading Parquet file: {e}")
+    columns = check_arrow_schema(parquet.schema_arrow, required)
+
+    offset = 0
+    for batch in parquet.iter_batches(batch_size=chunk_size, columns=columns):
+        yield _arrow_frame(batch, offset)
+        offset += batch.num_rows
+
+def iter_arrow_chunks(fileobj: BinaryIO, required: List[str] = SALES_REQUIRED_COLUMNS,
+                      chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Stream an Arrow IPC file (random-access/Feather v2 format, or the streaming format)
+    batch by batch; batches larger than chunk_size are sliced. Schema checked once up front.
+    """
+    import pyarrow as pa
+
+    try:
+        reader = pa.ipc.open_file(fileobj)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    except pa.ArrowInvalid:
+        fileobj.seek(0)
+        try:
+            reader = pa.ipc.open_stream(fileobj)
+        except (pa.ArrowException, OSError) as e:
+            raise IngestionError(f"Error reading Arrow file: {e}")
+        batches = iter(reader)
+    columns = check_arrow_schema(reader.schema, required)
+
+    offset = 0
+    for batch in batches:
+        batch = batch.select(columns)
+        for start in range(0, batch.num_rows, chunk_size):
+            part = batch.slice(start, chunk_size)
+            yield _arrow_frame(part, offset)
+            offset += part.num_rows
+
+def open_sales_file(filename: str, fileobj: BinaryIO, sheets: Optional[List[SheetSelector]] = None,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE, required: List[str] = SALES_REQUIRED_COLUMNS) -> Iterator[Tuple[Optional[str], Iterator[pd.DataFrame]]]:
+    """
+    Yield (sheet label, chunk iterator) for each part of an uploaded sales file: one part
+    for CSV and columnar files, one per selected sheet for Excel (default: the first sheet).
+    required: columns validated up front against Parquet/Arrow schemas.
+    """
+    name = filename.lower()
+    if name.endswith('.parquet'):
+        yield None, iter_parquet_chunks(fileobj, required, chunk_size)
+    elif name.endswith(COLUMNAR_EXTENSIONS):
+        yield None, iter_arrow_chunks(fileobj, required, chunk_size)
+    elif name.endswith('.csv'):
+        yield None, iter_csv_chunks(fileobj, chunk_size)
+    elif name.endswith('.xlsx'):
+        # One workbook for all sheets: loading re-scans every sheet lacking a <dimension> record.
+        # Sheets are resolved first, so a missing one fails before anything is committed.
+        workbook = _open_workbook(fileobj)
+        try:
+            for sheet in sheets or [None]:
+                _resolve_sheet(workbook.sheetnames, sheet)
+            for sheet in sheets or [None]:
+                label = str(sheet) if sheet is not None else None
+                yield label, iter_worksheet_chunks(workbook[_resolve_sheet(workbook.sheetnames, sheet)], chunk_size)
+        finally:
+            workbook.close()
+    elif name.endswith('.xls'):
+        for sheet in sheets or [None]:
+            fileobj.seek(0)
+            yield (str(sheet) if sheet is not None else None), iter_legacy_excel_chunks(fileobj, sheet, chunk_size)
+    else:
+        raise IngestionError("Invalid file format. Please upload a CSV, Excel, Parquet or Arrow file.")
@@ -0,0 +1,190 @@
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+PROMOTION_TRUE_VALUES = ['1', 'true', 'yes', '1.0']
+
+# Error type -> (checked column, message used in the compact report)
+ERROR_TYPES = {
+    'invalid_quantity': ('quantity', "Invalid quantity"),
+    'negative_quantity': ('quantity', "Negative quantity"),
+    'invalid_date': ('date', "Invalid date format"),
+    'missing_sku': ('sku', "Missing sku"),
+    'missing_store': ('store_id', "Missing store_id"),
+}
+
+MAX_RANGES = 20 # row ranges kept per error type
+MAX_SAMPLES = 3 # offending values kept per error type
+
+def _blank(values: pd.Series) -> np.ndarray:
+    text = values.astype(str).str.strip()
+    return (values.isna() | (text == '')).to_numpy()
+
+def _per_distinct(values: pd.Series, parse: Callable[[pd.Series], pd.Series]) -> pd.Series:
+    """
+    Apply a column parser once per distinct value and broadcast the result back. Sales files
+    repeat dates, quantities and prices heavily, so this parses a few thousand strings
+    instead of every row. Missing values map to the parser's missing value.
+    """
+    codes, uniques = pd.factorize(values)
+    parsed = parse(pd.Series(uniques)).reindex(range(len(uniques) + 1))
+    codes = np.where(codes < 0, len(uniques), codes)
+    return pd.Series(parsed.to_numpy()[codes], index=values.index)
+
+def _to_datetime(values: pd.Series) -> pd.Series:
+    # ISO 8601 takes the fast vectorized path; only what it rejects is retried with format inference
+    dates = pd.to_datetime(values, errors='coerce', format='ISO8601')
+    retry = dates.isna() & values.notna()
+    if retry.any():
+        dates[retry] = pd.to_datetime(values[retry], errors='coerce', format='mixed')
+    return dates
+
+def parse_dates(values: pd.Series) -> pd.Series:
+    """Whole-column date parsing to datetime64 (NaT where invalid)."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    return _per_distinct(values, _to_datetime)
+
+def parse_numbers(values: pd.Series) -> pd.Series:
+    """Whole-column numeric coercion (NaN where invalid)."""
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return values
+    return _per_distinct(values, lambda u: pd.to_numeric(u, errors='coerce').astype('float64'))
+
+def to_date_objects(dates: pd.Series) -> pd.Series:
+    """datetime64 -> datetime.date objects (what the DB drivers bind), converted per distinct day."""
+    codes, uniques = pd.factorize(dates)
+    days = np.append(pd.DatetimeIndex(uniques).date, None)
+    return pd.Series(days[np.where(codes < 0, len(uniques), codes)], index=dates.index)
+
+def parse_promotions(values: pd.Series) -> np.ndarray:
+    """Truthy onpromotion values (1, true, yes, 1.0 in any case), decided once per distinct value."""
+    if pd.api.types.is_bool_dtype(values):
+        return values.fillna(False).to_numpy(dtype=bool)
+    if pd.api.types.is_numeric_dtype(values):
+        return (values.fillna(0) == 1).to_numpy()
+    codes, uniques = pd.factorize(values)
+    truthy = pd.Index(uniques).astype(str).str.lower().isin(PROMOTION_TRUE_VALUES)
+    return np.append(truthy, False)[codes] # code -1 (missing) -> False
+
+def validate_sales_frame(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, np.ndarray]]:
+    """
+    Coerce and validate a sales chunk column by column.
+    Returns (valid rows as date, sku, store_id, quantity, onpromotion, category, price,
+    region; boolean mask per error type aligned with df). A row may fail several checks.
+    """
+    quantity = parse_numbers(df['quantity'])
+    dates = parse_dates(df['date'])
+
+    # Missing, non-finite (inf), fractional or out-of-range quantities are invalid, not truncated
+    numeric = quantity.to_numpy(dtype='float64', na_value=np.nan)
+    with np.errstate(invalid='ignore'):
+        integral = np.isfinite(numeric) & (numeric == np.trunc(numeric)) & (np.abs(numeric) < 2 ** 63)
+
+    masks = {
+        'invalid_quantity': ~integral,
+        'negative_quantity': (quantity < 0).to_numpy(),
+        'invalid_date': dates.isna().to_numpy(),
+        'missing_sku': _blank(df['sku']),
+        'missing_store': _blank(df['store_id']),
+    }
+    valid = ~np.logical_or.reduce(list(masks.values()))
+
+    if 'price' in df.columns:
+        price = parse_numbers(df['price'])
+        price = price.where(price >= 0)
+    else:
+        price = pd.Series(np.nan, index=df.index)
+    onpromotion = parse_promotions(df['onpromotion']) if 'onpromotion' in df.columns else np.zeros(len(df), dtype=bool)
+
+    def text(column: str) -> pd.Series:
+        if column not in df.columns:
+            return pd.Series(None, index=df.index, dtype=object)
+        values = df[column].astype(object)
+        return values.where(values.notna(), None)
+
+    frame = pd.DataFrame({
+        'date': to_date_objects(dates),
+        'sku': df['sku'].astype(str).str.strip(),
+        'store_id': df['store_id'].astype(str).str.strip(),
+        'quantity': quantity,
+        'onpromotion': onpromotion,
+        'category': text('category'),
+        'price': price,
+        'region': text('region')
+    })[valid]
+    frame['quantity'] = frame['quantity'].astype('int64')
+    return frame, masks
+
+def _row_ranges(rows: np.ndarray) -> List[List[int]]:
+    """Sorted row numbers -> [[start, end], ...] runs of consecutive rows."""
+    if len(rows) == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(rows) != 1)
+    starts = np.concatenate(([rows[0]], rows[breaks + 1]))
+    ends = np.concatenate((rows[breaks], [rows[-1]]))
+    return [[int(s), int(e)] for s, e in zip(starts, ends)]
+
+class ErrorReport:
+    """
+    Compact validation report accumulated over chunks: per error type (and sheet), the row
+    count, the first MAX_RANGES runs of consecutive rows and a few sample values. Row numbers
+    are 0-based data rows, as in the file.
+    """
+    def __init__(self):
+        self._entries: Dict[Tuple[Optional[str], str], Dict] = {}
+        self.rejected_rows = 0
+
+    @classmethod
+    def restore(cls, entries: Optional[List[Dict]], rejected_rows: int) -> "ErrorReport":
+        """Rebuild a report from stored entries, to continue it when a job resumes."""
+        report = cls()
+        for entry in entries or []:
+            report._entries[(entry["sheet"], entry["type"])] = entry
+        report.rejected_rows = rejected_rows or 0
+        return report
+
+    def add(self, df: pd.DataFrame, masks: Dict[str, np.ndarray], sheet: Optional[str] = None):
+        self.rejected_rows += int(np.logical_or.reduce(list(masks.values())).sum()) if masks else 0
+        rows = df.index.to_numpy()
+        for error_type, mask in masks.items():
+            count = int(mask.sum())
+            if count == 0:
+                continue
+            column, message = ERROR_TYPES[error_type]
+            entry = self._entries.setdefault((sheet, error_type), {
+                "sheet": sheet, "type": error_type, "message": message,
+                "count": 0, "ranges": [], "truncated": False, "samples": []
+            })
+            entry["count"] += count
+            if len(entry["samples"]) < MAX_SAMPLES:
+                values = df[column].to_numpy()[mask][:MAX_SAMPLES - len(entry["samples"])]
+                entry["samples"] += ["" if pd.isna(v) else str(v) for v in values]
+            self._merge_ranges(entry, _row_ranges(rows[mask]))
+
+    @staticmethod
+    def _merge_ranges(entry: Dict, ranges: List[List[int]]):
+        kept = entry["ranges"]
+        if ranges and kept and kept[-1][1] + 1 == ranges[0][0]:
+            # A run continuing across the chunk boundary
+            kept[-1][1] = ranges.pop(0)[1]
+        room = MAX_RANGES - len(kept)
+        if len(ranges) > room:
+            entry["truncated"] = True
+        kept.extend(ranges[:max(room, 0)])
+
+    def entries(self) -> List[Dict]:
+        return list(self._entries.values())
+
+    def messages(self) -> List[str]:
+        """One line per error type, e.g. "Invalid date format: 120 rows (rows 5, 19-25, ...; e.g. 'abc')"."""
+        lines = []
+        for entry in self._entries.values():
+            spans = ", ".join(str(s) if s == e else f"{s}-{e}" for s, e in entry["ranges"])
+            if entry["truncated"]:
+                spans += ", ..."
+            samples = ", ".join(f"'{v}'" for v in entry["samples"])
+            prefix = f"Sheet {entry['sheet']} " if entry["sheet"] else ""
+            noun = "row" if entry["count"] == 1 else "rows"
+            lines.append(f"{prefix}{entry['message']}: {entry['count']} {noun} (rows {spans}; e.g. {samples})")
+        return lines
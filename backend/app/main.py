@@ -23,8 +23,7 @@ app.include_router(api_router, prefix=settings.API_V1_STR)
 async def startup_event():
     from app.ml.model import forecaster
     from app.db.session import SessionLocal
-    from app.crud import crud_holiday
-    from app.schemas.holiday import HolidayCreate
+    from app.crud import crud_holiday, crud_inventory
     from app.db.init_db import init_db
     import pandas as pd
     import os
@@ -39,27 +38,14 @@ async def startup_event():
 
     db = SessionLocal()
     try:
-        holidays_count = len(crud_holiday.get_all_holidays(db))
+        holidays_count = crud_holiday.count_holidays(db)
         if holidays_count < 10:
             csv_path = "data/holidays_events.csv"
             if os.path.exists(csv_path):
                 print(f"🎄 Configuring Holidays from {csv_path}...")
                 df = pd.read_csv(csv_path)
-                added = 0
-                for _, row in df.iterrows():
-                    try:
-                        obj_in = HolidayCreate(
-                            date=pd.to_datetime(row['date']).date(),
-                            type=str(row['type']),
-                            locale=str(row['locale']),
-                            locale_name=str(row['locale_name']),
-                            description=str(row['description']),
-                            transferred=bool(row['transferred'])
-                        )
-                        crud_holiday.create_holiday(db, obj_in)
-                        added += 1
-                    except:
-                        pass
+                records, errors = crud_holiday.records_from_dataframe(df)
+                added = crud_holiday.bulk_upsert_holidays(db, records)
                 print(f"✅ Auto-Seeded {added} holidays.")
             else:
                 print("⚠️ No holidays.csv found.")
@@ -68,6 +54,50 @@ async def startup_event():
     finally:
         db.close()
 
+    db = SessionLocal()
+    try:
+        # Resync the maintained stock alert counters with the table (one scan per startup)
+        counts = crud_inventory.rebuild_stock_alert_counters(db)
+        print(f"(tick) Stock alert counters: {counts}")
+    except Exception as e:
+        print(f"(x) Stock alert counter rebuild failed: {e}")
+    finally:
+        db.close()
+
+    from app.core.training_worker import training_worker, model_reloader
+    from app.ingestion.events import sales_event_buffer
+    from app.core.dashboard_stream import dashboard_broadcaster
+    sales_event_buffer.start()
+    dashboard_broadcaster.start()
+    model_reloader.start()
+    if settings.TRAINING_WORKER_EMBEDDED:
+        training_worker.start()
+    if settings.RETRAIN_SCHEDULE_ENABLED:
+        from app.core.training_scheduler import retrain_scheduler
+        retrain_scheduler.start()
+    if settings.ALERT_ENGINE_ENABLED:
+        from app.core.alert_engine import alert_scheduler
+        alert_scheduler.start()
+    if settings.REPLENISHMENT_CRON:
+        from app.core.replenishment import replenishment_scheduler
+        replenishment_scheduler.start()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    from app.core.training_worker import training_worker, model_reloader
+    from app.core.training_scheduler import retrain_scheduler
+    from app.ingestion.events import sales_event_buffer
+    from app.core.dashboard_stream import dashboard_broadcaster
+    from app.core.alert_engine import alert_scheduler
+    from app.core.replenishment import replenishment_scheduler
+    sales_event_buffer.stop()
+    dashboard_broadcaster.stop()
+    alert_scheduler.stop()
+    replenishment_scheduler.stop()
+    training_worker.stop()
+    model_reloader.stop()
+    retrain_scheduler.stop()
+
 @app.get("/")
 def root():
     return {"message": "Welcome to IDFS Backend"}
@@ -0,0 +1,296 @@
+import pandas as pd
+import numpy as np
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+from prophet.diagnostics import prophet_copy
+from .config import MLConfig
+from .local_models import HOLT_WINTERS_PARAMS, forecast_series
+
+logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+
+class FoldCache:
+    """
+    On-disk cache of fold predictions.
+    Each fold is keyed by (model config, cutoff, horizon, data in the fold window),
+    so only folds whose config or data changed are recomputed. Folds of superseded data or
+    parameters are never read again, so prune() evicts the least recently used files
+    (modification time, refreshed on every hit) once the cache exceeds max_bytes.
+    """
+    def __init__(self, cache_dir: str = MLConfig.BACKTEST_CACHE_DIR,
+                 max_bytes: int = MLConfig.BACKTEST_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            df = pd.read_pickle(path)
+            os.utime(path) # mark as recently used
+            return df
+        except Exception:
+            return None
+
+    def put(self, key: str, df: pd.DataFrame):
+        df.to_pickle(self._path(key))
+
+    def prune(self) -> int:
+        """Delete the least recently used folds until the cache fits max_bytes. Returns the number deleted."""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".pkl"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        deleted = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            deleted += 1
+        return deleted
+
+def _hash(*parts) -> str:
+    h = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, pd.DataFrame):
+            h.update(pd.util.hash_pandas_object(part, index=False).values.tobytes())
+        else:
+            h.update(json.dumps(part, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+def make_cutoffs(ds: pd.Series, initial: pd.Timedelta, period: pd.Timedelta, horizon: pd.Timedelta) -> List[pd.Timestamp]:
+    """
+    Rolling-origin cutoffs anchored at the start of the history.
+    Anchoring at the start (not the end) keeps existing cutoffs stable when new data is appended,
+    so re-evaluation only adds new folds instead of shifting all of them.
+    """
+    start, end = ds.min(), ds.max()
+    cutoffs = []
+    cutoff = start + initial
+    while cutoff + horizon <= end:
+        cutoffs.append(cutoff)
+        cutoff += period
+    return cutoffs
+
+def _run_tasks(fn: Callable, tasks: List[tuple], max_workers: Optional[int]) -> List:
+    """Run fold tasks over a process pool (inline when there is nothing to parallelize)."""
+    if not tasks:
+        return []
+    if max_workers == 1 or len(tasks) == 1:
+        return [fn(*task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(fn, *zip(*tasks)))
+
+# ---------------------------------------------------------------- Prophet
+
+def stan_init(m) -> Dict:
+    """Fitted parameters of a Prophet model, used to warm-start fold fits."""
+    res = {}
+    for pname in ['k', 'm', 'sigma_obs']:
+        res[pname] = m.params[pname][0][0]
+    for pname in ['delta', 'beta']:
+        res[pname] = m.params[pname][0]
+    return res
+
+def _prophet_config(m) -> Dict:
+    attrs = [
+        'growth', 'n_changepoints', 'changepoint_range', 'seasonality_mode', 'holidays_mode',
+        'seasonality_prior_scale', 'changepoint_prior_scale', 'holidays_prior_scale',
+        'interval_width', 'uncertainty_samples', 'mcmc_samples',
+    ]
+    return {
+        'model': 'prophet',
+        'params': {a: getattr(m, a) for a in attrs},
+        'seasonalities': m.seasonalities,
+        # mu/std are re-estimated on every fit, only the structure belongs in the key
+        'regressors': {
+            name: {k: v for k, v in props.items() if k not in ('mu', 'std')}
+            for name, props in m.extra_regressors.items()
+        },
+        'country_holidays': m.country_holidays,
+        'holidays': _hash(m.holidays) if m.holidays is not None else None,
+    }
+
+def _prophet_fold(template, history: pd.DataFrame, cutoff: pd.Timestamp, horizon: pd.Timedelta, init: Optional[Dict]) -> pd.DataFrame:
+    train = history[history['ds'] <= cutoff]
+    test = history[(history['ds'] > cutoff) & (history['ds'] <= cutoff + horizon)]
+
+    m = prophet_copy(template, cutoff)
+    try:
+        m.fit(train, init=init)
+    except Exception:
+        # Warm start can fail when the fold has fewer changepoints than the full fit
+        m = prophet_copy(template, cutoff)
+        m.fit(train)
+
+    forecast = m.predict(test.drop(columns=['y']))
+    return pd.DataFrame({
+        'series': 'total',
+        'cutoff': cutoff,
+        'ds': test['ds'].to_numpy(),
+        'y': test['y'].to_numpy(),
+        'yhat': forecast['yhat'].to_numpy(),
+        'yhat_lower': forecast['yhat_lower'].to_numpy(),
+        'yhat_upper': forecast['yhat_upper'].to_numpy(),
+    })
+
+def backtest_prophet(model, initial='365 days', period='30 days', horizon='30 days',
+                     max_workers: Optional[int] = MLConfig.BACKTEST_MAX_WORKERS,
+                     cache: Optional[FoldCache] = None) -> Dict:
+    """
+    Rolling-origin backtest of a fitted Prophet model.
+    Folds are warm-started from the full fit, run over a process pool and cached on disk.
+    """
+    initial, period, horizon = pd.Timedelta(initial), pd.Timedelta(period), pd.Timedelta(horizon)
+    cache = cache or FoldCache()
+
+    columns = ['ds', 'y'] + list(model.extra_regressors.keys())
+    history = model.history[columns].reset_index(drop=True)
+    config_key = _hash(_prophet_config(model))
+    init = stan_init(model)
+
+    folds, tasks, keys = [], [], []
+    for cutoff in make_cutoffs(history['ds'], initial, period, horizon):
+        window = history[history['ds'] <= cutoff + horizon]
+        key = _hash(config_key, cutoff, horizon, window)
+        cached = cache.get(key)
+        if cached is not None:
+            folds.append(cached)
+        else:
+            tasks.append((model, window, cutoff, horizon, init))
+            keys.append(key)
+
+    print(f"(chart) Backtesting {len(folds) + len(tasks)} folds ({len(folds)} cached, {len(tasks)} to compute)...")
+    for key, fold in zip(keys, _run_tasks(_prophet_fold, tasks, max_workers)):
+        cache.put(key, fold)
+        folds.append(fold)
+    cache.prune()
+
+    report = summarize_backtest(pd.concat(folds, ignore_index=True) if folds else pd.DataFrame())
+    report.update({"cached_folds": len(folds) - len(tasks), "recomputed_folds": len(tasks)})
+    return report
+
+# ---------------------------------------------------------------- Holt-Winters (per SKU/Store)
+
+def _holt_winters_folds(series_key: str, series: pd.Series, cutoffs: List[pd.Timestamp], horizon: pd.Timedelta) -> List[pd.DataFrame]:
+    folds = []
+    for cutoff in cutoffs:
+        train = series[series.index <= cutoff]
+        test = series[(series.index > cutoff) & (series.index <= cutoff + horizon)]
+        values, _ = forecast_series(train, len(test))
+        folds.append(pd.DataFrame({
+            'series': series_key,
+            'cutoff': cutoff,
+            'ds': test.index,
+            'y': test.to_numpy(),
+            'yhat': values,
+            'yhat_lower': np.nan,
+            'yhat_upper': np.nan,
+        }))
+    return folds
+
+def backtest_holt_winters(sales: pd.DataFrame, initial='56 days', period='14 days', horizon='14 days',
+                          max_workers: Optional[int] = MLConfig.BACKTEST_MAX_WORKERS,
+                          cache: Optional[FoldCache] = None) -> Dict:
+    """
+    Rolling-origin backtest of the per-SKU Holt-Winters path.
+    sales: long DataFrame with columns (series, ds, y), one row per series and day.
+    Each series is densified to daily frequency, exactly as the /forecasting/predict endpoint does.
+    """
+    initial, period, horizon = pd.Timedelta(initial), pd.Timedelta(period), pd.Timedelta(horizon)
+    cache = cache or FoldCache()
+    config_key = _hash({'model': 'holt_winters', 'params': HOLT_WINTERS_PARAMS})
+
+    folds, tasks, task_keys = [], [], []
+    for series_key, group in sales.groupby('series', sort=False):
+        series = group.set_index(pd.to_datetime(group['ds']))['y'].sort_index().resample('D').sum().fillna(0)
+        pending, pending_keys = [], []
+        for cutoff in make_cutoffs(series.index.to_series(), initial, period, horizon):
+            window = series[series.index <= cutoff + horizon]
+            key = _hash(config_key, series_key, cutoff, horizon, window.reset_index())
+            cached = cache.get(key)
+            if cached is not None:
+                folds.append(cached)
+            else:
+                pending.append(cutoff)
+                pending_keys.append(key)
+        if pending:
+            # One task per series keeps process overhead low, folds inside it are cheap
+            tasks.append((series_key, series, pending, horizon))
+            task_keys.append(pending_keys)
+
+    recomputed = sum(len(k) for k in task_keys)
+    print(f"(chart) Backtesting {len(folds) + recomputed} Holt-Winters folds ({len(folds)} cached, {recomputed} to compute)...")
+    for keys, series_folds in zip(task_keys, _run_tasks(_holt_winters_folds, tasks, max_workers)):
+        for key, fold in zip(keys, series_folds):
+            cache.put(key, fold)
+            folds.append(fold)
+    cache.prune()
+
+    report = summarize_backtest(pd.concat(folds, ignore_index=True) if folds else pd.DataFrame())
+    report.update({"cached_folds": len(folds) - recomputed, "recomputed_folds": recomputed})
+    return report
+
+# ---------------------------------------------------------------- Metrics
+
+def _metrics_frame(df: pd.DataFrame, by: List[str]) -> pd.DataFrame:
+    err = df['y'] - df['yhat']
+    abs_y = df['y'].abs()
+    parts = pd.DataFrame({
+        'mse': err ** 2,
+        'mae': err.abs(),
+        'mape': (err.abs() / abs_y).where(abs_y != 0),
+        'smape': (2 * err.abs() / (abs_y + df['yhat'].abs())).where((abs_y + df['yhat'].abs()) != 0),
+        'coverage': ((df['y'] >= df['yhat_lower']) & (df['y'] <= df['yhat_upper'])).astype(float).where(df['yhat_lower'].notna()),
+    })
+    for col in by:
+        parts[col] = df[col]
+
+    grouped = parts.groupby(by).mean() if by else parts.mean().to_frame().T
+    grouped['mdape'] = parts.groupby(by)['mape'].median() if by else parts['mape'].median()
+    grouped['rmse'] = np.sqrt(grouped['mse'])
+    grouped['count'] = parts.groupby(by).size() if by else len(parts)
+    return grouped.reset_index() if by else grouped
+
+def _records(df: pd.DataFrame) -> List[Dict]:
+    df = df.replace([np.inf, -np.inf], np.nan).astype(object).where(df.notna(), None)
+    return df.to_dict(orient='records')
+
+def summarize_backtest(df: pd.DataFrame) -> Dict:
+    """
+    Metrics (mse, rmse, mae, mape, mdape, smape, coverage) overall, per horizon (days after cutoff) and per series.
+    MAPE/MDAPE/SMAPE/coverage are fractions, matching Prophet's performance_metrics.
+    """
+    if df.empty:
+        return {"folds": 0, "overall": {}, "by_horizon": [], "by_series": []}
+
+    df = df.copy()
+    df['horizon'] = (pd.to_datetime(df['ds']) - pd.to_datetime(df['cutoff'])).dt.days
+
+    by_horizon = _metrics_frame(df, ['horizon'])
+    overall = by_horizon.drop(columns=['horizon', 'count']).mean().to_dict()
+    overall = {k: float(v) for k, v in overall.items() if pd.notna(v)}
+
+    return {
+        "folds": int(df[['series', 'cutoff']].drop_duplicates().shape[0]),
+        "overall": overall,
+        "by_horizon": _records(by_horizon),
+        "by_series": _records(_metrics_frame(df, ['series'])),
+    }
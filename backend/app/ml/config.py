@@ -3,3 +3,20 @@ class MLConfig:
     TEST_SIZE = 0.2
     RANDOM_STATE = 42
     TARGET_COLUMN = "sales"
+
+    # Rolling-origin backtesting
+    BACKTEST_CACHE_DIR = "backtest_cache"
+    BACKTEST_MAX_WORKERS = None # None -> one process per CPU
+    BACKTEST_CACHE_MAX_BYTES = 512 * 1024 * 1024 # least recently used folds are evicted beyond this
+
+    # Prepared training frame cache (Parquet), keyed by the sales data high-water mark
+    TRAINING_FRAME_CACHE = "training_frame.parquet"
+
+    # Prophet holidays frame cache (Parquet), keyed by the holiday table's (count, max id)
+    HOLIDAYS_FRAME_CACHE = "holidays_frame.parquet"
+
+    # Per-series outlier capping of daily totals ('quantile' or 'mad' robust z-score)
+    OUTLIER_METHOD = "quantile"
+    OUTLIER_LOWER_QUANTILE = 0.01
+    OUTLIER_UPPER_QUANTILE = 0.99
+    OUTLIER_MAD_Z = 3.5
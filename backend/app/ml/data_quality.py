@@ -0,0 +1,230 @@
+import pandas as pd
+from typing import Callable, Dict, List
+from sqlalchemy import and_, func, or_, select, delete, update
+from sqlalchemy.orm import Session
+from app.crud import crud_dashboard, crud_sales
+from app.ml.preprocessing import invalidate_training_frame_cache
+from app.models.sales import SalesData, Product, Store
+
+ProgressCallback = Callable[[str, float], None]
+
+def _noop(stage: str, progress: float):
+    pass
+
+def count_negative_quantities(db: Session) -> int:
+    return db.query(func.count(SalesData.id)).filter(SalesData.quantity < 0).scalar() or 0
+
+def find_duplicates(db: Session) -> Dict:
+    """
+    exact:      identical records (date, sku, store, quantity, promotion).
+    same_key:   several rows for one (date, sku, store).
+    Both are informational only: POS events and the live simulator legitimately write several
+    identical sales per day (often quantity 1), and rows carry no idempotency key that would
+    tell a repeated delivery from a real sale.
+    """
+    exact_cols = [SalesData.date, SalesData.sku_id, SalesData.store_id, SalesData.quantity, SalesData.onpromotion]
+    exact = (
+        select(func.count().label("n"))
+        .select_from(SalesData)
+        .group_by(*exact_cols)
+        .having(func.count() > 1)
+        .subquery()
+    )
+    exact_groups, exact_rows = db.query(func.count(), func.coalesce(func.sum(exact.c.n - 1), 0)).select_from(exact).one()
+
+    key_cols = [SalesData.date, SalesData.sku_id, SalesData.store_id]
+    keyed = (
+        select(func.count().label("n"))
+        .select_from(SalesData)
+        .group_by(*key_cols)
+        .having(func.count() > 1)
+        .subquery()
+    )
+    key_groups = db.query(func.count()).select_from(keyed).scalar()
+
+    return {
+        "exact_duplicate_groups": int(exact_groups or 0),
+        "exact_duplicate_rows": int(exact_rows or 0),
+        "same_key_groups": int(key_groups or 0),
+    }
+
+def find_series_gaps(db: Session, top: int = 20) -> Dict:
+    """
+    Missing days per (sku, store) series between its first and last sale, computed from
+    one aggregate row per series (MIN/MAX date, COUNT DISTINCT date).
+    """
+    rows = (
+        db.query(
+            SalesData.sku_id,
+            SalesData.store_id,
+            func.min(SalesData.date),
+            func.max(SalesData.date),
+            func.count(func.distinct(SalesData.date))
+        )
+        .group_by(SalesData.sku_id, SalesData.store_id)
+        .all()
+    )
+    if not rows:
+        return {"series": 0, "series_with_gaps": 0, "missing_days": 0, "worst_series": []}
+
+    df = pd.DataFrame(rows, columns=["sku_id", "store_id", "first", "last", "days"])
+    span = (pd.to_datetime(df["last"]) - pd.to_datetime(df["first"])).dt.days + 1
+    df["missing_days"] = (span - df["days"]).astype(int)
+    worst = df[df["missing_days"] > 0].nlargest(top, "missing_days")
+
+    return {
+        "series": int(len(df)),
+        "series_with_gaps": int((df["missing_days"] > 0).sum()),
+        "missing_days": int(df["missing_days"].sum()),
+        "worst_series": [
+            {"sku_id": int(r.sku_id) if pd.notna(r.sku_id) else None,
+             "store_id": int(r.store_id) if pd.notna(r.store_id) else None,
+             "first": str(r.first), "last": str(r.last), "missing_days": int(r.missing_days)}
+            for r in worst.itertuples()
+        ],
+    }
+
+def _orphan_filter():
+    return or_(
+        SalesData.sku_id.is_(None),
+        SalesData.store_id.is_(None),
+        ~select(Product.id).where(Product.id == SalesData.sku_id).exists(),
+        ~select(Store.id).where(Store.id == SalesData.store_id).exists(),
+    )
+
+def count_orphans(db: Session) -> int:
+    return db.query(func.count(SalesData.id)).filter(_orphan_filter()).scalar() or 0
+
+def _sku_batches(db: Session, batch_size: int) -> List[tuple]:
+    """
+    Keyset ranges of sku_id (lo, hi] holding roughly 'batch_size' sales rows each,
+    so per-SKU statistics can be computed without loading the whole table.
+    """
+    counts = (
+        db.query(SalesData.sku_id, func.count(SalesData.id))
+        .filter(SalesData.sku_id.isnot(None))
+        .group_by(SalesData.sku_id)
+        .order_by(SalesData.sku_id)
+        .all()
+    )
+    batches, lo, rows = [], None, 0
+    for sku_id, n in counts:
+        rows += n
+        if rows >= batch_size:
+            batches.append((lo, sku_id))
+            lo, rows = sku_id, 0
+    if rows:
+        batches.append((lo, counts[-1][0]))
+    return batches
+
+def find_iqr_outliers(db: Session, batch_size: int = 100000, k: float = 1.5,
+                      progress: ProgressCallback = _noop, top: int = 20) -> Dict:
+    """
+    Outliers per SKU using Tukey fences (Q1 - k*IQR, Q3 + k*IQR), scanned in keyset batches of SKUs.
+    """
+    batches = _sku_batches(db, batch_size)
+    total_outliers, skus_with_outliers = 0, 0
+    worst = []
+
+    for i, (lo, hi) in enumerate(batches):
+        conditions = [SalesData.sku_id <= hi]
+        if lo is not None:
+            conditions.append(SalesData.sku_id > lo)
+        rows = db.execute(
+            select(SalesData.sku_id, SalesData.quantity).where(and_(*conditions))
+        ).all()
+        df = pd.DataFrame(rows, columns=["sku_id", "quantity"])
+
+        grouped = df.groupby("sku_id")["quantity"]
+        q1 = grouped.transform("quantile", 0.25)
+        q3 = grouped.transform("quantile", 0.75)
+        iqr = q3 - q1
+        is_outlier = (df["quantity"] < q1 - k * iqr) | (df["quantity"] > q3 + k * iqr)
+
+        per_sku = is_outlier.groupby(df["sku_id"]).sum()
+        total_outliers += int(per_sku.sum())
+        skus_with_outliers += int((per_sku > 0).sum())
+        worst.extend((int(s), int(n)) for s, n in per_sku[per_sku > 0].items())
+        worst = sorted(worst, key=lambda x: -x[1])[:top]
+
+        progress(f"Outliers: batch {i + 1}/{len(batches)}", (i + 1) / len(batches))
+
+    return {
+        "method": f"IQR per SKU (k={k})",
+        "outlier_rows": total_outliers,
+        "skus_with_outliers": skus_with_outliers,
+        "worst_skus": [{"sku_id": s, "outliers": n} for s, n in worst],
+    }
+
+def apply_fixes(db: Session) -> List[str]:
+    """
+    Bulk fixes in one transaction: negative quantities -> 0 and orphaned rows deleted, with
+    the matching DailySalesRollup increments and the change to today's dashboard totals.
+    Exact duplicates are reported but never deleted (see find_duplicates).
+    """
+    actions = []
+    negative, orphan = SalesData.quantity < 0, _orphan_filter()
+    affected = pd.DataFrame(
+        db.query(SalesData.date, SalesData.sku_id, SalesData.store_id, SalesData.quantity, orphan.label("orphan"))
+        .filter(or_(negative, orphan))
+        .all(),
+        columns=["date", "sku_id", "store_id", "quantity", "orphan"]
+    )
+    if affected.empty:
+        return actions
+
+    # Negative rows stay in the rollups at 0; deleted rows leave them
+    orphaned = affected["orphan"].astype(bool)
+    increments = crud_sales.get_rollup_increments(db, pd.DataFrame({
+        "date": affected["date"], "sku_id": affected["sku_id"], "store_id": affected["store_id"],
+        "quantity": -affected["quantity"],
+        "records": -orphaned.astype(int)
+    }))
+
+    fixed = db.execute(update(SalesData).where(negative).values(quantity=0)).rowcount
+    if fixed:
+        actions.append(f"Set {fixed} negative quantities to 0.")
+
+    removed = db.execute(delete(SalesData).where(orphan)).rowcount
+    if removed:
+        actions.append(f"Deleted {removed} orphaned sales rows.")
+
+    crud_sales.upsert_daily_rollups(db, increments)
+    crud_dashboard.publish_sales_delta(db, increments)
+    db.commit()
+    invalidate_training_frame_cache()
+    return actions
+
+def run_data_quality_scan(db: Session, fix: bool = False, batch_size: int = 100000,
+                          progress: ProgressCallback = _noop) -> Dict:
+    """
+    Full-table data-quality scan of SalesData.
+    Aggregate checks run entirely in SQL; the per-SKU IQR pass streams keyset batches.
+    progress(stage, fraction) is called as the scan advances.
+    """
+    report = {"total_rows": db.query(func.count(SalesData.id)).scalar() or 0}
+
+    progress("Checking negative quantities", 0.05)
+    report["negative_quantities"] = count_negative_quantities(db)
+
+    progress("Checking duplicates", 0.15)
+    report["duplicates"] = find_duplicates(db)
+
+    progress("Checking gaps per series", 0.25)
+    report["gaps"] = find_series_gaps(db)
+
+    progress("Checking orphaned foreign keys", 0.35)
+    report["orphaned_rows"] = count_orphans(db)
+
+    report["outliers"] = find_iqr_outliers(
+        db, batch_size=batch_size,
+        progress=lambda stage, p: progress(stage, 0.35 + 0.55 * p)
+    )
+
+    report["actions_taken"] = []
+    if fix:
+        progress("Applying fixes", 0.92)
+        report["actions_taken"] = apply_fixes(db)
+
+    progress("Completed", 1.0)
+    return report
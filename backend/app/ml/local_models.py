@@ -0,0 +1,197 @@
+import pandas as pd
+import numpy as np
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional, Tuple
+
+# Holt-Winters configuration shared by the endpoint and the backtester
+HOLT_WINTERS_PARAMS = {
+    "seasonal_periods": 7, # Assume weekly seasonality if enough data
+    "trend": "add",
+    "seasonal": "add",
+    "initialization_method": "estimated",
+}
+
+def densify_daily(dates: np.ndarray, values: np.ndarray) -> pd.Series:
+    """
+    Scatter per-day totals (sorted, unique datetime64[D] dates) onto a contiguous daily range,
+    filling missing days with 0. Equivalent to resample('D').sum() without building a frame.
+    """
+    if dates.size == 0:
+        return pd.Series(dtype=float)
+    offsets = (dates - dates[0]).astype(np.int64)
+    dense = np.zeros(offsets[-1] + 1, dtype=float)
+    dense[offsets] = values
+    return pd.Series(dense, index=pd.date_range(start=dates[0], periods=dense.size, freq='D'))
+
+class FittedSeries:
+    """
+    Result of fitting one SKU/Store series: either a fitted Holt-Winters model
+    or a constant level (zero demand, simple or moving average fallback).
+    """
+    def __init__(self, method: str, fit: Any = None, level: float = 0.0):
+        self.method = method
+        self.fit = fit
+        self.level = level
+
+    def forecast(self, days: int) -> List[float]:
+        if self.fit is not None:
+            return [float(x) for x in np.asarray(self.fit.forecast(days))]
+        return [self.level] * days
+
+def fit_series(series: pd.Series) -> FittedSeries:
+    """
+    Fit a single daily SKU/Store series using the same fallbacks as the per-SKU endpoint:
+    zero demand -> simple average (short history) -> Holt-Winters -> moving average.
+    """
+    if series.sum() == 0:
+        return FittedSeries("Zero Demand (Historical Data is all 0)")
+
+    if len(series) < 7:
+        # Not enough data for complex model, use simple average
+        avg = float(series.mean()) if not series.empty else 0.0
+        return FittedSeries("Simple Average (Insufficient Data)", level=avg)
+
+    try:
+        from statsmodels.tsa.holtwinters import ExponentialSmoothing
+        # Simple Exponential Smoothing (Holt-Winters)
+        fit = ExponentialSmoothing(series, **HOLT_WINTERS_PARAMS).fit()
+        return FittedSeries("Exponential Smoothing (Holt-Winters)", fit=fit)
+    except Exception as e:
+        # Fallback to moving average if statsmodels fails (e.g., convergence issues)
+        recent_avg = float(series.tail(7).mean())
+        return FittedSeries(f"Moving Average (Fallback due to model error: {str(e)})", level=recent_avg)
+
+def forecast_series(series: pd.Series, days: int) -> Tuple[List[float], str]:
+    """
+    Forecast a single daily SKU/Store series for the next 'days'.
+    Returns (forecast_values, method).
+    """
+    fitted = fit_series(series)
+    return fitted.forecast(days), fitted.method
+
+# Fixed smoothing constants for forecasting many series at once (no per-series optimization)
+BATCH_SMOOTHING_PARAMS = {
+    "alpha": 0.2, # level
+    "beta": 0.02, # trend
+    "gamma": 0.1, # weekly seasonality
+}
+
+# Candidates for forecast_series_batch(tune=True): each series keeps its best combination
+BATCH_SMOOTHING_GRID = {
+    "alpha": (0.05, 0.2, 0.5),
+    "beta": (0.0, 0.05),
+    "gamma": (0.05, 0.3),
+}
+
+def _smooth_batch(history: np.ndarray, days: int, alpha: float, beta: float, gamma: float) -> Tuple[np.ndarray, np.ndarray]:
+    """One additive Holt-Winters pass over every row. Returns (forecast, sum of squared one-step errors)."""
+    n, length = history.shape
+    period = HOLT_WINTERS_PARAMS["seasonal_periods"]
+    if length < 2 * period:
+        # Too short for a season and trend: simple exponential smoothing around the mean
+        level, trend, season = history.mean(axis=1), np.zeros(n), np.zeros((n, period))
+    else:
+        first, second = history[:, :period].mean(axis=1), history[:, period:2 * period].mean(axis=1)
+        level, trend = first, (second - first) / period
+        season = history[:, :period] - first[:, None]
+    squared_errors = np.zeros(n)
+    for t in range(length):
+        y, s = history[:, t], season[:, t % period]
+        error = y - (level + trend + s)
+        squared_errors += error ** 2
+        new_level = alpha * (y - s) + (1 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        season[:, t % period] = gamma * (y - new_level) + (1 - gamma) * s
+        level = new_level
+    steps = np.arange(1, days + 1)
+    return level[:, None] + trend[:, None] * steps + season[:, (length + steps - 1) % period], squared_errors
+
+def forecast_series_batch(history: np.ndarray, days: int, tune: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Additive Holt-Winters (weekly season) over every row of a dense (series x day) history
+    matrix at once, so thousands of series take one vectorized pass per history day.
+    With BATCH_SMOOTHING_PARAMS by default; tune=True runs every BATCH_SMOOTHING_GRID
+    combination and keeps, per series, the one with the lowest in-sample one-step squared
+    error (the criterion the per-series statsmodels fits of forecast_series minimize).
+    Returns (forecast, sigma): the next 'days' daily values per series, clipped at 0, and the
+    standard deviation of the one-step-ahead errors (the width of the forecast interval).
+    """
+    n, length = history.shape
+    if length == 0:
+        return np.zeros((n, days)), np.zeros(n)
+    if not tune:
+        forecast, squared_errors = _smooth_batch(history, days, **BATCH_SMOOTHING_PARAMS)
+    else:
+        forecast, squared_errors = None, None
+        grid = BATCH_SMOOTHING_GRID
+        for alpha in grid["alpha"]:
+            for beta in grid["beta"]:
+                for gamma in grid["gamma"]:
+                    candidate, errors = _smooth_batch(history, days, alpha, beta, gamma)
+                    if forecast is None:
+                        forecast, squared_errors = candidate, errors
+                        continue
+                    better = errors < squared_errors
+                    forecast[better], squared_errors[better] = candidate[better], errors[better]
+    return np.clip(forecast, 0, None), np.sqrt(squared_errors / length)
+
+class FittedSeriesCache:
+    """
+    Thread-safe LRU cache of fitted per-SKU models.
+
+    Entries are stored per series and tagged with a data signature
+    (last sale date, row count). A lookup only hits when the signature still matches,
+    i.e. no new sales arrived for that sku/store since the fit.
+    """
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[Hashable, FittedSeries]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, series_key: Hashable, signature: Hashable) -> Optional[FittedSeries]:
+        with self._lock:
+            entry = self._entries.get(series_key)
+            if entry is None or entry[0] != signature:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(series_key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, series_key: Hashable, signature: Hashable, fitted: FittedSeries):
+        with self._lock:
+            self._entries[series_key] = (signature, fitted)
+            self._entries.move_to_end(series_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_fit(self, series_key: Hashable, signature: Hashable, series: pd.Series) -> FittedSeries:
+        fitted = self.get(series_key, signature)
+        if fitted is None:
+            # Fit outside the lock so concurrent requests for other series are not blocked
+            fitted = fit_series(series)
+            self.put(series_key, signature, fitted)
+        return fitted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+def _create_cache() -> FittedSeriesCache:
+    from app.core.config import settings
+    return FittedSeriesCache(max_entries=settings.SKU_MODEL_CACHE_SIZE)
+
+# Singleton instance
+fitted_series_cache = _create_cache()
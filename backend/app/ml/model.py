@@ -6,11 +6,23 @@ import joblib
 import os
 from datetime import datetime, timedelta
 import logging
-from .preprocessing import prepare_for_training
+from .preprocessing import prepare_for_training, history_columns
+from .profiling import stan_fit_stats
 
 # Setup logging
 logging.getLogger('prophet').setLevel(logging.WARNING)
 
+def artifact_paths(model_path):
+    """Backtest report, model and metrics files of 'model_path', in the order they are promoted."""
+    return [model_path.replace('.joblib', '_backtest.json'), model_path,
+            model_path.replace('.joblib', '_metrics.json')]
+
+def discard_artifacts(model_path):
+    """Remove whatever was written under 'model_path' (e.g. by a failed or cancelled training job)."""
+    for path in artifact_paths(model_path) + [f"{model_path}.tmp"]:
+        if os.path.exists(path):
+            os.remove(path)
+
 class ForecastModel:
     def __init__(self, model_path="prophet_model.joblib", 
                  changepoint_prior_scale=0.05, 
@@ -36,90 +48,144 @@ class ForecastModel:
             'yearly_seasonality': yearly_seasonality
         }
         self.country_holidays = country_holidays
-        self.metrics_path = model_path.replace('.joblib', '_metrics.json')
+        self.set_model_path(model_path)
         self.last_metrics = self._load_metrics()
+        self._artifact_signature = None
+        self.fit_stats = None # Stan optimizer stats of the last fit
+        self.data_high_water_mark = None # sales high-water mark of the data the last fit used (set by train_model)
 
-    def train(self, df=None, csv_path="data/train.csv", auto_tune=False, holidays_df=None):
+    def train(self, df=None, csv_path="data/train.csv", auto_tune=False, holidays_df=None, train_df=None, warm_start=False,
+              progress=None):
         """
         Trains the Prophet model with sophisticated preprocessing and configuration.
         auto_tune: If True, runs grid search to find best hyperparameters. (Slow!)
         holidays_df: Optional DataFrame of custom holidays (ds, holiday, [lower_window, upper_window])
+        train_df: Optional frame already run through prepare_for_training (e.g. from the cache); skips preprocessing.
+        warm_start: Incremental retrain - reuse the current model's hyperparameters and initialize
+                    the optimizer from its fitted parameters (falls back to a cold fit if the structure changed).
+        progress: Optional progress(stage, fraction) callback for the tuning, fitting and saving stages.
         """
-        if df is None:
-            if os.path.exists(csv_path):
-                print(f"(folder) Found CSV file. Loading data from {csv_path}...")
-                try:
-                    df = pd.read_csv(csv_path)
-                except Exception as e:
-                    print(f"(x) Error reading CSV: {e}")
-                    return
-            else:
-                print(f"(!) File not found at {csv_path}. Generating synthetic training data...")
-                df = self._generate_dummy_data()
+        progress = progress or (lambda stage, fraction: None)
+        if train_df is None:
+            train_df = self._prepare_training_frame(df, csv_path)
+            if train_df is None:
+                return
 
-        print(f"(refresh) Preparing {len(df)} records for training...")
-        
-        # Use centralized preprocessing
-        train_df = prepare_for_training(df)
-        
         if train_df.empty or 'y' not in train_df.columns or 'ds' not in train_df.columns:
             print("(x) Preprocessing failed or missing required columns ('ds', 'y').")
             return
 
+        previous = None
+        if warm_start:
+            if self.model is None:
+                self.load_model()
+            previous = self.model
+            if previous is not None and not auto_tune:
+                self.params.update({name: getattr(previous, name) for name in self.params})
+
         # Auto-Tune if requested
         if auto_tune:
+            progress("Tuning hyperparameters", 0.35)
             print("(brain) Auto-Tuning enabled. This may take a while...")
-            self.optimize_hyperparameters(df)
+            self.optimize_hyperparameters(train_df, prepared=True)
             print(f"(brain) Optimization done. using params: {self.params}")
 
+        progress("Fitting model", 0.55 if auto_tune else 0.35)
+        print("(rocket) Fitting Prophet model...")
+        self.model = self._build_prophet(holidays_df, train_df)
+        if previous is not None and getattr(previous, 'params', None):
+            from app.ml.backtesting import stan_init
+            try:
+                self.model.fit(train_df, init=stan_init(previous))
+                print("(tick) Warm-started from the previous model.")
+            except Exception as e:
+                # e.g. a different number of holidays/regressors changes the parameter shapes
+                print(f"(!) Warm start not possible ({e}). Refitting from scratch.")
+                self.model = self._build_prophet(holidays_df, train_df)
+                self.model.fit(train_df)
+        else:
+            self.model.fit(train_df)
+        self.is_trained = True
+        self.fit_stats = stan_fit_stats(self.model)
+        
+        progress("Saving model", 0.75)
+        self.save_model()
+        print("(tick) Model trained and saved successfully.")
+
+    def _build_prophet(self, holidays_df, train_df):
         # Initialize Prophet with tuned parameters
         # Pass holidays if available
-        self.model = Prophet(holidays=holidays_df, **self.params)
+        model = Prophet(holidays=holidays_df, **self.params)
 
         # detailed seasonality
-        self.model.add_seasonality(name='monthly', period=30.5, fourier_order=5)
+        model.add_seasonality(name='monthly', period=30.5, fourier_order=5)
         
         if self.country_holidays:
             try:
-                self.model.add_country_holidays(country_name=self.country_holidays)
+                model.add_country_holidays(country_name=self.country_holidays)
             except Exception as e:
                 print(f"(!) Could not add holidays for {self.country_holidays}: {e}")
 
         if 'onpromotion' in train_df.columns:
-            self.model.add_regressor('onpromotion')
+            model.add_regressor('onpromotion')
+        return model
 
-        print("(rocket) Fitting Prophet model...")
-        self.model.fit(train_df)
-        self.is_trained = True
-        
-        self.save_model()
-        print("(tick) Model trained and saved successfully.")
+    def _prepare_training_frame(self, df=None, csv_path="data/train.csv"):
+        """
+        Loads raw data (DataFrame, Parquet/CSV history or synthetic) and runs the preprocessing pipeline.
+        A Parquet copy next to the CSV (see convert_sales_history.py) is preferred: only the
+        needed columns are read and nothing is parsed from text.
+        """
+        if df is None:
+            parquet_path = os.path.splitext(csv_path)[0] + ".parquet"
+            if os.path.exists(parquet_path):
+                print(f"(folder) Found Parquet history. Loading data from {parquet_path}...")
+                try:
+                    import pyarrow.parquet as pq
+                    df = pd.read_parquet(parquet_path, columns=history_columns(pq.read_schema(parquet_path).names))
+                except Exception as e:
+                    print(f"(x) Error reading Parquet: {e}")
+            if df is None and os.path.exists(csv_path):
+                print(f"(folder) Found CSV file. Loading data from {csv_path}...")
+                try:
+                    df = pd.read_csv(csv_path)
+                except Exception as e:
+                    print(f"(x) Error reading CSV: {e}")
+                    return None
+            elif df is None:
+                print(f"(!) File not found at {csv_path}. Generating synthetic training data...")
+                df = self._generate_dummy_data()
+
+        print(f"(refresh) Preparing {len(df)} records for training...")
+
+        # Use centralized preprocessing
+        return prepare_for_training(df)
 
     def evaluate(self, initial='365 days', period='30 days', horizon='30 days'):
         """
-        Perform cross-validation to evaluate model performance (RMSE, MAE).
+        Rolling-origin backtest to evaluate model performance (RMSE, MAE).
+        Folds are warm-started from the current fit, run in parallel and cached on disk,
+        so re-evaluating after a small change only recomputes the affected folds.
+        The full per-horizon report is saved next to the metrics file.
         """
         if not self.is_trained:
             print("(!) Model not trained. Cannot evaluate.")
             return None
 
-        print("(chart) Starting Cross-Validation...")
+        print("(chart) Starting Backtest...")
         try:
-            df_cv = cross_validation(self.model, initial=initial, period=period, horizon=horizon)
-            df_p = performance_metrics(df_cv)
-            
-            # Save metrics (select numeric only)
-            numeric_cols = ['mse', 'rmse', 'mae', 'mape', 'mdape', 'smape', 'coverage']
-            # Intersect with available columns because coverage might be missing
-            valid_cols = [c for c in numeric_cols if c in df_p.columns]
-            
-            metrics = df_p[valid_cols].mean().to_dict()
-            # Convert numpy types to python native for JSON
-            metrics = {k: float(v) for k, v in metrics.items()}
-            
+            from .backtesting import backtest_prophet
+            report = backtest_prophet(self.model, initial=initial, period=period, horizon=horizon)
+            if not report["overall"]:
+                raise ValueError("No backtest folds fit in the available history.")
+
+            # Headline metrics are the average over all horizons
+            metrics = report["overall"]
+
             self.last_metrics = metrics
             self._save_metrics()
-            
+            self._save_backtest(report)
+
             print(f"(tick) Evaluation Complete. RMSE: {metrics.get('rmse', 'N/A'):.2f}, MAE: {metrics.get('mae', 'N/A'):.2f}")
             return metrics
         except Exception as e:
@@ -177,6 +243,21 @@ class ForecastModel:
             
         return clean_forecast
 
+    def predict_dates(self, dates):
+        """
+        Point forecasts (yhat) for explicit dates, with no promotions.
+        Used to align the global forecast with other models' horizons.
+        """
+        if not self.is_trained or self.model is None:
+            if not self.load_model():
+                raise ValueError("Model has not been trained yet.")
+
+        future = pd.DataFrame({'ds': pd.to_datetime(dates)})
+        if 'onpromotion' in self.model.extra_regressors:
+            future['onpromotion'] = 0
+
+        return self.model.predict(future)['yhat'].to_numpy()
+
     def get_model_components(self, days=30):
         """
         Returns the decomposition of the forecast (trend, seasonality) for visualization.
@@ -260,48 +341,99 @@ class ForecastModel:
         
         promotion_schedule: List of 0/1 values for the next 'days'.
         """
+        result = self.simulate_scenarios(days=days, promotion_schedules=[promotion_schedule or []])
+        if result is None:
+            return None
+
+        return result["scenarios"][0]["daily"]
+
+    def simulate_scenarios(self, days=30, promotion_schedules=None):
+        """
+        Evaluates many promotion calendars in a single vectorized pass.
+
+        The 'onpromotion' regressor enters Prophet linearly, so every scenario is
+        baseline + schedule * per-day promotion effect. We run one full predict for
+        the no-promotion baseline (with uncertainty intervals) and one cheap component
+        pass with promotions switched on, then combine them with a matrix product
+        instead of calling predict once per schedule.
+
+        promotion_schedules: List of schedules, each a list of 0/1 values for the next 'days'.
+        """
         if not self.is_trained or self.model is None:
             if not self.load_model():
                 return None
-                
-        future = self.model.make_future_dataframe(periods=days)
-        
-        # Validate schedule
-        if not promotion_schedule:
-            promotion_schedule = [0] * days
-        
-        # Ensure schedule length matches 'days'
-        if len(promotion_schedule) < days:
-            promotion_schedule += [0] * (days - len(promotion_schedule))
-        promotion_schedule = promotion_schedule[:days]
-            
-        # We need to construct the full regressor column for 'future' dataframe
-        # future includes history + 'periods' days
-        history_len = len(self.model.history)
-        total_len = len(future)
-        
-        # If 'onpromotion' is used
-        if 'onpromotion' in self.model.extra_regressors:
-            # We assume historical promotions are 0 for this simulation or retrieve them?
-            # Better: retrieve historical average or 0. For simulation, 0 is safe baseline for history if unknown.
-            # Ideally we'd use self.model.history['onpromotion'] but Prophet history frame might not keep regressors cleanly accessible without re-merging.
-            # Simplified approach: Set history to 0, or try to respect pattern.
-            
-            # Create a full array
-            full_promotion = [0] * history_len + promotion_schedule
-            future['onpromotion'] = full_promotion
-            
-        forecast = self.model.predict(future)
-        
-        # Return only the future part
-        future_forecast = forecast.tail(days)
-        
-        return future_forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].to_dict(orient='records')
 
-    def optimize_hyperparameters(self, df, param_grid=None):
+        if not promotion_schedules:
+            promotion_schedules = [[]]
+
+        # Pad / truncate every schedule to 'days' and stack into a (scenarios x days) matrix
+        schedules = np.zeros((len(promotion_schedules), days), dtype=float)
+        for i, schedule in enumerate(promotion_schedules):
+            values = list(schedule or [])[:days]
+            schedules[i, :len(values)] = values
+
+        future = self.model.make_future_dataframe(periods=days, include_history=False)
+        uses_promotion = 'onpromotion' in self.model.extra_regressors
+        if uses_promotion:
+            future['onpromotion'] = 0
+
+        baseline = self.model.predict(future)
+        base_yhat = baseline['yhat'].to_numpy()
+
+        effect = np.zeros(days)
+        if uses_promotion:
+            # Same future frame with every day on promotion; components only, no uncertainty sampling
+            promo_df = self.model.setup_dataframe(future.assign(onpromotion=1))
+            promo_trend = self.model.predict_trend(promo_df).to_numpy()
+            promo_terms = self.model.predict_seasonal_components(promo_df)
+            promo_yhat = (
+                promo_trend * (1 + promo_terms['multiplicative_terms'].to_numpy())
+                + promo_terms['additive_terms'].to_numpy()
+            )
+            effect = promo_yhat - base_yhat
+
+        uplift = schedules * effect
+        yhat = base_yhat + uplift
+        yhat_lower = baseline['yhat_lower'].to_numpy() + uplift
+        yhat_upper = baseline['yhat_upper'].to_numpy() + uplift
+
+        dates = baseline['ds']
+        baseline_total = float(base_yhat.sum())
+        totals = yhat.sum(axis=1)
+
+        scenarios = []
+        for i in range(len(schedules)):
+            daily = pd.DataFrame({
+                'ds': dates,
+                'yhat': yhat[i],
+                'yhat_lower': yhat_lower[i],
+                'yhat_upper': yhat_upper[i],
+            })
+            scenarios.append({
+                "scenario": i,
+                "promotion_days": int(np.count_nonzero(schedules[i])),
+                "total": float(totals[i]),
+                "uplift": float(totals[i] - baseline_total),
+                "uplift_pct": float((totals[i] - baseline_total) / baseline_total * 100) if baseline_total else None,
+                "daily": daily.to_dict(orient='records'),
+            })
+
+        return {
+            "baseline": {
+                "total": baseline_total,
+                "daily": baseline[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].to_dict(orient='records'),
+            },
+            "promotion_effect": [
+                {"ds": ds, "effect": float(e)} for ds, e in zip(dates, effect)
+            ],
+            "scenarios": scenarios,
+        }
+
+    def optimize_hyperparameters(self, df, param_grid=None, prepared=False):
         """
         Auto-tune hyperparameters using Grid Search with Cross Validation.
         Warning: This is computationally expensive.
+        prepared: True if 'df' is already the output of prepare_for_training.
         """
         from sklearn.model_selection import ParameterGrid
         
@@ -319,7 +451,7 @@ class ForecastModel:
         min_rmse = float('inf')
         
         # Prepare data once
-        train_df = prepare_for_training(df)
+        train_df = df if prepared else prepare_for_training(df)
         
         for params in ParameterGrid(param_grid):
             try:
@@ -396,16 +528,59 @@ class ForecastModel:
             })
         return pd.DataFrame(data)
 
+    def set_model_path(self, model_path):
+        """Point the model, metrics and backtest report files at 'model_path' (e.g. a staging copy)."""
+        self.model_path = model_path
+        self.metrics_path = model_path.replace('.joblib', '_metrics.json')
+        self.backtest_path = model_path.replace('.joblib', '_backtest.json')
+
+    def promote_from(self, staged_path):
+        """
+        Replace the served artifacts with the ones written under 'staged_path' (each file is
+        renamed atomically, so readers never see a partial file).
+        """
+        for source, target in zip(artifact_paths(staged_path), artifact_paths(self.model_path)):
+            if os.path.exists(source):
+                os.replace(source, target)
+
     def save_model(self):
-        joblib.dump(self.model, self.model_path)
+        # Write then rename, so concurrent readers never load a partially written model
+        tmp_path = f"{self.model_path}.tmp"
+        joblib.dump(self.model, tmp_path)
+        os.replace(tmp_path, self.model_path)
     
     def load_model(self):
         if os.path.exists(self.model_path):
+            signature = self._current_artifact_signature()
             self.model = joblib.load(self.model_path)
             self.is_trained = True
+            self._artifact_signature = signature
             return True
         return False
 
+    def _current_artifact_signature(self):
+        """Modification times of the model and metrics files (None when missing)."""
+        return tuple(
+            os.path.getmtime(path) if os.path.exists(path) else None
+            for path in (self.model_path, self.metrics_path)
+        )
+
+    def reload_if_changed(self):
+        """
+        Hot-reload the model and metrics when another process (a training worker) replaced them.
+        The new model is loaded fully before being swapped in, so concurrent predictions keep
+        using the previous model until then. Returns True if anything was reloaded.
+        """
+        signature = self._current_artifact_signature()
+        if signature[0] is None or signature == self._artifact_signature:
+            return False
+        model = joblib.load(self.model_path)
+        self.model = model
+        self.is_trained = True
+        self.last_metrics = self._load_metrics()
+        self._artifact_signature = signature
+        return True
+
     def _save_metrics(self):
         import json
         if self.last_metrics:
@@ -422,5 +597,20 @@ class ForecastModel:
                 return None
         return None
 
+    def _save_backtest(self, report):
+        import json
+        with open(self.backtest_path, 'w') as f:
+            json.dump(report, f, default=str)
+
+    def load_backtest(self):
+        import json
+        if os.path.exists(self.backtest_path):
+            try:
+                with open(self.backtest_path, 'r') as f:
+                    return json.load(f)
+            except:
+                return None
+        return None
+
 # Singleton instance
 forecaster = ForecastModel()
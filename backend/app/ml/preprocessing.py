@@ -1,80 +1,267 @@
 import pandas as pd
 import numpy as np
-from typing import List, Tuple
+import os
+from typing import List, Optional, Tuple
+from .config import MLConfig
 
-def clean_data(df: pd.DataFrame) -> pd.DataFrame:
+# Bump when the pipeline output changes so cached training frames are invalidated
+PREPROCESSING_VERSION = 3
+
+# Source column -> pipeline column (Kaggle schema and our DB/upload schema)
+COLUMN_ALIASES = {
+    'unit_sales': 'y',
+    'quantity': 'y',
+    'date': 'ds',
+    'item_nbr': 'sku',
+    'store_nbr': 'store_id',
+}
+
+# Columns identifying one series; used for per-series dedup / fill when present
+SERIES_COLUMNS = ['sku', 'store_id']
+
+def history_columns(names: List[str]) -> List[str]:
+    """Source columns standardize_frame uses, for reading only those from columnar files."""
+    return [c for c in names if COLUMN_ALIASES.get(c, c) in ('ds', 'y', 'onpromotion', *SERIES_COLUMNS)]
+
+def standardize_frame(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Basic data cleaning: handling missing values, standardizing formats.
-    """
-    df = df.copy()
-    
-    # Drop duplicates
-    if df.duplicated().sum() > 0:
-        df = df.drop_duplicates()
-        
-    # Handle missing values - simple forward fill for time series nature, then 0
-    df = df.ffill().fillna(0)
-    
-    return df
+    Select, rename and cast the columns the pipeline needs in a single pass.
+    This is the only materialization of the input; later stages work on this frame.
+    Dtypes: ds datetime (day precision), y int32 (float64 if fractional/missing),
+    onpromotion float32 until aggregation (int8 after), series keys categorical.
+    """
+    columns = {}
+    for col in df.columns:
+        target = COLUMN_ALIASES.get(col, col)
+        if target in ('ds', 'y', 'onpromotion', *SERIES_COLUMNS) and target not in columns:
+            columns[target] = df[col]
+
+    out = {}
+    if 'ds' in columns:
+        out['ds'] = pd.to_datetime(columns['ds']).dt.normalize()
+    if 'y' in columns:
+        y = pd.to_numeric(columns['y'], errors='coerce')
+        # Unit counts stay compact as int32; anything fractional or missing keeps float precision
+        if y.notna().all() and (y % 1 == 0).all() and y.abs().max() < 2**31:
+            y = y.astype('int32')
+        else:
+            y = y.astype('float64')
+        out['y'] = y
+    if 'onpromotion' in columns:
+        promo = columns['onpromotion']
+        if not (pd.api.types.is_numeric_dtype(promo) or pd.api.types.is_bool_dtype(promo)):
+            promo = promo.astype(str).str.lower().isin(['1', 'true', 'yes', '1.0'])
+        out['onpromotion'] = pd.to_numeric(promo, errors='coerce').astype('float32')
+    for key in SERIES_COLUMNS:
+        if key in columns:
+            out[key] = columns[key].astype(str).astype('category')
+
+    return pd.DataFrame(out)
 
 def rename_columns(df: pd.DataFrame) -> pd.DataFrame:
     """
     Standardize column names for Prophet (ds, y) and auxiliary columns.
     """
-    df = df.copy()
-    
-    # Handle Kaggle Schema (date, unit_sales) -> (ds, y)
-    if 'unit_sales' in df.columns:
-        df = df.rename(columns={'unit_sales': 'quantity'})
-        
-    if 'date' in df.columns:
-        df = df.rename(columns={'date': 'ds'})
-        
-    if 'quantity' in df.columns:
-        df = df.rename(columns={'quantity': 'y'})
-        
+    renames = {col: COLUMN_ALIASES[col] for col in df.columns if col in COLUMN_ALIASES}
+    return df.rename(columns=renames)
+
+def clean_data(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Basic data cleaning on a standardized frame: drop duplicate records, fill missing values.
+    Missing values are forward filled within each series only (never across SKUs/stores), then 0.
+    """
+    series_cols = [c for c in SERIES_COLUMNS if c in df.columns]
+
+    # Drop exact duplicate records (single duplicated() pass)
+    duplicated = df.duplicated()
+    if duplicated.any():
+        df = df[~duplicated]
+
+    fill_cols = [c for c in ['y', 'onpromotion'] if c in df.columns]
+    if fill_cols and df[fill_cols].isna().any().any():
+        if 'ds' in df.columns:
+            df = df.sort_values(series_cols + ['ds'])
+        if series_cols:
+            df[fill_cols] = df.groupby(series_cols, observed=True)[fill_cols].ffill()
+        else:
+            df[fill_cols] = df[fill_cols].ffill()
+        df[fill_cols] = df[fill_cols].fillna(0)
+
     return df
 
 def remove_outliers(df: pd.DataFrame, column: str = 'y', lower_quantile: float = 0.01, upper_quantile: float = 0.99) -> pd.DataFrame:
     """
-    Cap outliers based on quantiles.
+    Cap outliers based on quantiles of the whole column. Used for frames that are
+    already a single series (e.g. the daily total); see cap_outliers_by_series otherwise.
     """
     if column not in df.columns:
         return df
-        
+
     lower_limit = df[column].quantile(lower_quantile)
     upper_limit = df[column].quantile(upper_quantile)
-    
+
     df[column] = np.clip(df[column], lower_limit, upper_limit)
     return df
 
+# ---------------------------------------------------------------- Per-series outliers
+
+OUTLIER_METHODS = ['quantile', 'mad']
+
+def compute_outlier_thresholds(df: pd.DataFrame, column: str = 'y', series_cols: Optional[List[str]] = None,
+                               method: str = 'quantile', lower_quantile: float = 0.01,
+                               upper_quantile: float = 0.99, z: float = 3.5) -> pd.DataFrame:
+    """
+    Lower/upper capping thresholds per series in one grouped pass.
+    quantile: [lower_quantile, upper_quantile] quantiles of the series.
+    mad:      robust z-score fences, median -/+ z * 1.4826 * MAD (floored at 0 for unit sales).
+    Returns one row per series with columns series_cols + ['lower', 'upper', 'observations'].
+    """
+    if method not in OUTLIER_METHODS:
+        raise ValueError(f"Unknown outlier method '{method}'. Use one of {OUTLIER_METHODS}.")
+    series_cols = series_cols if series_cols is not None else [c for c in SERIES_COLUMNS if c in df.columns]
+    grouped = df.groupby(series_cols, observed=True, sort=False)[column]
+
+    if method == 'quantile':
+        bounds = grouped.quantile([lower_quantile, upper_quantile]).unstack()
+        bounds.columns = ['lower', 'upper']
+    else:
+        median = grouped.median()
+        deviation = (df[column] - grouped.transform('median')).abs()
+        mad = deviation.groupby([df[c] for c in series_cols], observed=True, sort=False).median()
+        spread = z * 1.4826 * mad
+        bounds = pd.DataFrame({'lower': (median - spread).clip(lower=0), 'upper': median + spread})
+
+    bounds['observations'] = grouped.size()
+    return bounds.reset_index()
+
+def cap_outliers_by_series(df: pd.DataFrame, thresholds: pd.DataFrame, column: str = 'y') -> pd.DataFrame:
+    """
+    Clip 'column' to each row's series thresholds (as returned by compute_outlier_thresholds).
+    Thresholds are aligned to rows with a single index lookup; series without thresholds are left as is.
+    """
+    series_cols = [c for c in thresholds.columns if c not in ('lower', 'upper', 'observations')]
+    index = pd.MultiIndex.from_frame(thresholds[series_cols].astype(str))
+    rows = pd.MultiIndex.from_frame(df[series_cols].astype(str))
+    positions = index.get_indexer(rows)
+    matched = positions >= 0
+
+    lower = np.full(len(df), -np.inf)
+    upper = np.full(len(df), np.inf)
+    lower[matched] = thresholds['lower'].to_numpy(dtype=float)[positions[matched]]
+    upper[matched] = thresholds['upper'].to_numpy(dtype=float)[positions[matched]]
+
+    df[column] = np.clip(df[column].to_numpy(dtype=float), lower, upper)
+    return df
+
+def daily_series_totals(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per (series, day): y summed, onpromotion max. Outlier thresholds are defined
+    on these daily series totals, which is also what per-SKU inference sees.
+    """
+    series_cols = [c for c in SERIES_COLUMNS if c in df.columns]
+    agg_dict = {'y': 'sum'}
+    if 'onpromotion' in df.columns:
+        agg_dict['onpromotion'] = 'max'
+    return df.groupby(series_cols + ['ds'], observed=True, sort=False).agg(agg_dict).reset_index()
+
 def feature_engineering(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Create features and standardize for Prophet.
+    Aggregate to one row per day for Prophet: y is summed, onpromotion is the max
+    (if any item is on promotion, the day is flagged).
     """
-    df = rename_columns(df)
-    
     if 'ds' not in df.columns or 'y' not in df.columns:
         return df # Return as is if critical columns are missing, let validation handle it
-        
-    df['ds'] = pd.to_datetime(df['ds'])
-    
-    # Aggregate by date if multiple entries exist
-    # Sum 'y', mean/mode for others if needed. For now simple sum for y.
+
     agg_dict = {'y': 'sum'}
     if 'onpromotion' in df.columns:
-        agg_dict['onpromotion'] = 'max' # If any item is on promotion, the day is flagged (or sum, depending on logic. Max is safer for binary)
-        
-    df = df.groupby('ds').agg(agg_dict).reset_index()
-    
+        agg_dict['onpromotion'] = 'max'
+
+    df = df.groupby('ds', sort=True).agg(agg_dict).reset_index()
+    df['y'] = df['y'].astype('float64')
+    if 'onpromotion' in df.columns:
+        df['onpromotion'] = df['onpromotion'].astype('int8')
     return df
 
-def prepare_for_training(df: pd.DataFrame) -> pd.DataFrame:
+def prepare_for_training(df: pd.DataFrame, cap_outliers: bool = True) -> pd.DataFrame:
     """
     Full pipeline for training preparation.
+    When the input carries series columns (sku, store_id) outliers are capped per series
+    on daily series totals before aggregating; otherwise the daily total is capped globally.
+    cap_outliers=False skips capping (e.g. when it was already applied in SQL).
     """
+    df = standardize_frame(df)
     df = clean_data(df)
+    per_series = cap_outliers and any(c in df.columns for c in SERIES_COLUMNS)
+    if per_series:
+        df = daily_series_totals(df)
+        df = cap_outliers_by_series(df, compute_outlier_thresholds(df))
     df = feature_engineering(df)
-    df = remove_outliers(df)
+    if cap_outliers and not per_series:
+        df = remove_outliers(df)
     return df
- 
+
+# ---------------------------------------------------------------- Prepared frame cache
+
+def training_frame_cache_key(high_water_mark: Tuple) -> str:
+    """
+    Cache key from the source data's high-water mark, the outlier settings applied in SQL and
+    the pipeline version. In-place edits of sales rows do not move the high-water mark; every
+    path that updates or deletes SalesData calls invalidate_training_frame_cache instead.
+    """
+    outliers = (MLConfig.OUTLIER_METHOD, MLConfig.OUTLIER_LOWER_QUANTILE,
+                MLConfig.OUTLIER_UPPER_QUANTILE, MLConfig.OUTLIER_MAD_Z)
+    return f"v{PREPROCESSING_VERSION}:" + ":".join(str(part) for part in (*high_water_mark, *outliers))
+
+def load_cached_training_frame(cache_key: str, cache_path: str = MLConfig.TRAINING_FRAME_CACHE) -> Optional[pd.DataFrame]:
+    """
+    Return the cached frame if it was built from the same source data (same cache_key), else None.
+    Also used for other derived frames (e.g. the holidays frame) with their own cache_path.
+    """
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        import pyarrow.parquet as pq
+        table = pq.read_table(cache_path)
+        metadata = table.schema.metadata or {}
+        if metadata.get(b'idfs_cache_key', b'').decode() != cache_key:
+            return None
+        df = table.to_pandas()
+        df['ds'] = pd.to_datetime(df['ds'])
+        return df
+    except Exception as e:
+        print(f"(!) Could not read cached training frame: {e}")
+        return None
+
+def save_cached_training_frame(df: pd.DataFrame, cache_key: str, cache_path: str = MLConfig.TRAINING_FRAME_CACHE):
+    """
+    Persist a frame as Parquet (ds stored as date32) tagged with its cache key.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        print("(!) pyarrow not installed. Skipping training frame cache.")
+        return
+
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.set_column(
+            table.schema.get_field_index('ds'), 'ds', table.column('ds').cast(pa.date32())
+        )
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            b'idfs_cache_key': cache_key.encode(),
+        })
+        pq.write_table(table, cache_path)
+    except Exception as e:
+        print(f"(!) Could not write training frame cache: {e}")
+
+def invalidate_training_frame_cache(cache_path: str = MLConfig.TRAINING_FRAME_CACHE):
+    """
+    Drop the cached frame. Needed after in-place edits of sales rows, which do not move the
+    high-water mark the cache key is built from.
+    """
+    try:
+        os.remove(cache_path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,119 @@
+import os
+import re
+import sys
+import time
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+# ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+_MAXRSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+def current_rss_mb() -> Optional[float]:
+    """Resident set size of this process in MB (None if it cannot be determined)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / 2**20, 1)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().rss / 2**20, 1)
+    except ImportError:
+        return None
+
+def peak_rss_mb(children: bool = False) -> Optional[float]:
+    """Peak RSS of this process (or of its waited-for children, e.g. Stan) in MB."""
+    if resource is None:
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    return round(resource.getrusage(who).ru_maxrss * _MAXRSS_UNIT / 2**20, 1)
+
+_ITER_LINE = re.compile(r"^\s*(\d+)\s+[-+0-9.eE]+\s+[-+0-9.eE]+\s+[-+0-9.eE]+\s+[-+0-9.eE]+\s+[-+0-9.eE]+\s+(\d+)")
+
+def stan_fit_stats(prophet_model) -> Optional[Dict]:
+    """
+    Iteration/evaluation counts and convergence of the last Stan optimization of a fitted
+    Prophet model, read from CmdStan's console output. None when unavailable (other backends).
+    """
+    try:
+        fit = prophet_model.stan_backend.stan_fit
+        with open(fit.runset.stdout_files[0]) as f:
+            lines = f.read().splitlines()
+    except Exception:
+        return None
+
+    stats = {"algorithm": None, "iterations": None, "evaluations": None, "converged": False, "message": None}
+    for i, line in enumerate(lines):
+        if line.strip().startswith("algorithm ="):
+            stats["algorithm"] = line.split("=", 1)[1].split("(")[0].strip()
+        match = _ITER_LINE.match(line)
+        if match:
+            stats["iterations"], stats["evaluations"] = int(match.group(1)), int(match.group(2))
+        if line.startswith("Optimization terminated"):
+            stats["converged"] = "normally" in line
+            stats["message"] = lines[i + 1].strip() if i + 1 < len(lines) else line
+    return stats
+
+def library_versions() -> Dict[str, Optional[str]]:
+    versions = {"python": sys.version.split()[0]}
+    for name in ("prophet", "cmdstanpy", "pandas", "numpy"):
+        try:
+            versions[name] = __import__(name).__version__
+        except Exception:
+            versions[name] = None
+    return versions
+
+class TrainingProfiler:
+    """
+    Per-stage wall time, CPU time and memory of a training run. Stages are delimited by
+    the progress(stage, fraction) calls of train_model: call enter(stage) from the callback.
+    """
+    def __init__(self):
+        self.stages: List[Dict] = []
+        self._current: Optional[Dict] = None
+        self._started = time.perf_counter()
+
+    def enter(self, stage: str):
+        self._close_stage()
+        self._current = {
+            "stage": stage,
+            "_wall": time.perf_counter(),
+            "_cpu": time.process_time(),
+            "rss_start_mb": current_rss_mb()
+        }
+
+    def _close_stage(self):
+        if self._current is None:
+            return
+        stage = self._current
+        rss_end = current_rss_mb()
+        self.stages.append({
+            "stage": stage["stage"],
+            "seconds": round(time.perf_counter() - stage["_wall"], 3),
+            "cpu_seconds": round(time.process_time() - stage["_cpu"], 3),
+            "rss_start_mb": stage["rss_start_mb"],
+            "rss_end_mb": rss_end,
+            "rss_delta_mb": round(rss_end - stage["rss_start_mb"], 1) if rss_end is not None and stage["rss_start_mb"] is not None else None,
+            "peak_rss_mb": peak_rss_mb()
+        })
+        self._current = None
+
+    def report(self, stan: Optional[Dict] = None) -> Dict:
+        """Close the running stage and return the profile (JSON serializable)."""
+        from app.ml.preprocessing import PREPROCESSING_VERSION
+
+        self._close_stage()
+        return {
+            "total_seconds": round(time.perf_counter() - self._started, 3),
+            "peak_rss_mb": peak_rss_mb(),
+            "children_peak_rss_mb": peak_rss_mb(children=True), # largest finished subprocess (Stan, CV workers)
+            "stages": self.stages,
+            "stan": stan,
+            "preprocessing_version": PREPROCESSING_VERSION,
+            "versions": library_versions()
+        }
@@ -0,0 +1,159 @@
+import pandas as pd
+import numpy as np
+import threading
+import time
+from scipy import sparse
+from scipy.sparse.linalg import splu
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+from .local_models import forecast_series_batch
+
+# Aggregation levels above the bottom (SKU x Store) series, top to bottom.
+# Stores nest in regions; categories cut across stores (grouped, not strictly nested, hierarchy).
+AGGREGATE_LEVELS = ["total", "region", "category", "store"]
+LEVELS = AGGREGATE_LEVELS + ["sku_store"]
+METHODS = ["bottom_up", "ols", "wls_struct"]
+
+class Hierarchy:
+    """
+    Sparse summing structure for the SKU x Store series.
+
+    'aggregation' (m x n) maps the n bottom series onto the m aggregate nodes
+    (total, regions, categories, stores); the full summing matrix is S = [aggregation; I].
+    Everything stays sparse, so tens of thousands of bottom series are cheap.
+    """
+    def __init__(self, series: pd.DataFrame):
+        """series: one row per bottom series with columns sku, store_id, category, region."""
+        self.series = series.reset_index(drop=True)
+        n = len(self.series)
+        columns = np.arange(n)
+
+        level_keys = {
+            "total": pd.Series(["total"] * n),
+            "region": self.series["region"].fillna("Unknown").astype(str),
+            "category": self.series["category"].fillna("Unknown").astype(str),
+            "store": self.series["store_id"].astype(str),
+        }
+
+        blocks, self.node_levels, self.node_keys = [], [], []
+        for level in AGGREGATE_LEVELS:
+            codes, uniques = pd.factorize(level_keys[level], sort=True)
+            blocks.append(sparse.csr_matrix(
+                (np.ones(n), (codes, columns)), shape=(len(uniques), n)
+            ))
+            self.node_levels += [level] * len(uniques)
+            self.node_keys += list(uniques)
+
+        self.aggregation = sparse.vstack(blocks).tocsr()
+        # (sku, store_id) tuples: SKU and store codes may contain any separator
+        self.bottom_keys = list(zip(self.series["sku"].astype(str), self.series["store_id"].astype(str)))
+        self.node_levels += ["sku_store"] * n
+        self.node_keys += self.bottom_keys
+
+    @property
+    def summing_matrix(self) -> sparse.csr_matrix:
+        return sparse.vstack([self.aggregation, sparse.identity(self.aggregation.shape[1], format="csr")]).tocsr()
+
+def reconcile(hierarchy: Hierarchy, base: np.ndarray, method: str = "wls_struct") -> np.ndarray:
+    """
+    Reconcile base forecasts for every node (rows ordered aggregates first, then bottom; columns = horizon)
+    so that every aggregate equals the sum of its bottom series.
+
+    bottom_up:  y~ = S b
+    ols / wls_struct (MinT with identity / structural diagonal W), in zero-constraint form:
+        C = [I_m, -A],   y~ = y - W C' (C W C')^-1 C y
+    C W C' is only m x m (number of aggregate nodes), so the solve does not grow with the bottom level.
+    """
+    A = hierarchy.aggregation
+    m, n = A.shape
+
+    if method == "bottom_up":
+        return hierarchy.summing_matrix @ base[m:]
+
+    if method == "ols":
+        w = np.ones(m + n)
+    elif method == "wls_struct":
+        # Structural scaling: variance proportional to the number of bottom series under each node
+        w = np.concatenate([np.asarray(A.sum(axis=1)).ravel(), np.ones(n)])
+    else:
+        raise ValueError(f"Unknown reconciliation method '{method}'. Use one of {METHODS}.")
+
+    C = sparse.hstack([sparse.identity(m, format="csr"), -A]).tocsr()
+    W = sparse.diags(w)
+    CWCt = (C @ W @ C.T).tocsc()
+    discrepancy = C @ base # how far each aggregate is from the sum of its children
+    correction = W @ (C.T @ splu(CWCt).solve(np.asarray(discrepancy)))
+    return base - correction
+
+def build_base_forecasts(series: pd.DataFrame, history: np.ndarray, days: int,
+                         total_forecast: Optional[np.ndarray] = None):
+    """
+    Base forecasts for every node.
+    Bottom series are forecast together by the vectorized Holt-Winters batch (smoothing
+    constants picked per series from a small grid by in-sample error, one pass over the
+    dense history per candidate, however many series); the total uses the global Prophet forecast
+    when given. Intermediate levels carry no independent model, so their base is the sum of
+    the bottom bases and reconciliation only has to distribute the total's disagreement.
+
+    series: one row per bottom series (sku, store_id, category, region);
+    history: matching (series x day) daily quantities ending at the last sales day.
+    Returns (hierarchy, base matrix).
+    """
+    bottom, _ = forecast_series_batch(history, days, tune=True)
+    hierarchy = Hierarchy(series)
+    aggregates = hierarchy.aggregation @ bottom
+    if total_forecast is not None:
+        aggregates[0] = total_forecast
+
+    return hierarchy, np.vstack([aggregates, bottom])
+
+class ReconciliationCache:
+    """
+    Reconciled results per (horizon, method, last sales day), kept for 'ttl' seconds so that
+    browsing levels and nodes does not reload and reforecast every series. Concurrent
+    requests for an expired entry wait for a single computation.
+    """
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() < entry[0]:
+            return entry[1]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() >= entry[0]:
+                now = time.monotonic()
+                self._entries = {k: e for k, e in self._entries.items() if now < e[0]}
+                entry = (now + self.ttl, compute())
+                self._entries[key] = entry
+            return entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+def reconciled_forecasts(hierarchy: Hierarchy, reconciled: np.ndarray, level: str, key: Optional[Hashable] = None) -> List[Dict]:
+    """
+    Rows of the reconciled matrix for one level (optionally one node), as JSON-friendly records.
+    Bottom series are keyed by (sku, store_id) and reported with both fields.
+    """
+    rows = [
+        i for i, (node_level, node_key) in enumerate(zip(hierarchy.node_levels, hierarchy.node_keys))
+        if node_level == level and (key is None or node_key == key)
+    ]
+    records = []
+    for i in rows:
+        node_key = hierarchy.node_keys[i]
+        record = {"sku": node_key[0], "store_id": node_key[1]} if level == "sku_store" else {"key": node_key}
+        record["forecast_values"] = [round(float(v), 2) for v in reconciled[i]]
+        records.append(record)
+    return records
+
+def _create_cache() -> ReconciliationCache:
+    from app.core.config import settings
+    return ReconciliationCache(ttl=settings.RECONCILIATION_CACHE_TTL_SECONDS)
+
+# Singleton instance
+reconciliation_cache = _create_cache()
@@ -1,64 +1,158 @@
 import pandas as pd
+from typing import Callable, Optional
 from app.db.session import SessionLocal
-from app.crud import crud_holiday
+from app.crud import crud_holiday, crud_sales
 from sqlalchemy.orm import Session
-from app.ml.model import forecaster
+from app.ml.model import ForecastModel, forecaster
+from app.ml.config import MLConfig
 
-def train_model(csv_path: str = "data/train.csv", auto_tune: bool = False):
+ProgressCallback = Callable[[str, float], None]
+
+class TrainingCancelled(Exception):
+    """Raised from a progress callback to stop a training run at the next stage boundary."""
+
+def _noop(stage: str, progress: float):
+    pass
+
+def record_outlier_thresholds(db: Session, method: str = MLConfig.OUTLIER_METHOD) -> int:
+    """
+    Compute per-series capping thresholds on daily (sku, store) totals and store them in
+    OutlierThreshold, replacing the previous set. Quantiles are computed with percentile_cont
+    on PostgreSQL; otherwise in one grouped pandas pass over the per-series daily totals.
+    Returns the number of series recorded.
+    """
+    from app.ml.preprocessing import compute_outlier_thresholds
+
+    if method == "quantile" and db.bind.dialect.name == "postgresql":
+        rows = crud_sales.get_series_quantile_thresholds(
+            db, MLConfig.OUTLIER_LOWER_QUANTILE, MLConfig.OUTLIER_UPPER_QUANTILE
+        )
+        thresholds = pd.DataFrame.from_records(rows, columns=["sku_id", "store_id", "lower", "upper", "observations"])
+    else:
+        daily = pd.DataFrame(crud_sales.get_daily_series_quantities(db))
+        if daily.empty:
+            return crud_sales.replace_outlier_thresholds(db, [])
+        thresholds = compute_outlier_thresholds(
+            daily, column="quantity", series_cols=["sku_id", "store_id"], method=method,
+            lower_quantile=MLConfig.OUTLIER_LOWER_QUANTILE,
+            upper_quantile=MLConfig.OUTLIER_UPPER_QUANTILE,
+            z=MLConfig.OUTLIER_MAD_Z
+        )
+
+    thresholds["method"] = method
+    records = thresholds.astype({"sku_id": int, "store_id": int, "lower": float, "upper": float, "observations": int})
+    return crud_sales.replace_outlier_thresholds(db, records.to_dict("records"))
+
+def load_holidays_frame(db: Session, cache_path: str = MLConfig.HOLIDAYS_FRAME_CACHE) -> Optional[pd.DataFrame]:
+    """
+    Prophet holidays frame (ds, holiday, lower_window, upper_window) built from the holiday table.
+    Cached as Parquet keyed by the table's (count, max id), so it is only rebuilt when holidays change.
+    Returns None when there are no holidays.
+    """
+    from app.ml.preprocessing import load_cached_training_frame, save_cached_training_frame
+
+    signature = crud_holiday.get_holidays_signature(db)
+    if signature[0] == 0:
+        return None
+
+    cache_key = "holidays:" + ":".join(str(part) for part in signature)
+    holidays_df = load_cached_training_frame(cache_key, cache_path=cache_path)
+    if holidays_df is None:
+        rows = crud_holiday.get_holiday_dates_descriptions(db)
+        holidays_df = pd.DataFrame.from_records(rows, columns=["ds", "holiday"])
+        holidays_df["ds"] = pd.to_datetime(holidays_df["ds"])
+        holidays_df["lower_window"] = 0
+        holidays_df["upper_window"] = 1
+        save_cached_training_frame(holidays_df, cache_key, cache_path=cache_path)
+    return holidays_df
+
+def train_model(csv_path: str = "data/train.csv", auto_tune: bool = False,
+                progress: ProgressCallback = _noop, model: Optional[ForecastModel] = None,
+                incremental: bool = False):
     """
-    Train the machine learning model using the singleton forecaster.
+    Train the machine learning model (the singleton forecaster unless 'model' is given).
+    incremental: warm-start from the saved model instead of fitting from scratch.
+    progress(stage, fraction) is called at each stage boundary; it may raise TrainingCancelled.
     Returns the evaluation metrics.
     """
+    model = model or forecaster
     print("(rocket) Starting Model Training Pipeline...")
     
     db = SessionLocal()
     
     # 1. Fetch Holidays from DB
+    progress("Loading holidays", 0.02)
     holidays_df_final = None
     try:
-        from app.crud import crud_holiday
-        holidays_list = crud_holiday.get_all_holidays(db)
-        if holidays_list:
-            data = []
-            for h in holidays_list:
-                data.append({
-                    "ds": h.date,
-                    "holiday": h.description,
-                    "lower_window": 0,
-                    "upper_window": 1, 
-                })
-            holidays_df_final = pd.DataFrame(data)
+        holidays_df_final = load_holidays_frame(db)
+        if holidays_df_final is not None:
             print(f"(party) Loaded {len(holidays_df_final)} holidays from Database.")
     except Exception as e:
         print(f"(!) Failed to load holidays from DB: {e}")
 
-    # 2. Fetch Sales Data from DB
+    # 2. Fetch Sales Data from DB (skipped when the prepared frame cache matches the data high-water mark)
     df_train = None
+    train_df = None
+    cache_key = None
+    high_water_mark = (0, 0, None)
+    progress("Fetching sales data", 0.10)
     try:
-        print("(chart) Fetching Sales Data from Database...")
-        from app.models.sales import SalesData
-        sales_query = db.query(SalesData.date, SalesData.quantity, SalesData.onpromotion).all()
-        
-        if sales_query:
-            # Convert to DataFrame
-            data = [{"ds": s.date, "y": s.quantity, "onpromotion": 1 if s.onpromotion else 0} for s in sales_query]
-            df_train = pd.DataFrame(data)
-            print(f"(tick) Loaded {len(df_train)} sales records from Database.")
-        else:
-            print("(!) No sales data in DB. Falling back to CSV/Synthetic.")
+        from app.ml.preprocessing import training_frame_cache_key, load_cached_training_frame
+        high_water_mark = crud_sales.get_sales_high_water_mark(db)
+        if high_water_mark[0] > 0:
+            cache_key = training_frame_cache_key(high_water_mark)
+            train_df = load_cached_training_frame(cache_key)
+            if train_df is not None:
+                print(f"(tick) Sales data unchanged. Reusing cached training frame ({len(train_df)} days).")
     except Exception as e:
-        print(f"(x) Error fetching sales data: {e}")
-    finally:
+        print(f"(!) Could not check training frame cache: {e}")
+
+    if train_df is None:
+        try:
+            # Per-series outlier thresholds are recorded first, then applied inside the SQL daily aggregation
+            series = record_outlier_thresholds(db)
+            print(f"(tick) Recorded outlier thresholds for {series} series.")
+
+            print("(chart) Fetching daily Sales totals from Database...")
+            # Daily aggregation (SUM quantity, MAX promotion) runs in SQL, so only one row per day is loaded
+            daily_totals = crud_sales.get_daily_training_totals(db, capped=True)
+
+            if daily_totals:
+                df_train = pd.DataFrame.from_records(daily_totals, columns=["ds", "y", "onpromotion"])
+                print(f"(tick) Loaded {len(df_train)} daily totals from Database.")
+            else:
+                print("(!) No sales data in DB. Falling back to CSV/Synthetic.")
+        except Exception as e:
+            print(f"(x) Error fetching sales data: {e}")
+        finally:
+            db.close()
+
+        if df_train is not None:
+            progress("Preprocessing", 0.25)
+            from app.ml.preprocessing import prepare_for_training, save_cached_training_frame
+            # Outliers were already capped per series in SQL
+            train_df = prepare_for_training(df_train, cap_outliers=False)
+            if cache_key:
+                save_cached_training_frame(train_df, cache_key)
+    else:
         db.close()
 
-    # Train (pass df_train if available, else None and let forecaster use CSV)
-    forecaster.train(df=df_train, csv_path=csv_path, auto_tune=auto_tune, holidays_df=holidays_df_final)
-    
+    # The sales data the fit uses, read before the rows were loaded (None for CSV/synthetic data)
+    model.data_high_water_mark = None
+    if train_df is not None and high_water_mark[0] > 0:
+        rows, max_id, max_date = high_water_mark
+        model.data_high_water_mark = {"rows": rows, "max_id": max_id, "max_date": max_date}
+
+    # Train (pass the prepared frame if available, else None and let forecaster use CSV)
+    model.train(csv_path=csv_path, auto_tune=auto_tune, holidays_df=holidays_df_final, train_df=train_df,
+                warm_start=incremental, progress=progress)
+
     # Evaluate if trained successfully
     metrics = None
-    if forecaster.is_trained:
+    if model.is_trained:
+        progress("Cross-validation", 0.80)
         print("(chart) Evaluating model performance...")
-        metrics = forecaster.evaluate()
+        metrics = model.evaluate()
         
     return metrics
 
@@ -1,5 +1,11 @@
-from .sales import Product, Store, SalesData, Holiday
+from .sales import Product, Store, SalesData, Holiday, DailySalesRollup
 from .user import User, UserRole
-from .forecast import Forecast
-from .supply_chain import Supplier, PurchaseOrder, Shipment
-from .inventory import StoreInventory
+from .forecast import Forecast, OutlierThreshold
+from .supply_chain import Supplier, PurchaseOrder, PurchaseOrderLine, Shipment
+from .inventory import StoreInventory, StockAlertCounter, StockStatus
+from .training import TrainingJob, TrainingJobStatus
+from .ingestion import IngestionJob, IngestionJobStatus
+from .dashboard import DashboardEvent, DashboardEventKind
+from .alert import Alert, AlertStatus, AlertSeverity
+from .replenishment import ReplenishmentPlan
+from .data_quality import DataQualityJob, DataQualityJobStatus
@@ -0,0 +1,37 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, ForeignKey, Index
+import enum
+from app.db.base_class import Base
+
+class AlertStatus(str, enum.Enum):
+    OPEN = "Open"
+    RESOLVED = "Resolved"
+
+class AlertSeverity(str, enum.Enum):
+    HIGH = "high"
+    MEDIUM = "medium"
+    LOW = "low"
+
+class Alert(Base):
+    """
+    Result of an alert rule (app/core/alert_rules.py), written by the batch evaluation. One row
+    per rule and subject (dedup_key): re-detections update it, and it is resolved when a batch
+    no longer finds the condition, so reading alerts never recomputes them.
+    """
+    __table_args__ = (Index("ix_alert_status_severity", "status", "severity"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    dedup_key = Column(String, unique=True, nullable=False) # rule:subject
+    rule = Column(String, index=True, nullable=False)
+    severity = Column(String, nullable=False, default=AlertSeverity.MEDIUM)
+    status = Column(String, nullable=False, default=AlertStatus.OPEN)
+    message = Column(Text, nullable=False)
+    details = Column(JSON)
+
+    sku_id = Column(Integer, ForeignKey("product.id"))
+    store_id = Column(Integer, ForeignKey("store.id"))
+    shipment_id = Column(Integer, ForeignKey("shipment.id"))
+
+    occurrences = Column(Integer, nullable=False, default=1) # batches that detected it since it opened
+    first_seen_at = Column(DateTime, nullable=False)
+    last_seen_at = Column(DateTime, nullable=False)
+    resolved_at = Column(DateTime)
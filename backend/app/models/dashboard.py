@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON
+import enum
+from app.db.base_class import Base
+
+class DashboardEventKind(str, enum.Enum):
+    SALES = "sales" # today's quantity/revenue/records increments
+    STOCK = "stock" # current low/out-of-stock counts
+    NOTIFICATION = "notification"
+
+class DashboardEvent(Base):
+    """
+    Outbox of dashboard updates. Writers add a row in the same transaction as the change it
+    describes, so a published delta always corresponds to committed data; the API process
+    polls this table once and fans new rows out to every /dashboard/stream subscriber.
+    """
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime, index=True, nullable=False)
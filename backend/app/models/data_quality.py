@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, JSON, func
+import enum
+from app.db.base_class import Base
+
+class DataQualityJobStatus(str, enum.Enum):
+    RUNNING = "Running"
+    COMPLETED = "Completed"
+    FAILED = "Failed"
+
+class DataQualityJob(Base):
+    """
+    One background data-quality scan of SalesData. At most one job is Running at a time;
+    the claim is made under an advisory lock (app/crud/crud_data_quality.py).
+    """
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(String, index=True, nullable=False, default=DataQualityJobStatus.RUNNING)
+    fix = Column(Boolean, default=False)
+    batch_size = Column(Integer)
+    requested_by = Column(String)
+
+    stage = Column(String)
+    progress = Column(Float, default=0.0) # percent
+    report = Column(JSON)
+    error = Column(Text)
+
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime) # last progress report; a running job silent for too long is failed
+    finished_at = Column(DateTime)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, Date, DateTime, String, func
+from sqlalchemy import Column, Integer, Float, Date, DateTime, String, ForeignKey, UniqueConstraint, func
 from app.db.base_class import Base
 
 class Forecast(Base):
@@ -9,3 +9,19 @@ class Forecast(Base):
     upper_bound = Column(Float)
     model_version = Column(String, default="1.0")
     created_at = Column(DateTime, server_default=func.now())
+
+class OutlierThreshold(Base):
+    """
+    Capping thresholds for one (sku, store) series' daily totals, recorded when the
+    training data is prepared so inference and monitoring can reuse them.
+    """
+    __table_args__ = (UniqueConstraint("sku_id", "store_id", name="uq_outlierthreshold_series"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    sku_id = Column(Integer, ForeignKey("product.id"), nullable=False)
+    store_id = Column(Integer, ForeignKey("store.id"), nullable=False)
+    lower = Column(Float, nullable=False)
+    upper = Column(Float, nullable=False)
+    method = Column(String, nullable=False)
+    observations = Column(Integer)
+    computed_at = Column(DateTime, server_default=func.now())
@@ -0,0 +1,36 @@
+from sqlalchemy import Column, Integer, String, BigInteger, DateTime, Text, JSON, func
+import enum
+from app.db.base_class import Base
+
+class IngestionJobStatus(str, enum.Enum):
+    RUNNING = "Running"
+    COMPLETED = "Completed"
+    FAILED = "Failed"
+
+class IngestionJob(Base):
+    """
+    One sales file ingestion, identified by the SHA-256 of the file content. The chunk
+    checkpoint and counters are committed together with each chunk's rows, so an
+    interrupted job resumes exactly after its last committed chunk.
+    """
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String(64), index=True, nullable=False)
+    filename = Column(String)
+    size_bytes = Column(BigInteger)
+    sheets = Column(String) # comma-separated selection, part of the job identity
+    chunk_size = Column(Integer, nullable=False) # resume must re-chunk the file identically
+    status = Column(String, index=True, nullable=False, default=IngestionJobStatus.RUNNING)
+    requested_by = Column(String)
+
+    chunks_committed = Column(Integer, default=0)
+    rows_read = Column(BigInteger, default=0)
+    added_rows = Column(BigInteger, default=0)
+    skipped_rows = Column(BigInteger, default=0)
+    rejected_rows = Column(BigInteger, default=0)
+    error_report = Column(JSON) # ErrorReport entries (app/ingestion/validation.py)
+    error = Column(Text)
+    attempts = Column(Integer, default=1)
+
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime)
+    finished_at = Column(DateTime)
@@ -1,16 +1,30 @@
-from sqlalchemy import Column, Integer, ForeignKey, Date
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, ForeignKey, Date
+from sqlalchemy.orm import relationship, column_property
+import enum
 from app.db.base_class import Base
 
+class StockStatus(str, enum.Enum):
+    LOW_STOCK = "low_stock" # 0 < quantity_on_hand < low_stock_threshold
+    OUT_OF_STOCK = "out_of_stock" # quantity_on_hand == 0
+
 class StoreInventory(Base):
     __tablename__ = "storeinventory"
     id = Column(Integer, primary_key=True, index=True)
     product_id = Column(Integer, ForeignKey("product.id"), nullable=False)
     store_id = Column(Integer, ForeignKey("store.id"), nullable=False)
     
-    quantity_on_hand = Column(Integer, default=0)
-    low_stock_threshold = Column(Integer, default=10)
+    # active_history: the stock alert counters need the old value even if it was not loaded
+    quantity_on_hand = column_property(Column(Integer, default=0), active_history=True)
+    low_stock_threshold = column_property(Column(Integer, default=10), active_history=True)
     last_restocked = Column(Date)
     
     product = relationship("Product", back_populates="inventory")
     store = relationship("Store", back_populates="inventory")
+
+class StockAlertCounter(Base):
+    """
+    Number of StoreInventory rows per StockStatus, kept current in the same transaction as
+    every stock change (see crud_inventory), so alert counts are a primary-key read.
+    """
+    status = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
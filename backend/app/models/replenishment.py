@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, Float, Date, DateTime, ForeignKey
+from app.db.base_class import Base
+
+class ReplenishmentPlan(Base):
+    """
+    Reorder point, safety stock and suggested order quantity of one StoreInventory row, as
+    computed by the last replenishment run (all rows are replaced on every run).
+    """
+    id = Column(Integer, primary_key=True, index=True)
+    inventory_id = Column(Integer, ForeignKey("storeinventory.id"), unique=True, nullable=False)
+    product_id = Column(Integer, ForeignKey("product.id"), nullable=False)
+    store_id = Column(Integer, ForeignKey("store.id"), index=True, nullable=False)
+    supplier_id = Column(Integer, ForeignKey("supplier.id"), nullable=True)
+
+    daily_demand = Column(Float, nullable=False) # mean daily forecast over lead time + review period
+    demand_sigma = Column(Float, nullable=False) # one-step forecast error standard deviation
+    lead_time_days = Column(Float, nullable=False)
+    lead_time_sigma = Column(Float, nullable=False)
+    safety_stock = Column(Float, nullable=False)
+    reorder_point = Column(Float, nullable=False)
+    order_up_to = Column(Float, nullable=False)
+    on_hand = Column(Integer, nullable=False)
+    on_order = Column(Integer, nullable=False)
+    suggested_quantity = Column(Integer, nullable=False, index=True)
+    purchase_order_id = Column(Integer, ForeignKey("purchaseorder.id"), nullable=True)
+
+    as_of = Column(Date, nullable=False) # forecast origin: history ends the day before
+    computed_at = Column(DateTime, nullable=False)
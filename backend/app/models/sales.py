@@ -1,8 +1,10 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Date, Boolean
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Date, DateTime, Boolean, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
 
 class Holiday(Base):
+    __table_args__ = (UniqueConstraint("date", "locale_name", name="uq_holiday_date_locale_name"),)
+
     id = Column(Integer, primary_key=True, index=True)
     date = Column(Date, index=True, nullable=False)
     type = Column(String, index=True) # Holiday, Event, Transfer
@@ -18,6 +20,7 @@ class Product(Base):
     name = Column(String, index=True)
     category = Column(String, index=True)
     price = Column(Float)
+    supplier_id = Column(Integer, ForeignKey("supplier.id"), nullable=True) # replenishment orders go to this supplier
     
     sales = relationship("SalesData", back_populates="product")
     inventory = relationship("StoreInventory", back_populates="product")
@@ -31,6 +34,13 @@ class Store(Base):
     inventory = relationship("StoreInventory", back_populates="store")
 
 class SalesData(Base):
+    # Series lookups and the ingestion anti-join filter on (sku, store, date); the inactive
+    # store check probes (store, date)
+    __table_args__ = (
+        Index("ix_salesdata_sku_store_date", "sku_id", "store_id", "date"),
+        Index("ix_salesdata_store_date", "store_id", "date"),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     date = Column(Date, index=True, nullable=False)
     sku_id = Column(Integer, ForeignKey("product.id"))
@@ -40,3 +50,20 @@ class SalesData(Base):
     
     product = relationship("Product", back_populates="sales")
     store = relationship("Store", back_populates="sales")
+
+
+class DailySalesRollup(Base):
+    """
+    Per day, SKU and store totals of SalesData, maintained in the same transaction as the
+    sales rows by the event ingestion path (and rebuilt for the date span of file uploads).
+    """
+    __table_args__ = (UniqueConstraint("date", "sku_id", "store_id", name="uq_dailysalesrollup_date_sku_store"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    date = Column(Date, index=True, nullable=False)
+    sku_id = Column(Integer, ForeignKey("product.id"), nullable=False)
+    store_id = Column(Integer, ForeignKey("store.id"), nullable=False)
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+    records = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime)
@@ -9,6 +9,7 @@ class SupplierStatus(str, enum.Enum):
     UNDER_REVIEW = "Under Review"
 
 class POStatus(str, enum.Enum):
+    DRAFT = "Draft" # suggested by the replenishment engine, replaced on its next run until approved
     PENDING = "Pending"
     APPROVED = "Approved"
     PROCESSING = "Processing"
@@ -44,6 +45,19 @@ class PurchaseOrder(Base):
 
     supplier = relationship("Supplier", back_populates="orders")
     shipment = relationship("Shipment", back_populates="order", uselist=False)
+    lines = relationship("PurchaseOrderLine", back_populates="order", cascade="all, delete-orphan")
+
+class PurchaseOrderLine(Base):
+    """Quantity of one product ordered for one store; the order's total_amount is the sum of the lines."""
+    id = Column(Integer, primary_key=True, index=True)
+    purchase_order_id = Column(Integer, ForeignKey("purchaseorder.id"), index=True, nullable=False)
+    product_id = Column(Integer, ForeignKey("product.id"), nullable=False)
+    store_id = Column(Integer, ForeignKey("store.id"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    unit_price = Column(Float)
+    amount = Column(Float)
+
+    order = relationship("PurchaseOrder", back_populates="lines")
 
 class Shipment(Base):
     id = Column(Integer, primary_key=True, index=True)
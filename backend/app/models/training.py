@@ -0,0 +1,38 @@
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, JSON, func
+import enum
+from app.db.base_class import Base
+
+class TrainingJobStatus(str, enum.Enum):
+    QUEUED = "Queued"
+    RUNNING = "Running"
+    COMPLETED = "Completed"
+    FAILED = "Failed"
+    CANCELLED = "Cancelled"
+
+class TrainingJob(Base):
+    """
+    One model training run. Rows are the queue (Queued), the live status of running
+    jobs (stage/progress/heartbeat) and the history of finished runs.
+    """
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(String, index=True, nullable=False, default=TrainingJobStatus.QUEUED)
+    auto_tune = Column(Boolean, default=False)
+    incremental = Column(Boolean, default=False) # warm-start from the current model instead of a cold fit
+    trigger = Column(String, default="manual") # manual, schedule, ...
+    requested_by = Column(String)
+
+    stage = Column(String)
+    progress = Column(Float, default=0.0) # percent
+    stage_timings = Column(JSON) # {stage: seconds}
+    profile = Column(JSON) # per-stage time/CPU/memory, peak RSS, Stan iterations (see app/ml/profiling.py)
+    result = Column(JSON)
+    error = Column(Text)
+    cancel_requested = Column(Boolean, default=False)
+
+    data_high_water_mark = Column(JSON) # {rows, max_id, max_date} of SalesData when the job started
+    worker = Column(String)
+    created_at = Column(DateTime, server_default=func.now())
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    heartbeat_at = Column(DateTime)
+    duration_seconds = Column(Float)
@@ -0,0 +1,103 @@
+"""
+Convert a Kaggle-style sales history CSV (e.g. data/train.csv) to Parquet once, and
+optionally bulk import it into the database.
+
+    python convert_sales_history.py data/train.csv                # writes data/train.parquet
+    python convert_sales_history.py data/train.csv --import       # convert, then import
+    python convert_sales_history.py data/train.parquet --import   # re-import an existing file
+
+The CSV is streamed in blocks with pyarrow and written row group by row group, so memory
+stays bounded for multi-GB files. Columns are renamed to the upload schema (date, sku,
+store_id, quantity, onpromotion). ForecastModel picks up data/train.parquet automatically.
+"""
+import argparse
+import os
+import sys
+import time
+
+# Ensure app is in path
+sys.path.append(os.getcwd())
+
+# Kaggle column -> upload column
+RENAMES = {'item_nbr': 'sku', 'store_nbr': 'store_id', 'unit_sales': 'quantity', 'sales': 'quantity'}
+
+def convert(csv_path: str, parquet_path: str, block_size: int = 64 << 20) -> int:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+
+    column_types = {'date': pa.date32(), 'item_nbr': pa.string(), 'sku': pa.string(), 'store_nbr': pa.string(),
+                    'store_id': pa.string(), 'onpromotion': pa.bool_()}
+    reader = pacsv.open_csv(
+        csv_path,
+        read_options=pacsv.ReadOptions(block_size=block_size),
+        convert_options=pacsv.ConvertOptions(column_types=column_types, strings_can_be_null=True)
+    )
+    names = [RENAMES.get(name, name) for name in reader.schema.names]
+    if 'id' in names:
+        names[names.index('id')] = 'source_id'
+
+    rows = 0
+    tmp_path = parquet_path + ".tmp"
+    writer = None
+    try:
+        for batch in reader:
+            table = pa.Table.from_batches([batch]).rename_columns(names)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema, compression="zstd")
+            writer.write_table(table)
+            rows += table.num_rows
+            print(f"(refresh) {rows:,} rows converted...", end="\r")
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(tmp_path, parquet_path)
+    print()
+    return rows
+
+def import_file(path: str, chunk_size: int, force: bool = False):
+    from app.db.session import SessionLocal
+    from app.ingestion.jobs import run_sales_ingestion
+
+    db = SessionLocal()
+    try:
+        with open(path, "rb") as f:
+            return run_sales_ingestion(db, os.path.basename(path), f, chunk_size=chunk_size, force=force,
+                                       requested_by="convert_sales_history.py")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert sales history CSV to Parquet and/or import it.")
+    parser.add_argument("source", help="CSV to convert, or a Parquet/Arrow file to import")
+    parser.add_argument("target", nargs="?", help="Parquet output (default: source with .parquet)")
+    parser.add_argument("--import", dest="do_import", action="store_true", help="Import into the database")
+    parser.add_argument("--chunk-size", type=int, default=200000)
+    parser.add_argument("--force", action="store_true", help="Import again even if this file was already imported")
+    args = parser.parse_args()
+
+    path = args.source
+    if path.lower().endswith(".csv"):
+        target = args.target or os.path.splitext(path)[0] + ".parquet"
+        started = time.perf_counter()
+        rows = convert(path, target)
+        print(f"(tick) Wrote {rows:,} rows to {target} in {time.perf_counter() - started:.1f}s")
+        path = target
+
+    if args.do_import:
+        from app.ingestion.jobs import DuplicateUpload
+
+        started = time.perf_counter()
+        try:
+            results = import_file(path, args.chunk_size, args.force)
+        except DuplicateUpload as e:
+            print(f"(!) {e} Use --force to import it again.")
+            sys.exit(1)
+        elapsed = time.perf_counter() - started
+        if results["resumed_from_chunk"]:
+            print(f"(refresh) Resumed job {results['job_id']} after chunk {results['resumed_from_chunk']}")
+        print(f"(tick) Imported {results['added_rows']:,} rows, skipped {results['skipped_rows']:,}, "
+              f"rejected {results['rejected_rows']:,} invalid, in {elapsed:.1f}s "
+              f"({results['rows_read'] / max(elapsed, 1e-9):,.0f} rows/s)")
+        for line in results["errors"]:
+            print(f"(!) {line}")
@@ -11,6 +11,7 @@ from sqlalchemy import func
 from app.db.session import SessionLocal
 from app.models.sales import Product, Store, SalesData, Holiday
 from app.models.inventory import StoreInventory
+from app.crud import crud_dashboard, crud_inventory, crud_sales
 
 class LiveDataSimulator:
     def __init__(self, db: Session):
@@ -45,6 +46,7 @@ class LiveDataSimulator:
             time_multiplier *= random.uniform(2.0, 3.5)
         
         sales = []
+        rollups = {}
         for _ in range(int(num_sales * time_multiplier)):
             product = random.choice(self.products)
             store = random.choice(self.stores)
@@ -77,15 +79,30 @@ class LiveDataSimulator:
                 onpromotion=on_promotion
             )
             sales.append(sale)
+
+            totals = rollups.setdefault((product.id, store.id), {
+                "date": today, "sku_id": product.id, "store_id": store.id, "quantity": 0, "revenue": 0.0, "records": 0
+            })
+            totals["quantity"] += quantity
+            totals["revenue"] += quantity * (product.price or 0.0)
+            totals["records"] += 1
         
         self.db.bulk_save_objects(sales)
+        # Keep the daily rollups in step with the raw rows (same transaction)
+        crud_sales.upsert_daily_rollups(self.db, list(rollups.values()))
+        crud_dashboard.publish_sales_delta(self.db, rollups.values(), day=today)
         self.db.commit()
         return len(sales)
     
     def update_inventory(self, num_updates=30):
         """Simulate inventory changes (sales reducing stock, restocking, etc.)"""
         # Get random inventory records
-        inventory_records = self.db.query(StoreInventory).order_by(func.random()).limit(num_updates).all()
+        # Locked (in id order) like every other stock writer, so the alert counter deltas are exact
+        picked = self.db.query(StoreInventory.id).order_by(func.random()).limit(num_updates).scalar_subquery()
+        inventory_records = (
+            self.db.query(StoreInventory).filter(StoreInventory.id.in_(picked))
+            .order_by(StoreInventory.id).with_for_update().all()
+        )
         
         updates = {"restocked": 0, "sold": 0, "low_stock": 0}
         
@@ -103,7 +120,7 @@ class LiveDataSimulator:
                 inv.last_restocked = datetime.now().date()
                 updates["restocked"] += 1
                 
-            elif action == "sell":
+            elif action == "sell" and inv.quantity_on_hand > 0:
                 # Reduce inventory (simulate sales)
                 sold_amount = random.randint(1, min(10, inv.quantity_on_hand))
                 inv.quantity_on_hand = max(0, inv.quantity_on_hand - sold_amount)
@@ -117,6 +134,7 @@ class LiveDataSimulator:
                 adjustment = random.randint(-5, 5)
                 inv.quantity_on_hand = max(0, inv.quantity_on_hand + adjustment)
         
+        crud_dashboard.publish_stock_counts(self.db)
         self.db.commit()
         return updates
     
@@ -137,9 +155,7 @@ class LiveDataSimulator:
         """Display current database statistics"""
         total_sales = self.db.query(func.count(SalesData.id)).scalar()
         total_inventory = self.db.query(func.count(StoreInventory.id)).scalar()
-        low_stock_items = self.db.query(StoreInventory).filter(
-            StoreInventory.quantity_on_hand <= StoreInventory.low_stock_threshold
-        ).count()
+        alerts = crud_inventory.get_stock_alert_counts(self.db)
         
         today_sales = self.db.query(func.count(SalesData.id)).filter(
             SalesData.date == datetime.now().date()
@@ -151,7 +167,7 @@ class LiveDataSimulator:
         print(f"  📦 Total Sales Records: {total_sales:,}")
         print(f"  🛍️  Today's Sales: {today_sales:,}")
         print(f"  📊 Inventory Items: {total_inventory:,}")
-        print(f"  ⚠️  Low Stock Alerts: {low_stock_items}")
+        print(f"  ⚠️  Low Stock Alerts: {alerts['low_stock_count']} (out of stock: {alerts['out_of_stock_count']})")
         print(f"{'='*60}\n")
 
 def main():
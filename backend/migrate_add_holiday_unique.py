@@ -0,0 +1,37 @@
+"""
+One-shot migration: Remove duplicate holidays and add the unique (date, locale_name) constraint.
+Only needed for databases created before the constraint existed (new tables get it from init_db).
+Run once from the backend/ directory:
+    python migrate_add_holiday_unique.py
+"""
+import sys
+import os
+
+# Make sure app imports work
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.db.session import engine
+from sqlalchemy import text
+
+def run():
+    with engine.connect() as conn:
+        # Keep the first row of every (date, locale_name) pair
+        result = conn.execute(text("""
+            DELETE FROM holiday
+            WHERE id NOT IN (
+                SELECT MIN(id) FROM holiday GROUP BY date, locale_name
+            );
+        """))
+        print(f"✅  Removed {result.rowcount} duplicate holidays.")
+
+        conn.execute(text("""
+            CREATE UNIQUE INDEX IF NOT EXISTS uq_holiday_date_locale_name
+            ON holiday (date, locale_name);
+        """))
+        print("✅  Unique index on (date, locale_name) created (or already existed).")
+
+        conn.commit()
+        print("✅  Migration committed successfully.")
+
+if __name__ == "__main__":
+    run()
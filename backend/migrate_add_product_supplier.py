@@ -0,0 +1,29 @@
+"""
+One-shot migration: Add the supplier_id column to the 'product' table (the supplier the
+replenishment engine drafts purchase orders for). The new purchaseorderline and
+replenishmentplan tables are created by init_db.
+Run once from the backend/ directory:
+    python migrate_add_product_supplier.py
+"""
+import sys
+import os
+
+# Make sure app imports work
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.db.session import engine
+from sqlalchemy import text
+
+def run():
+    with engine.connect() as conn:
+        conn.execute(text("""
+            ALTER TABLE product
+            ADD COLUMN IF NOT EXISTS supplier_id INTEGER REFERENCES supplier (id);
+        """))
+        print("✅  supplier_id column added (or already existed).")
+
+        conn.commit()
+        print("✅  Migration committed successfully.")
+
+if __name__ == "__main__":
+    run()
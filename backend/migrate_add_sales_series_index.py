@@ -0,0 +1,28 @@
+"""
+One-shot migration: Add the (sku_id, store_id, date) index on salesdata used by series
+lookups and the ingestion duplicate check. New tables get it from init_db.
+Run once from the backend/ directory:
+    python migrate_add_sales_series_index.py
+"""
+import sys
+import os
+
+# Make sure app imports work
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.db.session import engine
+from sqlalchemy import text
+
+def run():
+    with engine.connect() as conn:
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_salesdata_sku_store_date
+            ON salesdata (sku_id, store_id, date);
+        """))
+        print("✅  Index on salesdata (sku_id, store_id, date) created (or already existed).")
+
+        conn.commit()
+        print("✅  Migration committed successfully.")
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,40 @@
+"""
+One-shot migration: Add incremental, data_high_water_mark and profile columns to the 'trainingjob' table.
+Only needed for databases created before these columns were added (new tables are created by init_db).
+Run once from the backend/ directory:
+    python migrate_add_training_job_columns.py
+"""
+import sys
+import os
+
+# Make sure app imports work
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.db.session import engine
+from sqlalchemy import text
+
+def run():
+    with engine.connect() as conn:
+        conn.execute(text("""
+            ALTER TABLE trainingjob
+            ADD COLUMN IF NOT EXISTS incremental BOOLEAN DEFAULT FALSE;
+        """))
+        print("✅  incremental column added (or already existed).")
+
+        conn.execute(text("""
+            ALTER TABLE trainingjob
+            ADD COLUMN IF NOT EXISTS data_high_water_mark JSON;
+        """))
+        print("✅  data_high_water_mark column added (or already existed).")
+
+        conn.execute(text("""
+            ALTER TABLE trainingjob
+            ADD COLUMN IF NOT EXISTS profile JSON;
+        """))
+        print("✅  profile column added (or already existed).")
+
+        conn.commit()
+        print("✅  Migration committed successfully.")
+
+if __name__ == "__main__":
+    run()
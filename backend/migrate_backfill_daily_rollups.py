@@ -0,0 +1,35 @@
+"""
+One-shot migration: Fill the dailysalesrollup table (created by init_db) from the existing
+sales history. Afterwards it is kept current by uploads, /ingestion/events and the live
+simulator. Safe to re-run: the covered date range is recomputed from scratch.
+Run once from the backend/ directory:
+    python migrate_backfill_daily_rollups.py
+"""
+import sys
+import os
+
+# Make sure app imports work
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sqlalchemy import func
+from app.db.session import SessionLocal
+from app.db.init_db import init_db
+from app.models.sales import SalesData
+from app.crud import crud_sales
+
+def run():
+    init_db()
+    db = SessionLocal()
+    try:
+        start, end = db.query(func.min(SalesData.date), func.max(SalesData.date)).one()
+        if start is None:
+            print("✅  No sales history, nothing to backfill.")
+            return
+        rows = crud_sales.rebuild_daily_rollups(db, start, end)
+        db.commit()
+        print(f"✅  Daily rollups rebuilt for {start} .. {end} ({rows} rows).")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    run()
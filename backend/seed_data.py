@@ -14,6 +14,7 @@ from app.models.forecast import Forecast
 from app.models.supply_chain import Supplier, SupplierStatus, PurchaseOrder, POStatus, Shipment, ShipmentStatus
 
 from app.crud.crud_user import create as crud_create_user
+from app.ml.preprocessing import invalidate_training_frame_cache
 from app.schemas.user import UserCreate
 
 # Product categories and names
@@ -421,6 +422,7 @@ def main():
         # We optionally delete or leave users, let's leave users if they already exist so we don't break logins
         # db.query(User).delete()  
         db.commit()
+        invalidate_training_frame_cache() # the reseeded table can end up with the same row count and max id
         print("✓ Cleared existing data")
         
         # Create base data
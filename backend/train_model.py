@@ -5,11 +5,18 @@ import os
 sys.path.append(os.getcwd())
 
 from app.ml.training import train_model, save_model
+from app.ml.model import forecaster
+from app.ml.profiling import TrainingProfiler
 
 if __name__ == "__main__":
     print("(rocket) Running Training Script...")
     try:
-        metrics = train_model()
+        profiler = TrainingProfiler()
+        metrics = train_model(progress=lambda stage, fraction: profiler.enter(stage))
+        profile = profiler.report(stan=forecaster.fit_stats)
+        for stage in profile["stages"]:
+            print(f"(clock) {stage['stage']}: {stage['seconds']}s, RSS {stage['rss_end_mb']} MB")
+        print(f"(clock) Total {profile['total_seconds']}s, peak RSS {profile['peak_rss_mb']} MB, Stan: {profile['stan']}")
         if metrics:
             print("(tick) Training Successful!")
             print("(chart) Metrics:", metrics)
@@ -0,0 +1,22 @@
+"""
+Standalone training worker for IDFS
+Runs queued training jobs (POST /api/v1/training/train) outside the API processes.
+Start one or more with:  python training_worker.py
+and set TRAINING_WORKER_EMBEDDED=false for the API so uvicorn workers never train.
+"""
+import sys
+import os
+
+# Ensure app is in path
+sys.path.append(os.getcwd())
+
+from app.db.init_db import init_db
+from app.core.training_worker import TrainingWorker
+
+if __name__ == "__main__":
+    init_db()
+    worker = TrainingWorker()
+    try:
+        worker.run_forever()
+    except KeyboardInterrupt:
+        print("\n(stop) Training worker stopped.")
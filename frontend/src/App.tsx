@@ -39,10 +39,12 @@ import Notifications from "./pages/Notifications";
 
 import { AuthProvider } from "@/contexts/AuthContext";
 import { useLowStockNotifier } from "@/hooks/useLowStockNotifier";
+import { useDashboardStream } from "@/hooks/useDashboardStream";
 
 // Inner shell so the hook can access AuthContext
 function AppShell({ children }: { children: React.ReactNode }) {
   useLowStockNotifier();
+  useDashboardStream();
   return <>{children}</>;
 }
 
@@ -0,0 +1,87 @@
+import { useEffect } from 'react';
+import { useQueryClient } from '@tanstack/react-query';
+import { toast } from 'sonner';
+import { API_URL } from '@/lib/api';
+import { useAuth } from '@/contexts/AuthContext';
+
+interface StreamMessage {
+    id: number;
+    kind: 'sales' | 'stock' | 'notification';
+    payload: any;
+    created_at: string;
+}
+
+/**
+ * Subscribes to /dashboard/stream (Server-Sent Events) and patches the cached
+ * dashboard stats and notifications in place, instead of re-polling every aggregate.
+ * EventSource reconnects on its own and sends Last-Event-ID; the server answers
+ * with a fresh snapshot and replays the notifications missed in between.
+ */
+export function useDashboardStream() {
+    const { isAuthenticated } = useAuth();
+    const queryClient = useQueryClient();
+
+    useEffect(() => {
+        if (!isAuthenticated) return;
+        const token = localStorage.getItem('access_token');
+        if (!token) return;
+
+        const source = new EventSource(`${API_URL}/dashboard/stream?token=${encodeURIComponent(token)}`);
+        const patchStats = (patch: (stats: any) => any) =>
+            queryClient.setQueryData(['dashboardStats'], (stats: any) => (stats ? patch(stats) : stats));
+
+        source.addEventListener('snapshot', (e) => {
+            const snapshot = JSON.parse((e as MessageEvent).data);
+            patchStats((stats) => ({
+                ...stats,
+                today: { ...stats.today, ...snapshot.today },
+                summary: {
+                    ...stats.summary,
+                    low_stock_count: snapshot.low_stock_count,
+                    out_of_stock_count: snapshot.out_of_stock_count,
+                },
+            }));
+        });
+
+        source.addEventListener('sales', (e) => {
+            const { payload } = JSON.parse((e as MessageEvent).data) as StreamMessage;
+            patchStats((stats) => {
+                if (stats.today?.date !== payload.date) return stats;
+                return {
+                    ...stats,
+                    today: {
+                        ...stats.today,
+                        quantity: stats.today.quantity + payload.quantity,
+                        revenue: Math.round((stats.today.revenue + payload.revenue) * 100) / 100,
+                        records: stats.today.records + payload.records,
+                    },
+                };
+            });
+        });
+
+        source.addEventListener('stock', (e) => {
+            const { payload } = JSON.parse((e as MessageEvent).data) as StreamMessage;
+            patchStats((stats) => ({ ...stats, summary: { ...stats.summary, ...payload } }));
+        });
+
+        source.addEventListener('notification', (e) => {
+            const message = JSON.parse((e as MessageEvent).data) as StreamMessage;
+            const notification = {
+                id: `stream-${message.id}`,
+                message: message.payload.message,
+                timestamp: new Date(message.created_at).toLocaleString(),
+                isRead: false,
+                isFavorite: false,
+                isArchived: false,
+            };
+            queryClient.setQueryData(['notifications'], (list: any[] | undefined) =>
+                list?.some((n) => n.id === notification.id) ? list : [notification, ...(list || [])]
+            );
+            if (message.payload.level === 'error') toast.error(notification.message);
+            else if (message.payload.level === 'warning') toast.warning(notification.message);
+            else toast.info(notification.message);
+        });
+
+        return () => source.close();
+    }, [isAuthenticated, queryClient]);
+}
@@ -59,8 +59,8 @@ export default function DataUpload() {
                     <CardContent className="space-y-6">
 
                         <div className="grid w-full max-w-sm items-center gap-1.5">
-                            <Label htmlFor="picture">Sales Data (CSV/Excel)</Label>
-                            <Input id="picture" type="file" accept=".csv, .xlsx, .xls" onChange={handleFileChange} />
+                            <Label htmlFor="picture">Sales Data (CSV/Excel/Parquet)</Label>
+                            <Input id="picture" type="file" accept=".csv, .xlsx, .xls, .parquet, .arrow, .feather" onChange={handleFileChange} />
                         </div>
 
                         {file && (
@@ -95,7 +95,12 @@ export default function DataUpload() {
                                     <li>Skipped (Duplicates): <strong>{uploadStats.skipped_rows}</strong></li>
                                     {uploadStats.errors?.length > 0 && (
                                         <li className="text-destructive mt-2">
-                                            Errors: {uploadStats.errors.length} (Check console for details)
+                                            Rejected Rows: <strong>{uploadStats.rejected_rows}</strong>
+                                            <ul className="list-disc pl-5 mt-1 text-xs">
+                                                {uploadStats.errors.map((error: string) => (
+                                                    <li key={error}>{error}</li>
+                                                ))}
+                                            </ul>
                                         </li>
                                     )}
                                 </ul>
@@ -20,7 +20,7 @@ export default function AdminDashboard() {
   const { data: stats, isLoading, error } = useQuery({
     queryKey: ["dashboardStats"],
     queryFn: getDashboardStats,
-    refetchInterval: 30000,
+    refetchInterval: 300000, // today's totals and stock counts are pushed by useDashboardStream
   });
 
   if (isLoading) {
@@ -141,7 +141,7 @@ export default function StoreManagerDashboard() {
   const { data: stats, isLoading } = useQuery({
     queryKey: ["dashboardStats"],
     queryFn: getDashboardStats,
-    refetchInterval: 30000,
+    refetchInterval: 300000, // today's totals and stock counts are pushed by useDashboardStream
   });
 
   // Derive top-moving products from recent_sales
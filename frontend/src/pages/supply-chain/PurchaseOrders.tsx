@@ -270,6 +270,7 @@ const PurchaseOrders = () => {
                                 </SelectTrigger>
                                 <SelectContent>
                                     <SelectItem value="all">All Statuses</SelectItem>
+                                    <SelectItem value="Draft">Draft</SelectItem>
                                     <SelectItem value="Pending">Pending</SelectItem>
                                     <SelectItem value="Approved">Approved</SelectItem>
                                     <SelectItem value="Shipped">Shipped</SelectItem>